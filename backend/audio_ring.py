@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Shared-memory audio ring for same-host clients
+The client writes PCM16 straight into a ring buffer it shares with the server,
+which reads it as NumPy views without a socket, framing or copy in between
+"""
+
+import re
+import struct
+from multiprocessing import resource_tracker, shared_memory
+from typing import List, Optional
+
+import numpy as np
+
+# Header at the start of the segment: magic, data capacity in bytes, and the
+# total bytes ever written and consumed (little-endian). Positions only grow;
+# a byte at position p lives at HEADER_SIZE + p % capacity.
+RING_MAGIC = b'UWR1'
+RING_HEADER = struct.Struct('<4sI')
+POSITION = struct.Struct('<Q')
+WRITE_POS_OFFSET = 8
+READ_POS_OFFSET = 16
+
+# The data area starts on a cache line of its own
+HEADER_SIZE = 64
+
+# Default capacity: 10s of 16kHz PCM16, the same as a session's flow-control window
+DEFAULT_CAPACITY = 320000
+
+# Ring names start with this plus a per-server token, so a client can only hand
+# the server segments made for it (macOS allows 31-character names)
+RING_PREFIX = 'uwr_'
+RING_SUFFIX = re.compile(r'[A-Za-z0-9_]{1,12}')
+
+
+class RingError(Exception):
+    """A shared-memory segment that can't be used as an audio ring"""
+
+
+class AudioRing:
+    """
+    Single-producer single-consumer byte ring in a shared-memory segment
+
+    The producer only moves the write position and the consumer only the read
+    position, each with one aligned 8-byte store after the data it covers, so
+    neither side needs a lock.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        magic, self.capacity = RING_HEADER.unpack_from(shm.buf)
+        if magic != RING_MAGIC or self.capacity % 2 or HEADER_SIZE + self.capacity > shm.size:
+            raise RingError(f"Shared memory segment {shm.name} is not an audio ring")
+        self.data = shm.buf[HEADER_SIZE:HEADER_SIZE + self.capacity]
+
+    @classmethod
+    def create(cls, capacity: int = DEFAULT_CAPACITY, name: Optional[str] = None) -> 'AudioRing':
+        """Create a ring (the client side); the creator unlinks it when done"""
+        if capacity <= 0 or capacity % 2:
+            raise ValueError(f"Ring capacity must be a positive number of PCM16 bytes, got {capacity}")
+        shm = shared_memory.SharedMemory(name=name, create=True, size=HEADER_SIZE + capacity)
+        shm.buf[:HEADER_SIZE] = bytes(HEADER_SIZE)
+        RING_HEADER.pack_into(shm.buf, 0, RING_MAGIC, capacity)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, prefix: str = RING_PREFIX) -> 'AudioRing':
+        """Open a ring created by a client (the server side), named prefix plus a short token"""
+        bare = name.lstrip('/')
+        if not bare.startswith(prefix) or not RING_SUFFIX.fullmatch(bare[len(prefix):]):
+            raise RingError(f"Audio ring name {name!r} must be {prefix} followed by up to 12 letters, "
+                            f"digits or underscores")
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+        except (FileNotFoundError, ValueError, OSError) as e:
+            raise RingError(f"Cannot open shared memory segment {name}: {e}") from e
+        # Before Python 3.13 attaching registers the segment with the resource
+        # tracker, which would unlink the client's segment when the server exits
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        try:
+            return cls(shm, owner=False)
+        except RingError:
+            shm.close()
+            raise
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def write_pos(self) -> int:
+        return POSITION.unpack_from(self.shm.buf, WRITE_POS_OFFSET)[0]
+
+    @property
+    def read_pos(self) -> int:
+        return POSITION.unpack_from(self.shm.buf, READ_POS_OFFSET)[0]
+
+    def available(self) -> int:
+        """Bytes written and not yet consumed"""
+        return self.write_pos - self.read_pos
+
+    def write(self, pcm: bytes) -> int:
+        """
+        Append as much of pcm as fits (producer side)
+
+        Returns:
+            Bytes written; less than len(pcm) when the consumer is behind
+        """
+        write_pos = self.write_pos
+        n = min(len(pcm), self.capacity - (write_pos - self.read_pos))
+        n -= n % 2
+        start = write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        self.data[start:start + first] = pcm[:first]
+        self.data[:n - first] = pcm[first:n]
+        POSITION.pack_into(self.shm.buf, WRITE_POS_OFFSET, write_pos + n)
+        return n
+
+    def read(self) -> List[np.ndarray]:
+        """
+        Unconsumed samples as int16 views into the ring (consumer side)
+
+        Two views when the data wraps around the end. They stay valid until
+        consume() hands the space back to the producer.
+        """
+        read_pos = self.read_pos
+        n = self.available()
+        n -= n % 2
+        start = read_pos % self.capacity
+        first = min(n, self.capacity - start)
+        views = []
+        if first:
+            views.append(np.frombuffer(self.data, dtype=np.int16, count=first // 2, offset=start))
+        if n > first:
+            views.append(np.frombuffer(self.data, dtype=np.int16, count=(n - first) // 2))
+        return views
+
+    def consume(self, n_bytes: int):
+        """Release bytes returned by read() to the producer"""
+        POSITION.pack_into(self.shm.buf, READ_POS_OFFSET, self.read_pos + n_bytes)
+
+    def close(self):
+        """Detach from the segment, and remove it if this side created it"""
+        self.data.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
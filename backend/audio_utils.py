@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Audio helpers shared by the server, warm-up and benchmarks
+"""
+
+import logging
+import struct
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+# Bundled speech sample (16kHz mono PCM)
+REPO_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_WAV = REPO_DIR / "assets" / "audio_assets" / "Whisper_test_sample.wav"
+
+# Frame length of the energy gate
+ENERGY_FRAME_MS = 20
+
+# Floor of the dBFS levels (digital silence)
+SILENCE_DB = -100.0
+
+# Whisper encoder frames per second of audio, and its full 30s context
+AUDIO_CTX_PER_SECOND = 50
+AUDIO_CTX_MAX = 1500
+
+# Encoder frames added beyond the audio when the context is shortened
+AUDIO_CTX_MARGIN = 64
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def load_wav(path: Path, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Load a 16-bit PCM WAV file as mono int16 at the given sample rate
+
+    Handles WAVE_FORMAT_EXTENSIBLE headers, which the wave module rejects.
+    """
+    data = Path(path).read_bytes()
+    if data[:4] != b'RIFF' or data[8:12] != b'WAVE':
+        raise ValueError(f"Not a WAV file: {path}")
+
+    fmt = None
+    pcm = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset + 4]
+        chunk_size = struct.unpack('<I', data[offset + 4:offset + 8])[0]
+        body = data[offset + 8:offset + 8 + chunk_size]
+        if chunk_id == b'fmt ':
+            fmt = struct.unpack('<HHIIHH', body[:16])
+            if fmt[0] == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                # The sub-format GUID starts with the actual format tag
+                fmt = (struct.unpack('<H', body[24:26])[0],) + fmt[1:]
+        elif chunk_id == b'data':
+            pcm = body
+        offset += 8 + chunk_size + (chunk_size & 1)
+
+    if fmt is None or pcm is None:
+        raise ValueError(f"Missing fmt or data chunk: {path}")
+
+    format_tag, channels, rate, _, _, bits = fmt
+    if format_tag != WAVE_FORMAT_PCM or bits != 16:
+        raise ValueError(f"Only 16-bit PCM WAV is supported: {path}")
+
+    audio = np.frombuffer(pcm[:len(pcm) - len(pcm) % (2 * channels)], dtype='<i2')
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+
+    if rate != sample_rate:
+        n_out = int(len(audio) * sample_rate / rate)
+        audio = np.interp(np.arange(n_out) * rate / sample_rate, np.arange(len(audio)), audio)
+
+    return np.asarray(audio).astype(np.int16)
+
+
+def synthetic_audio(seconds: float = 2.0, sample_rate: int = SAMPLE_RATE, seed: int = 0) -> np.ndarray:
+    """Deterministic speech-like test signal (modulated tones over low noise)"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    rng = np.random.default_rng(seed)
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 3 * t))
+    signal = envelope * (np.sin(2 * np.pi * 220 * t) + 0.5 * np.sin(2 * np.pi * 440 * t))
+    signal += 0.05 * rng.standard_normal(len(t))
+    return (np.clip(signal * 0.2, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def warmup_audio(source: str) -> Optional[np.ndarray]:
+    """
+    Audio used to warm up models
+
+    Args:
+        source: 'clip' for the bundled sample, 'synthetic', 'none', or a WAV path
+    """
+    if source == 'none':
+        return None
+    if source == 'synthetic':
+        return synthetic_audio()
+
+    path = SAMPLE_WAV if source == 'clip' else Path(source)
+    if not path.exists():
+        logger.warning(f"Warm-up audio {path} not found, using a synthetic clip")
+        return synthetic_audio()
+    return load_wav(path)
+
+
+def frame_levels(audio: np.ndarray, sample_rate: int = SAMPLE_RATE,
+                 frame_ms: int = ENERGY_FRAME_MS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    RMS and peak level of each frame in dBFS
+
+    Args:
+        audio: int16 PCM or float samples in [-1, 1]
+        sample_rate: Sample rate of the audio
+        frame_ms: Frame length; a trailing partial frame is ignored
+
+    Returns:
+        (rms_db, peak_db) arrays with one value per frame
+    """
+    frame = int(sample_rate * frame_ms / 1000)
+    n_frames = len(audio) // frame
+    frames = audio[:n_frames * frame].reshape(n_frames, frame).astype(np.float32)
+    if audio.dtype == np.int16:
+        frames *= 1.0 / 32768.0
+
+    rms = np.sqrt(np.einsum('ij,ij->i', frames, frames) / frame)
+    peak = np.abs(frames).max(axis=1) if n_frames else np.zeros(0, dtype=np.float32)
+    with np.errstate(divide='ignore'):
+        return (np.maximum(20 * np.log10(rms), SILENCE_DB),
+                np.maximum(20 * np.log10(peak), SILENCE_DB))
+
+
+def audio_ctx_for(n_samples: int, sample_rate: int = SAMPLE_RATE) -> int:
+    """
+    Encoder context just covering the audio, so short clips skip most of the 30s window
+
+    Returns:
+        audio_ctx for the engine (0, the full window, when the audio fills it)
+    """
+    ctx = -(-n_samples * AUDIO_CTX_PER_SECOND // sample_rate) + AUDIO_CTX_MARGIN
+    return ctx if ctx < AUDIO_CTX_MAX else 0
+
+
+class EnergyGate:
+    """Frame-energy speech detection: skips silent sessions and trims dead air"""
+
+    def __init__(self, rms_db: float = -50.0, peak_db: float = -35.0,
+                 speech_ratio: float = 0.1, min_speech_ms: int = 300,
+                 hysteresis_db: float = 10.0, onset_ms: int = 60, pad_ms: int = 250):
+        """
+        Initialize the gate
+
+        Args:
+            rms_db: Frames quieter than this (dBFS) are silence
+            peak_db: Frames whose peak stays below this (dBFS) are silence
+            speech_ratio: Share of speech frames needed (0 disables the gate)
+            min_speech_ms: Speech this long always passes, however long the recording
+            hysteresis_db: Once speech starts, it only ends below rms_db - hysteresis_db
+            onset_ms: Speech must last this long to count when trimming (skips clicks)
+            pad_ms: Audio kept on each side of the speech when trimming
+        """
+        self.rms_db = rms_db
+        self.peak_db = peak_db
+        self.speech_ratio = speech_ratio
+        self.min_speech_ms = min_speech_ms
+        self.hysteresis_db = hysteresis_db
+        self.onset_ms = onset_ms
+        self.pad_ms = pad_ms
+
+    @property
+    def enabled(self) -> bool:
+        return self.speech_ratio > 0
+
+    def speech_frames(self, audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+        """Boolean mask of the ENERGY_FRAME_MS frames loud enough to be speech"""
+        rms_db, peak_db = frame_levels(audio, sample_rate)
+        return (rms_db >= self.rms_db) & (peak_db >= self.peak_db)
+
+    def has_speech(self, audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> bool:
+        """Whether the audio may contain speech and is worth decoding"""
+        if not self.enabled:
+            return True
+        speech = self.speech_frames(audio, sample_rate)
+        # A ratio alone would reject a short answer in a long recording
+        needed = min(self.speech_ratio * len(speech), self.min_speech_ms / ENERGY_FRAME_MS)
+        return int(speech.sum()) >= max(1.0, needed)
+
+    def speech_bounds(self, audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> Tuple[int, int]:
+        """
+        Sample range from the start of the first to the end of the last speech
+
+        Speech is found at the loud threshold and then extended through softer
+        frames down to the release level, so quiet word onsets and endings survive.
+
+        Returns:
+            (start, end) sample indices; the whole audio when no speech is found
+        """
+        rms_db, peak_db = frame_levels(audio, sample_rate)
+        loud = (rms_db >= self.rms_db) & (peak_db >= self.peak_db)
+
+        # First and last run of onset_ms of consecutive loud frames
+        run = max(1, self.onset_ms // ENERGY_FRAME_MS)
+        sustained = np.flatnonzero(np.convolve(loud, np.ones(run, dtype=int), 'valid') >= run)
+        if not len(sustained):
+            return 0, len(audio)
+        first = int(sustained[0])
+        last = int(sustained[-1]) + run
+
+        above_release = rms_db >= self.rms_db - self.hysteresis_db
+        quiet_before = np.flatnonzero(~above_release[:first])
+        first = int(quiet_before[-1]) + 1 if len(quiet_before) else 0
+        quiet_after = np.flatnonzero(~above_release[last:])
+        last = last + int(quiet_after[0]) if len(quiet_after) else len(rms_db)
+
+        frame = int(sample_rate * ENERGY_FRAME_MS / 1000)
+        pad = int(sample_rate * self.pad_ms / 1000)
+        start = max(0, first * frame - pad)
+        # Speech running into the last frame keeps the trailing partial frame too
+        end = len(audio) if last == len(rms_db) else min(len(audio), last * frame + pad)
+        return start, end
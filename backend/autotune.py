@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Startup autotuning of the state pool size and whisper thread count
+Benchmarks candidate configurations once per host/model and caches the winner
+"""
+
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from model_registry import default_cache_dir
+from whisper_wrapper import WhisperModel, bench_memcpy
+
+logger = logging.getLogger(__name__)
+
+# Configurations whose latency is within this factor of the fastest one are
+# considered interactive enough; among those the highest throughput wins
+LATENCY_TOLERANCE = 1.5
+
+# Transcriptions per state for each candidate (after one untimed warm-up run)
+ROUNDS = 2
+
+
+def default_autotune_path() -> Path:
+    return default_cache_dir() / "autotune.json"
+
+
+def host_key(model_path: Path, use_gpu: bool, n_cpus: Optional[int] = None) -> str:
+    """Identify a host/model/CPU-share combination in the autotune cache"""
+    stat = Path(model_path).stat()
+    n_cpus = n_cpus or os.cpu_count()
+    return f"{socket.gethostname()}|cpus={n_cpus}|{Path(model_path).name}|{stat.st_size}|gpu={int(use_gpu)}"
+
+
+def candidate_configs(n_cpus: Optional[int] = None) -> List[Tuple[int, int]]:
+    """(pool_size, n_threads) pairs that don't oversubscribe the CPU"""
+    n_cpus = n_cpus or os.cpu_count() or 4
+    thread_counts = sorted({t for t in (1, 2, 4, 6, 8, 12, 16, 24, 32) if t <= n_cpus} | {n_cpus})
+    pool_sizes = [p for p in (1, 2, 4, 8) if p <= n_cpus]
+    return [(p, t) for p in pool_sizes for t in thread_counts if p * t <= n_cpus]
+
+
+def parse_memcpy_gbps(report: str) -> Optional[float]:
+    """Best bandwidth reported by whisper_bench_memcpy_str"""
+    values = [float(v) for v in re.findall(r'memcpy:\s*([\d.]+) GB/s', report)]
+    return max(values) if values else None
+
+
+def benchmark_config(model: WhisperModel, audio: np.ndarray, n_threads: int) -> Dict[str, float]:
+    """
+    Run ROUNDS transcriptions on every state of model concurrently
+
+    Returns:
+        Throughput (audio seconds per wall second), mean latency and, for the
+        default state, whisper_get_timings encode/decode averages
+    """
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(state):
+        for _ in range(ROUNDS):
+            start = time.time()
+            model.transcribe_with_state(state, audio, language=None, n_threads=n_threads)
+            with lock:
+                latencies.append(time.time() - start)
+
+    # Untimed pass so first-use allocations don't skew the numbers
+    for state in model.states:
+        model.transcribe_with_state(state, audio, language=None, n_threads=n_threads)
+    model.reset_timings()
+
+    threads = [threading.Thread(target=worker, args=(state,)) for state in model.states]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.time() - start
+
+    timings = model.timings()
+    audio_seconds = len(audio) / 16000 * len(latencies)
+    return {
+        'throughput': audio_seconds / wall,
+        'latency_s': sum(latencies) / len(latencies),
+        'encode_ms': timings.get('encode_ms', 0.0),
+        'decode_ms': timings.get('decode_ms', 0.0)
+    }
+
+
+def run_autotune(model_path: Path, audio: np.ndarray, use_gpu: bool = True,
+                 candidates: Optional[List[Tuple[int, int]]] = None) -> dict:
+    """Benchmark candidate configurations and return the best one"""
+    candidates = candidates or candidate_configs()
+    memcpy_gbps = parse_memcpy_gbps(bench_memcpy(1))
+    logger.info(f"Autotuning {len(candidates)} configurations (memcpy {memcpy_gbps} GB/s)")
+
+    results = []
+    for pool_size in sorted({p for p, _ in candidates}):
+        model = WhisperModel(str(model_path), use_gpu=use_gpu, n_states=pool_size)
+        try:
+            for _, n_threads in [c for c in candidates if c[0] == pool_size]:
+                result = benchmark_config(model, audio, n_threads)
+                result.update(pool_size=pool_size, n_threads=n_threads)
+                results.append(result)
+                logger.info(
+                    f"  pool={pool_size} threads={n_threads}: "
+                    f"{result['throughput']:.2f}x realtime, latency {result['latency_s']:.3f}s, "
+                    f"encode {result['encode_ms']:.1f}ms, decode {result['decode_ms']:.2f}ms/token"
+                )
+        finally:
+            model.close()
+
+    fastest = min(r['latency_s'] for r in results)
+    interactive = [r for r in results if r['latency_s'] <= fastest * LATENCY_TOLERANCE]
+    best = max(interactive, key=lambda r: r['throughput'])
+
+    return {
+        'pool_size': best['pool_size'],
+        'n_threads': best['n_threads'],
+        'throughput': best['throughput'],
+        'latency_s': best['latency_s'],
+        'memcpy_gbps': memcpy_gbps,
+        'tuned_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results
+    }
+
+
+def load_tuned_config(model_path: Path, audio: np.ndarray, use_gpu: bool = True,
+                      cache_path: Optional[Path] = None, force: bool = False,
+                      n_cpus: Optional[int] = None) -> dict:
+    """
+    Return the cached configuration for this host/model, tuning it if needed
+
+    Args:
+        n_cpus: CPUs the configuration may use (default: all of them); a fleet
+            of N server processes tunes each for its 1/N share
+
+    Returns:
+        Dictionary with at least 'pool_size' and 'n_threads'
+    """
+    cache_path = Path(cache_path) if cache_path else default_autotune_path()
+    key = host_key(model_path, use_gpu, n_cpus)
+
+    cache = {}
+    if cache_path.exists():
+        try:
+            cache = json.loads(cache_path.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable autotune cache {cache_path}: {e}")
+
+    if not force and key in cache:
+        config = cache[key]
+        logger.info(f"Using tuned configuration from {cache_path}: "
+                    f"pool_size={config['pool_size']}, n_threads={config['n_threads']}")
+        return config
+
+    start = time.time()
+    config = run_autotune(model_path, audio, use_gpu=use_gpu, candidates=candidate_configs(n_cpus))
+    logger.info(f"Autotune finished in {time.time() - start:.1f}s: "
+                f"pool_size={config['pool_size']}, n_threads={config['n_threads']}")
+
+    cache[key] = config
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(cache, indent=2))
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Failed to save autotune cache {cache_path}: {e}")
+
+    return config
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Confidence scores computed from token-level engine results
+avg_logprob, no-speech probability and per-word confidence
+"""
+
+from typing import Dict, List
+
+import numpy as np
+
+
+def is_word_start(text: bytes) -> bool:
+    """Whether a token begins a new word"""
+    if not text:
+        return False
+    # Continuation byte: the rest of a character split across tokens
+    if text[0] & 0xC0 == 0x80:
+        return False
+    # Leading space in English and other space-delimited scripts; every token
+    # stands alone in scripts written without spaces (kana, CJK from U+3000 up)
+    return text[:1] == b' ' or text[0] >= 0xE3
+
+
+def group_words(tokens: np.ndarray, texts: List[bytes]) -> List[Dict]:
+    """
+    Merge the tokens of a segment into words
+
+    Returns:
+        One dict per word: text, t0/t1 in seconds and probability (mean of
+        the token probabilities)
+    """
+    words = []
+    start = 0
+    for end in range(1, len(texts) + 1):
+        if end < len(texts) and not is_word_start(texts[end]):
+            continue
+        text = b''.join(texts[start:end]).decode('utf-8', 'replace').strip()
+        if text:
+            word_tokens = tokens[start:end]
+            words.append({
+                'word': text,
+                't0': int(word_tokens['t0'][0]) / 100.0,
+                't1': int(word_tokens['t1'][-1]) / 100.0,
+                'probability': round(float(word_tokens['p'].mean()), 4)
+            })
+        start = end
+    return words
+
+
+def score_transcript(result: Dict) -> Dict:
+    """
+    Summarize an engine result transcribed with token_data
+
+    Returns:
+        Dictionary with JSON-ready 'segments' (token arrays replaced by
+        avg_logprob), 'words', the token-weighted 'avg_logprob' and
+        'no_speech_prob' (lowest over the segments: speech anywhere counts)
+    """
+    segments = []
+    words = []
+    plogs = []
+    for segment in result['segments']:
+        tokens = segment.get('tokens')
+        entry = {
+            'text': segment['text'],
+            't0': segment['t0'],
+            't1': segment['t1'],
+            'no_speech_prob': round(segment.get('no_speech_prob', 0.0), 4)
+        }
+        if tokens is not None and len(tokens):
+            entry['avg_logprob'] = round(float(tokens['plog'].mean()), 4)
+            plogs.append(tokens['plog'])
+            words.extend(group_words(tokens, segment['token_texts']))
+        segments.append(entry)
+
+    all_plogs = np.concatenate(plogs) if plogs else np.zeros(0, dtype=np.float32)
+    return {
+        'segments': segments,
+        'words': words,
+        'avg_logprob': round(float(all_plogs.mean()), 4) if len(all_plogs) else 0.0,
+        'no_speech_prob': min(entry['no_speech_prob'] for entry in segments) if segments else 1.0
+    }
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Inference engine interface
+The ctypes whisper.cpp engine and a deterministic fake one for load testing
+"""
+
+import logging
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import ContextManager, Dict, List, Optional, Protocol, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ('whispercpp', 'fake')
+
+# Models the fake engine pretends to have when no model files are present
+FAKE_MODEL_NAMES = ('tiny', 'base', 'small', 'medium', 'large-v3', 'large-v3-turbo')
+
+SAMPLE_RATE = 16000
+
+# The fake engine starts a new segment after this much digital silence
+FAKE_PAUSE_SECONDS = 0.5
+
+# Per-token results, laid out like whisper.cpp's whisper_token_data so the
+# ctypes engine can fill it without per-field conversions. Times are in
+# centiseconds; p/plog are the sampled token's probability and log-probability.
+TOKEN_DTYPE = np.dtype({
+    'names': ['id', 'tid', 'p', 'plog', 'pt', 'ptsum', 't0', 't1', 't_dtw', 'vlen'],
+    'formats': ['<i4', '<i4', '<f4', '<f4', '<f4', '<f4', '<i8', '<i8', '<i8', '<f4'],
+    'offsets': [0, 4, 8, 12, 16, 20, 24, 32, 40, 48],
+    'itemsize': 56
+})
+
+
+class Engine(Protocol):
+    """What the registry and server need from a loaded model"""
+
+    # Decoding states; one transcription runs on a state at a time
+    states: List
+
+    def borrow_state(self) -> ContextManager:
+        ...
+
+    def transcribe(self, audio: np.ndarray, language: Optional[str] = None, n_threads: int = 4,
+                   audio_ctx: int = 0, beam_size: int = 0, token_data: bool = False,
+                   temperature_inc: Optional[float] = None,
+                   mel: Optional[Tuple[np.ndarray, int]] = None) -> Dict:
+        """
+        Args:
+            mel: Precomputed (mel, n_len_org) of the audio (see mel.py); engines
+                without a mel input decode the audio instead
+
+        Returns:
+            'text', 'language' and 'segments' (text, t0, t1 in seconds, no_speech_prob);
+            with token_data every segment also has 'tokens' (TOKEN_DTYPE array of its
+            text tokens) and 'token_texts' (raw UTF-8 bytes of each token)
+        """
+        ...
+
+    def transcribe_with_state(self, state, audio: np.ndarray, language: Optional[str] = None,
+                              n_threads: int = 4, audio_ctx: int = 0, beam_size: int = 0,
+                              token_data: bool = False, temperature_inc: Optional[float] = None,
+                              mel: Optional[Tuple[np.ndarray, int]] = None) -> Dict:
+        ...
+
+    def detect_language(self, audio: np.ndarray, n_threads: int = 4) -> Tuple[str, float]:
+        ...
+
+    def timings(self) -> Dict[str, float]:
+        ...
+
+    def reset_timings(self):
+        ...
+
+    def close(self):
+        ...
+
+
+class FakeEngine:
+    """
+    Deterministic stand-in for WhisperModel
+
+    Each transcription sleeps for latency + rtf * audio duration (releasing the
+    GIL like the native call does) and returns a transcript derived only from the
+    audio length and its pauses, so the server's own overhead and concurrency can
+    be measured on any machine without libwhisper or model files.
+    """
+
+    def __init__(self, model_path: str, n_states: int = 1, rtf: float = 0.05, latency: float = 0.02,
+                 language: str = 'en'):
+        """
+        Initialize the fake engine
+
+        Args:
+            model_path: Model the engine stands in for (only used in its output)
+            n_states: Number of transcriptions that can run concurrently
+            rtf: Simulated compute seconds per second of audio
+            latency: Simulated fixed cost per call in seconds
+            language: Language reported when auto-detection is requested
+        """
+        self.model_path = model_path
+        self.rtf = rtf
+        self.latency = latency
+        self.language = language
+
+        # Same shape as WhisperModel: None stands for the default state
+        self.states: List = [None] + list(range(1, n_states))
+        self._idle_states = queue.Queue()
+        for state in self.states:
+            self._idle_states.put(state)
+
+        self._timings_lock = threading.Lock()
+        self._calls = 0
+        self._compute_ms = 0.0
+
+    @contextmanager
+    def borrow_state(self):
+        """Context manager lending an idle state, blocking until one is free"""
+        state = self._idle_states.get()
+        try:
+            yield state
+        finally:
+            self._idle_states.put(state)
+
+    def transcribe(self, audio: np.ndarray, language: Optional[str] = None, n_threads: int = 4,
+                   audio_ctx: int = 0, beam_size: int = 0, token_data: bool = False,
+                   temperature_inc: Optional[float] = None,
+                   mel: Optional[Tuple[np.ndarray, int]] = None) -> Dict:
+        with self.borrow_state() as state:
+            return self.transcribe_with_state(state, audio, language=language, n_threads=n_threads,
+                                              audio_ctx=audio_ctx, beam_size=beam_size, token_data=token_data,
+                                              temperature_inc=temperature_inc, mel=mel)
+
+    def transcribe_with_state(self, state, audio: np.ndarray, language: Optional[str] = None,
+                              n_threads: int = 4, audio_ctx: int = 0, beam_size: int = 0,
+                              token_data: bool = False, temperature_inc: Optional[float] = None,
+                              mel: Optional[Tuple[np.ndarray, int]] = None) -> Dict:
+        duration = len(audio) / SAMPLE_RATE
+        compute = self.latency + self.rtf * duration
+        time.sleep(compute)
+
+        with self._timings_lock:
+            self._calls += 1
+            self._compute_ms += compute * 1000
+
+        # One segment per stretch of sound and 30s window, like whisper's chunking
+        segments = []
+        for start, end in self._sound_stretches(audio):
+            t0 = start
+            while t0 < end:
+                t1 = min(end, t0 + 30.0)
+                segment = {'text': f" Fake transcript from {t0:.2f}s to {t1:.2f}s.", 't0': t0, 't1': t1,
+                           'no_speech_prob': 0.0}
+                if token_data:
+                    self._add_tokens(segment)
+                segments.append(segment)
+                t0 = t1
+
+        return {
+            'text': ''.join(segment['text'] for segment in segments).strip(),
+            'segments': segments,
+            'language': self.language if not language or language == 'auto' else language
+        }
+
+    @staticmethod
+    def _sound_stretches(audio: np.ndarray) -> List[Tuple[float, float]]:
+        """(start, end) in seconds of the audio between runs of FAKE_PAUSE_SECONDS of exact zeros"""
+        nonzero = np.flatnonzero(audio)
+        if not len(nonzero):
+            return []
+        breaks = np.flatnonzero(np.diff(nonzero) > FAKE_PAUSE_SECONDS * SAMPLE_RATE)
+        starts = np.concatenate([[nonzero[0]], nonzero[breaks + 1]])
+        ends = np.concatenate([nonzero[breaks] + 1, [nonzero[-1] + 1]])
+        # Continuous audio keeps its full length, as before
+        if len(starts) == 1:
+            return [(0.0, len(audio) / SAMPLE_RATE)]
+        return [(s / SAMPLE_RATE, e / SAMPLE_RATE) for s, e in zip(starts, ends)]
+
+    @staticmethod
+    def _add_tokens(segment: dict):
+        """One token per word, spread evenly over the segment, with fixed confidence"""
+        words = [f" {word}".encode('utf-8') for word in segment['text'].split()]
+        tokens = np.zeros(len(words), dtype=TOKEN_DTYPE)
+        edges = np.linspace(segment['t0'] * 100, segment['t1'] * 100, len(words) + 1).astype(np.int64)
+        tokens['id'] = np.arange(len(words))
+        tokens['p'] = 0.9
+        tokens['plog'] = np.log(np.float32(0.9))
+        tokens['t0'] = edges[:-1]
+        tokens['t1'] = edges[1:]
+        segment['tokens'] = tokens
+        segment['token_texts'] = words
+
+    def detect_language(self, audio: np.ndarray, n_threads: int = 4) -> Tuple[str, float]:
+        time.sleep(self.latency)
+        return self.language, 1.0
+
+    def timings(self) -> Dict[str, float]:
+        with self._timings_lock:
+            encode_ms = self._compute_ms / self._calls if self._calls else 0.0
+        return {'sample_ms': 0.0, 'encode_ms': encode_ms, 'decode_ms': 0.0, 'batchd_ms': 0.0, 'prompt_ms': 0.0}
+
+    def reset_timings(self):
+        with self._timings_lock:
+            self._calls = 0
+            self._compute_ms = 0.0
+
+    def close(self):
+        self.states = []
+
+
+def gpu_backend(engine: str, use_gpu: bool) -> Optional[str]:
+    """GPU API an engine runs on (whisper.cpp uses Metal on macOS), None on the CPU"""
+    if engine == 'whispercpp' and use_gpu and sys.platform == 'darwin':
+        return 'Metal'
+    return None
+
+
+def load_engine(engine: str, model_path: str, use_gpu: bool = True, n_states: int = 1,
+                use_mmap: bool = False, options: Optional[dict] = None, isolated: bool = False) -> Engine:
+    """
+    Load a model with the given engine
+
+    Args:
+        engine: One of ENGINES
+        model_path: Path to the .bin model file
+        use_gpu: Whether to use GPU acceleration (whisper.cpp only)
+        n_states: Number of decoding states
+        use_mmap: Read the model file through a memory mapping while loading (whisper.cpp only)
+        options: Engine specific keyword arguments (e.g. rtf and latency for 'fake')
+        isolated: Run every state in a supervised worker process (see isolated_engine.py)
+    """
+    options = options or {}
+    if isolated:
+        # Imported lazily: the workers import this module again
+        from isolated_engine import IsolatedEngine
+        return IsolatedEngine(engine, model_path, use_gpu=use_gpu, n_states=n_states, use_mmap=use_mmap,
+                              options=options)
+    if engine == 'fake':
+        return FakeEngine(model_path, n_states=n_states, **options)
+    if engine == 'whispercpp':
+        # Imported lazily: loading the wrapper requires libwhisper
+        from whisper_wrapper import WhisperModel
+        return WhisperModel(model_path, use_gpu=use_gpu, n_states=n_states, use_mmap=use_mmap, **options)
+    raise ValueError(f"Unknown engine '{engine}', expected one of {', '.join(ENGINES)}")
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Confidence-gated fallback decoding
+One greedy pass without temperature fallback, then beam-search re-decodes of
+low-confidence segments within a per-session time budget
+"""
+
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from audio_utils import AUDIO_CTX_MAX, audio_ctx_for
+from engine import SAMPLE_RATE, Engine
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_MODES = ('confidence', 'whisper', 'off')
+
+# Audio kept on each side of a segment when it is re-decoded on its own
+SEGMENT_PAD_SECONDS = 0.2
+
+# A beam-search re-decode of a segment is assumed to cost this many times the
+# greedy pass over the same audio when checking it against the remaining budget
+BEAM_COST_FACTOR = 3.0
+
+# Audio covered by one encoder window
+WINDOW_SECONDS = 30.0
+
+
+class FallbackPolicy:
+    """When and how low-confidence segments are re-decoded"""
+
+    def __init__(self, mode: str = 'confidence', logprob_threshold: float = -1.0,
+                 no_speech_threshold: float = 0.6, beam_size: int = 5, budget_seconds: float = 1.0):
+        """
+        Initialize the policy
+
+        Args:
+            mode: 'confidence' (greedy, then gated re-decodes), 'whisper' (whisper.cpp's
+                own temperature fallback on every segment) or 'off'
+            logprob_threshold: Segments with a lower avg_logprob are re-decoded
+            no_speech_threshold: Segments more likely than this to be silence are not
+            beam_size: Beam width of the re-decodes
+            budget_seconds: Time a session may spend on re-decodes
+        """
+        if mode not in FALLBACK_MODES:
+            raise ValueError(f"Unknown fallback mode '{mode}', expected one of {', '.join(FALLBACK_MODES)}")
+        self.mode = mode
+        self.logprob_threshold = logprob_threshold
+        self.no_speech_threshold = no_speech_threshold
+        self.beam_size = beam_size
+        self.budget_seconds = budget_seconds
+
+    @property
+    def temperature_inc(self) -> Optional[float]:
+        """temperature_inc of the first pass (None keeps the library default)"""
+        return None if self.mode == 'whisper' else 0.0
+
+    def needs_retry(self, segment: Dict) -> bool:
+        tokens = segment.get('tokens')
+        if tokens is None or not len(tokens):
+            return False
+        if segment.get('no_speech_prob', 0.0) > self.no_speech_threshold:
+            return False
+        return float(tokens['plog'].mean()) < self.logprob_threshold
+
+
+def segment_logprob(segment: Dict) -> float:
+    tokens = segment.get('tokens')
+    return float(tokens['plog'].mean()) if tokens is not None and len(tokens) else 0.0
+
+
+def shift_segment(segment: Dict, offset: float) -> Dict:
+    """Move a segment decoded from a slice back onto the session's timeline"""
+    segment['t0'] += offset
+    segment['t1'] += offset
+    tokens = segment.get('tokens')
+    if tokens is not None:
+        tokens = tokens.copy()
+        tokens['t0'] += int(round(offset * 100))
+        tokens['t1'] += int(round(offset * 100))
+        segment['tokens'] = tokens
+    return segment
+
+
+def transcribe_with_fallback(model: Engine, audio: np.ndarray, policy: FallbackPolicy,
+                             language: Optional[str] = None, n_threads: int = 4,
+                             dynamic_audio_ctx: bool = False,
+                             mel: Optional[Tuple[np.ndarray, int]] = None) -> Dict:
+    """
+    Transcribe audio and re-decode low-confidence segments within the policy's budget
+
+    With dynamic_audio_ctx, every decode uses an encoder context sized to its audio
+    instead of the full 30s window. A precomputed mel of the audio (see mel.py)
+    feeds the first pass; re-decodes of slices compute their own.
+
+    Returns:
+        The engine result (with token data), plus 'retries' describing every
+        re-decoded segment and 'retry_seconds' spent on them
+    """
+    start = time.time()
+    audio_ctx = audio_ctx_for(len(audio)) if dynamic_audio_ctx else 0
+    result = model.transcribe(audio, language=language, n_threads=n_threads, token_data=True,
+                              temperature_inc=policy.temperature_inc, audio_ctx=audio_ctx, mel=mel)
+    first_pass = time.time() - start
+    result['retries'] = []
+    result['retry_seconds'] = 0.0
+
+    if policy.mode != 'confidence':
+        return result
+
+    # Every call encodes at least one full window of its audio_ctx, however little
+    # audio it holds, so a re-decode is costed per window rather than per second
+    duration = len(audio) / SAMPLE_RATE
+    seconds_per_window = first_pass / max(1, -(-duration // WINDOW_SECONDS))
+    first_ctx = audio_ctx or AUDIO_CTX_MAX
+
+    # Worst segments first, so the budget goes where it helps most
+    segments: List[Dict] = result['segments']
+    candidates = sorted(
+        (i for i, segment in enumerate(segments) if policy.needs_retry(segment)),
+        key=lambda i: segment_logprob(segments[i])
+    )
+    if not candidates:
+        return result
+
+    # Segments are re-decoded in the detected language, skipping detection
+    retry_language = result.get('language') if not language else language
+    replacements: Dict[int, List[Dict]] = {}
+    spent = 0.0
+    for index in candidates:
+        segment = segments[index]
+        t0 = max(0.0, segment['t0'] - SEGMENT_PAD_SECONDS)
+        t1 = min(duration, segment['t1'] + SEGMENT_PAD_SECONDS)
+        retry_audio = audio[int(t0 * SAMPLE_RATE):int(t1 * SAMPLE_RATE)]
+        retry_ctx = audio_ctx_for(len(retry_audio)) if dynamic_audio_ctx else 0
+        estimate = seconds_per_window * (retry_ctx or AUDIO_CTX_MAX) / first_ctx * BEAM_COST_FACTOR
+        if spent + estimate > policy.budget_seconds:
+            logger.debug(f"Skipping re-decode of segment {index}: budget exhausted")
+            continue
+
+        retry_start = time.time()
+        retry = model.transcribe(
+            retry_audio,
+            language=retry_language,
+            n_threads=n_threads,
+            audio_ctx=retry_ctx,
+            beam_size=policy.beam_size,
+            token_data=True,
+            temperature_inc=0.0
+        )
+        cost = time.time() - retry_start
+        spent += cost
+
+        before = segment_logprob(segment)
+        retry_tokens = [s['tokens'] for s in retry['segments'] if s.get('tokens') is not None and len(s['tokens'])]
+        after = float(np.concatenate(retry_tokens)['plog'].mean()) if retry_tokens else before
+        accepted = bool(retry_tokens) and after > before
+        if accepted:
+            replacements[index] = [shift_segment(s, t0) for s in retry['segments']]
+
+        result['retries'].append({
+            'segment': index,
+            't0': segment['t0'],
+            't1': segment['t1'],
+            'avg_logprob_before': round(before, 4),
+            'avg_logprob_after': round(after, 4),
+            'accepted': accepted,
+            'seconds': round(cost, 4)
+        })
+
+    if replacements:
+        merged = []
+        for i, segment in enumerate(segments):
+            merged.extend(replacements.get(i, [segment]))
+        result['segments'] = merged
+        result['text'] = ''.join(segment['text'] for segment in merged).strip()
+
+    result['retry_seconds'] = round(spent, 4)
+    logger.info(f"Re-decoded {len(result['retries'])}/{len(candidates)} low-confidence segments "
+                f"({len(replacements)} improved) in {spent:.2f}s")
+    return result
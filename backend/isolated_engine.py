@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Crash-isolated inference
+Runs every decoding state of a model in its own supervised worker process, so
+a segfault or abort in native code costs one retried job instead of the server
+"""
+
+import logging
+import multiprocessing
+import queue
+import signal
+import threading
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from engine import load_engine
+
+logger = logging.getLogger(__name__)
+
+# Workers start from a fresh interpreter: forking a process that already runs
+# Metal, ggml and executor threads is not safe
+CONTEXT = multiprocessing.get_context('spawn')
+
+# Shared audio segments start at 30s of float32 and grow by doubling
+INITIAL_SEGMENT_BYTES = 30 * 16000 * 4
+
+# Runs of a job interrupted by a worker crash (the first run and one retry)
+JOB_ATTEMPTS = 2
+
+# Seconds a worker gets to exit after 'close' before it is killed
+CLOSE_TIMEOUT_SECONDS = 5.0
+
+# Exceptions re-raised with their own type in the server; others become RuntimeError
+WORKER_EXCEPTIONS = {cls.__name__: cls for cls in (ValueError, RuntimeError, OSError, FileNotFoundError)}
+
+
+class WorkerCrashed(Exception):
+    """The worker process died while handling a request"""
+
+
+def _worker_main(conn, engine: str, model_path: str, use_gpu: bool, use_mmap: bool, options: dict):
+    """Entry point of a worker process: load one state of the model and serve requests"""
+    # Ctrl-C reaches the whole process group; the server decides when workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    try:
+        model = load_engine(engine, model_path, use_gpu=use_gpu, n_states=1, use_mmap=use_mmap, options=options)
+    except Exception as e:
+        conn.send(('error', type(e).__name__, str(e)))
+        return
+    conn.send(('ready',))
+
+    segment: Optional[shared_memory.SharedMemory] = None
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            # The server is gone
+            break
+        command = message[0]
+        if command == 'close':
+            break
+
+        audio = mel = None
+        try:
+            if command in ('transcribe', 'detect_language'):
+                _, name, audio_spec, mel_spec, kwargs = message
+                if segment is None or segment.name != name:
+                    if segment is not None:
+                        segment.close()
+                    # Workers share the server's resource tracker, which unlinks the
+                    # segment if the server dies without doing so itself
+                    segment = shared_memory.SharedMemory(name=name)
+                audio = np.ndarray(audio_spec[1], dtype=audio_spec[0], buffer=segment.buf)
+                if command == 'detect_language':
+                    reply = ('ok', model.detect_language(audio, **kwargs))
+                else:
+                    if mel_spec is not None:
+                        offset, shape, n_len_org = mel_spec
+                        mel = (np.ndarray(shape, dtype=np.float32, buffer=segment.buf, offset=offset), n_len_org)
+                    reply = ('ok', model.transcribe(audio, mel=mel, **kwargs))
+            elif command == 'timings':
+                reply = ('ok', model.timings())
+            elif command == 'reset_timings':
+                model.reset_timings()
+                reply = ('ok', None)
+            else:
+                reply = ('error', 'ValueError', f"Unknown worker command '{command}'")
+        except Exception as e:
+            reply = ('error', type(e).__name__, str(e))
+        # Views into the segment must go before it can be closed
+        audio = mel = None
+        conn.send(reply)
+
+    if segment is not None:
+        segment.close()
+    model.close()
+
+
+class WorkerProcess:
+    """One decoding state: a worker process, its pipe and the shared segment carrying its audio"""
+
+    def __init__(self, index: int, engine: str, model_path: str, use_gpu: bool, use_mmap: bool, options: dict):
+        self.index = index
+        self.args = (engine, model_path, use_gpu, use_mmap, options)
+        self.lock = threading.Lock()
+        self.segment: Optional[shared_memory.SharedMemory] = None
+        self.process = None
+        self.conn = None
+        self.restarts = 0
+        self.start()
+
+    def start(self):
+        """Spawn the worker and wait until its model is loaded"""
+        conn, child_conn = CONTEXT.Pipe()
+        self.process = CONTEXT.Process(target=_worker_main, args=(child_conn,) + self.args,
+                                       name=f"inference-worker-{self.index}", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.conn = conn
+
+        try:
+            reply = conn.recv()
+        except EOFError:
+            self.process.join()
+            raise RuntimeError(f"Inference worker {self.index} exited with {self.process.exitcode} while loading "
+                               f"{self.args[1]}")
+        if reply[0] == 'error':
+            self.stop()
+            raise WORKER_EXCEPTIONS.get(reply[1], RuntimeError)(reply[2])
+        logger.info(f"Inference worker {self.index} ready (pid {self.process.pid})")
+
+    def restart(self):
+        self.stop()
+        self.restarts += 1
+        self.start()
+
+    def stop(self):
+        """Ask the worker to exit, killing it if it doesn't"""
+        if self.process is None:
+            return
+        try:
+            self.conn.send(('close',))
+        except OSError:
+            pass
+        self.process.join(CLOSE_TIMEOUT_SECONDS)
+        if self.process.is_alive():
+            logger.warning(f"Inference worker {self.index} did not exit, killing it")
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+        self.process = None
+
+    def stage(self, audio: np.ndarray, mel: Optional[Tuple[np.ndarray, int]]) -> tuple:
+        """
+        Copy audio (and a mel) into the shared segment
+
+        Returns:
+            The request fields describing them: (segment name, audio spec, mel spec)
+        """
+        audio = np.ascontiguousarray(audio)
+        mel_offset = -(-audio.nbytes // 64) * 64
+        size = mel_offset + (mel[0].nbytes if mel is not None else 0)
+        if self.segment is None or self.segment.size < size:
+            self.release_segment()
+            capacity = INITIAL_SEGMENT_BYTES
+            while capacity < size:
+                capacity *= 2
+            self.segment = shared_memory.SharedMemory(create=True, size=capacity)
+
+        np.ndarray(audio.shape, dtype=audio.dtype, buffer=self.segment.buf)[:] = audio
+        mel_spec = None
+        if mel is not None:
+            frames = np.ascontiguousarray(mel[0], dtype=np.float32)
+            np.ndarray(frames.shape, dtype=np.float32, buffer=self.segment.buf, offset=mel_offset)[:] = frames
+            mel_spec = (mel_offset, frames.shape, mel[1])
+        return self.segment.name, (audio.dtype.str, len(audio)), mel_spec
+
+    def request(self, message: tuple):
+        """Send a request and wait for its reply (the caller holds the lock)"""
+        try:
+            self.conn.send(message)
+            reply = self.conn.recv()
+        except (EOFError, OSError) as e:
+            self.process.join(CLOSE_TIMEOUT_SECONDS)
+            raise WorkerCrashed(f"exit code {self.process.exitcode}") from e
+        if reply[0] == 'error':
+            raise WORKER_EXCEPTIONS.get(reply[1], RuntimeError)(reply[2])
+        return reply[1]
+
+    def release_segment(self):
+        if self.segment is not None:
+            self.segment.close()
+            self.segment.unlink()
+            self.segment = None
+
+
+class IsolatedEngine:
+    """
+    Engine whose states are worker processes, each holding its own copy of the model
+
+    Audio and mels reach a worker through shared memory, results come back over a
+    pipe. A worker that dies mid-job is restarted and the job is run once more.
+    Every worker loads its own copy of the weights (use_mmap only changes how the
+    file is read, not what stays resident).
+    """
+
+    def __init__(self, engine: str, model_path: str, use_gpu: bool = True, n_states: int = 1,
+                 use_mmap: bool = False, options: Optional[dict] = None):
+        """
+        Start the workers
+
+        Args:
+            engine: Engine loaded inside the workers (see load_engine)
+            model_path: Path to the .bin model file
+            use_gpu: Whether the workers use GPU acceleration
+            n_states: Number of worker processes (concurrent transcriptions)
+            use_mmap: Read the model file through a memory mapping while loading
+            options: Engine specific keyword arguments
+        """
+        self.model_path = model_path
+        self.states: List[WorkerProcess] = []
+        try:
+            for index in range(n_states):
+                self.states.append(WorkerProcess(index, engine, model_path, use_gpu, use_mmap, options or {}))
+        except Exception:
+            self.close()
+            raise
+
+        self._idle_states = queue.Queue()
+        for state in self.states:
+            self._idle_states.put(state)
+
+    @contextmanager
+    def borrow_state(self):
+        """Context manager lending an idle worker, blocking until one is free"""
+        state = self._idle_states.get()
+        try:
+            yield state
+        finally:
+            self._idle_states.put(state)
+
+    def _run(self, worker: WorkerProcess, command: str, audio: np.ndarray,
+             mel: Optional[Tuple[np.ndarray, int]], kwargs: dict):
+        """Run a job on a worker, restarting it and retrying once if it crashes"""
+        with worker.lock:
+            for attempt in range(1, JOB_ATTEMPTS + 1):
+                name, audio_spec, mel_spec = worker.stage(audio, mel)
+                try:
+                    return worker.request((command, name, audio_spec, mel_spec, kwargs))
+                except WorkerCrashed as e:
+                    logger.error(f"Inference worker {worker.index} crashed ({e}) during {command}, "
+                                 f"attempt {attempt} of {JOB_ATTEMPTS}; restarting it")
+                    worker.restart()
+                    if attempt == JOB_ATTEMPTS:
+                        raise RuntimeError(f"Inference worker crashed {JOB_ATTEMPTS} times on the same job") from e
+
+    def transcribe(self, audio: np.ndarray, language: Optional[str] = None, n_threads: int = 4,
+                   audio_ctx: int = 0, beam_size: int = 0, token_data: bool = False,
+                   temperature_inc: Optional[float] = None,
+                   mel: Optional[Tuple[np.ndarray, int]] = None) -> Dict:
+        with self.borrow_state() as state:
+            return self.transcribe_with_state(state, audio, language=language, n_threads=n_threads,
+                                              audio_ctx=audio_ctx, beam_size=beam_size, token_data=token_data,
+                                              temperature_inc=temperature_inc, mel=mel)
+
+    def transcribe_with_state(self, state: WorkerProcess, audio: np.ndarray, language: Optional[str] = None,
+                              n_threads: int = 4, audio_ctx: int = 0, beam_size: int = 0,
+                              token_data: bool = False, temperature_inc: Optional[float] = None,
+                              mel: Optional[Tuple[np.ndarray, int]] = None) -> Dict:
+        kwargs = {'language': language, 'n_threads': n_threads, 'audio_ctx': audio_ctx, 'beam_size': beam_size,
+                  'token_data': token_data, 'temperature_inc': temperature_inc}
+        return self._run(state, 'transcribe', audio, mel, kwargs)
+
+    def detect_language(self, audio: np.ndarray, n_threads: int = 4) -> Tuple[str, float]:
+        with self.borrow_state() as state:
+            return self._run(state, 'detect_language', audio, None, {'n_threads': n_threads})
+
+    def timings(self) -> Dict[str, float]:
+        """Timings of the first worker, the counterpart of WhisperModel's default state"""
+        worker = self.states[0]
+        with worker.lock:
+            return worker.request(('timings',))
+
+    def reset_timings(self):
+        worker = self.states[0]
+        with worker.lock:
+            worker.request(('reset_timings',))
+
+    def close(self):
+        """Stop the workers and remove their shared segments"""
+        for worker in self.states:
+            with worker.lock:
+                worker.stop()
+                worker.release_segment()
+        self.states = []
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Log-mel spectrogram matching whisper.cpp's, computed incrementally while audio streams in
+The finished mel is handed to whisper.cpp with whisper_set_mel, so the STFT is no
+longer a serial step between end_session and the encoder
+"""
+
+import struct
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from engine import SAMPLE_RATE
+
+N_FFT = 400
+HOP_LENGTH = 160
+N_FREQ = N_FFT // 2 + 1
+
+# whisper.cpp reflects N_FFT / 2 samples at the start and appends 30s of zeros
+REFLECT_PAD = N_FFT // 2
+PAD_SAMPLES = 30 * SAMPLE_RATE
+
+# log10 of the power floor: the value of every all-zero frame
+LOG_FLOOR = -10.0
+
+# Frames are computed in batches of at least this many as chunks arrive
+BATCH_FRAMES = 16
+
+# Periodic Hann window, as whisper.cpp builds it
+HANN = (0.5 * (1.0 - np.cos(2.0 * np.pi * np.arange(N_FFT) / N_FFT))).astype(np.float32)
+
+GGML_MAGIC = 0x67676d6c
+
+# n_vocab, n_audio_ctx, n_audio_state, n_audio_head, n_audio_layer, n_text_ctx,
+# n_text_state, n_text_head, n_text_layer, n_mels, ftype
+GGML_HPARAMS = struct.Struct('<11i')
+
+
+@lru_cache(maxsize=8)
+def load_mel_filters(path: str, n_mels: int = 80) -> np.ndarray:
+    """
+    Mel filterbank of a model, shape (n_mels, N_FREQ)
+
+    Args:
+        path: A ggml model file (the filters follow its hyperparameters) or a
+            mel_filters.npz with 'mel_80' / 'mel_128' arrays
+        n_mels: Filterbank to take from an .npz (model files say so themselves)
+    """
+    if path.endswith('.npz'):
+        with np.load(path) as npz:
+            return np.ascontiguousarray(npz[f'mel_{n_mels}'], dtype=np.float32)
+
+    with open(path, 'rb') as f:
+        magic, = struct.unpack('<I', f.read(4))
+        if magic != GGML_MAGIC:
+            raise ValueError(f"Not a ggml whisper model: {path}")
+        f.read(GGML_HPARAMS.size)
+        n_mel, n_fft = struct.unpack('<2i', f.read(8))
+        if n_fft != N_FREQ:
+            raise ValueError(f"Unexpected mel filterbank size {n_mel}x{n_fft} in {path}")
+        filters = np.frombuffer(f.read(4 * n_mel * n_fft), dtype='<f4')
+    return filters.reshape(n_mel, n_fft).copy()
+
+
+def log_mel_frames(stream: np.ndarray, n_frames: int, filters: np.ndarray) -> np.ndarray:
+    """
+    Unnormalized log10 mel power of consecutive frames
+
+    Args:
+        stream: Padded samples; frame i covers stream[i * HOP_LENGTH:i * HOP_LENGTH + N_FFT]
+        n_frames: Frames to compute
+        filters: Mel filterbank (n_mels, N_FREQ)
+
+    Returns:
+        Array of shape (n_mels, n_frames)
+    """
+    windows = np.lib.stride_tricks.sliding_window_view(stream, N_FFT)[::HOP_LENGTH][:n_frames]
+    spectrum = np.fft.rfft(windows * HANN, axis=1)
+    power = spectrum.real ** 2 + spectrum.imag ** 2
+    mel = filters.astype(np.float64) @ power.T
+    return np.log10(np.maximum(mel, 1e-10)).astype(np.float32)
+
+
+class IncrementalMel:
+    """Log-mel frames of a session's audio, computed as chunks arrive"""
+
+    def __init__(self, filters: np.ndarray):
+        """
+        Initialize an empty spectrogram
+
+        Args:
+            filters: Mel filterbank of the session's model (see load_mel_filters)
+        """
+        self.filters = filters
+        self.n_mels = filters.shape[0]
+        self.n_samples = 0
+        self.frames: List[np.ndarray] = []
+        self.n_frames = 0
+        # Samples of the padded stream not yet covered by a computed frame;
+        # None until there are enough for the reflection at the start
+        self.pending: Optional[np.ndarray] = None
+        self.head: List[np.ndarray] = []
+
+    def append(self, audio: np.ndarray):
+        """Add int16 PCM or float samples and compute every frame they complete"""
+        if audio.dtype == np.int16:
+            audio = audio.astype(np.float32) * (1.0 / 32768.0)
+        self.n_samples += len(audio)
+
+        if self.pending is None:
+            self.head.append(audio.astype(np.float32))
+            if self.n_samples <= REFLECT_PAD:
+                return
+            samples = np.concatenate(self.head)
+            self.head = []
+            self.pending = np.concatenate([samples[1:REFLECT_PAD + 1][::-1], samples])
+        else:
+            self.pending = np.concatenate([self.pending, audio.astype(np.float32)])
+
+        ready = (len(self.pending) - N_FFT) // HOP_LENGTH + 1
+        if ready >= BATCH_FRAMES:
+            self.frames.append(log_mel_frames(self.pending, ready, self.filters))
+            self.n_frames += ready
+            self.pending = self.pending[ready * HOP_LENGTH:]
+
+    def finalize(self, start: int = 0, end: Optional[int] = None) -> Optional[Tuple[np.ndarray, int]]:
+        """
+        Normalized mel of audio[start:end], laid out like whisper.cpp's own
+
+        The last frames are computed against trailing zeros and the 30s of padding
+        frames are appended, as whisper_pcm_to_mel does. For a sub-range the frames
+        at its edges see the neighbouring audio instead of padding.
+
+        Args:
+            start: First sample; must fall on a frame boundary (multiple of HOP_LENGTH)
+            end: End sample (default: all audio received)
+
+        Returns:
+            (mel, n_len_org): float32 array of shape (n_mels, n_len), and the number
+            of frames covering actual audio; None if the range can't be served
+        """
+        end = self.n_samples if end is None else end
+        length = end - start
+        if self.pending is None or start % HOP_LENGTH or length <= 0 or end > self.n_samples:
+            return None
+
+        # Frames reaching past the received audio see zeros
+        tail_stream = np.concatenate([self.pending, np.zeros(N_FFT, dtype=np.float32)])
+        n_tail = max(0, -(-(REFLECT_PAD + self.n_samples) // HOP_LENGTH) - self.n_frames)
+        tail = log_mel_frames(tail_stream, n_tail, self.filters)
+        computed = np.concatenate(self.frames + [tail], axis=1)
+
+        first = start // HOP_LENGTH
+        n_audio_frames = -(-(REFLECT_PAD + length) // HOP_LENGTH)
+        n_len = (length + PAD_SAMPLES) // HOP_LENGTH
+        mel = np.full((self.n_mels, n_len), LOG_FLOOR, dtype=np.float32)
+        audio_frames = computed[:, first:first + min(n_audio_frames, n_len)]
+        mel[:, :audio_frames.shape[1]] = audio_frames
+
+        # whisper.cpp's normalization: clamp to 8 below the peak, then scale
+        np.maximum(mel, mel.max() - 8.0, out=mel)
+        mel += 4.0
+        mel /= 4.0
+        return mel, 1 + (length + REFLECT_PAD - N_FFT) // HOP_LENGTH
+
+
+def log_mel_spectrogram(audio: np.ndarray, filters: np.ndarray) -> Optional[Tuple[np.ndarray, int]]:
+    """Whole-clip equivalent of IncrementalMel (see IncrementalMel.finalize)"""
+    mel = IncrementalMel(filters)
+    mel.append(audio)
+    return mel.finalize()
@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+"""
+Registry of whisper.cpp GGML models
+Discovers models on disk, loads them on demand and evicts idle ones under a RAM budget
+"""
+
+import logging
+import os
+import re
+import resource
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from engine import FAKE_MODEL_NAMES, Engine, load_engine
+
+logger = logging.getLogger(__name__)
+
+# Files in the models directory that are not transcription models
+EXCLUDED_MODEL_MARKERS = ('silero', 'for-tests')
+
+# Generic names the client may send, mapped to concrete models in preference order
+MODEL_ALIASES = {
+    'large': ['large-v3', 'large-v2', 'large-v1'],
+    'turbo': ['large-v3-turbo'],
+}
+
+# Quantization types understood by whisper.cpp's quantize tool
+QUANTIZATION_TYPES = ('q4_0', 'q4_1', 'q5_0', 'q5_1', 'q8_0', 'q2_k', 'q3_k', 'q4_k', 'q5_k', 'q6_k')
+
+# Client computeType values (CTranslate2 naming). They describe faster-whisper's
+# arithmetic, not weight files, so they all serve the f16 model; a quantized
+# variant is only used when a GGML type such as 'q8_0' is requested by name.
+COMPUTE_TYPE_ALIASES = {
+    'float16': 'f16',
+    'float32': 'f16',
+    'int8': 'f16',
+    'int8float16': 'f16',
+    'int8float32': 'f16',
+}
+
+QUANTIZED_SUFFIX = re.compile(r'-(' + '|'.join(QUANTIZATION_TYPES) + r')$')
+
+
+def default_cache_dir() -> Path:
+    """Per-user cache directory of the backend"""
+    if sys.platform == 'darwin':
+        return Path.home() / "Library" / "Caches" / "UltraWhisper"
+    return Path(os.environ.get('XDG_CACHE_HOME', Path.home() / ".cache")) / "ultrawhisper"
+
+
+def default_quantized_dir() -> Path:
+    """Per-user cache directory for quantized models produced on demand"""
+    return default_cache_dir() / "models"
+
+
+def find_quantize_tool(models_dir: Path) -> Optional[Path]:
+    """Locate the quantize binary built alongside libwhisper"""
+    bin_dir = models_dir.parent / "build" / "bin"
+    for name in ('quantize', 'whisper-quantize'):
+        path = bin_dir / name
+        if path.exists() and os.access(path, os.X_OK):
+            return path
+    return None
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process (peak RSS where current isn't available)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes on Linux
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def normalize_compute_type(compute_type: Optional[str]) -> str:
+    """Map a client computeType to 'f16' or a GGML quantization type"""
+    if not compute_type:
+        return 'f16'
+    key = compute_type.strip().lower()
+    if key in QUANTIZATION_TYPES or key == 'f16':
+        return key
+    if key.replace('_', '') in COMPUTE_TYPE_ALIASES:
+        return COMPUTE_TYPE_ALIASES[key.replace('_', '')]
+    logger.warning(f"Unknown computeType '{compute_type}', using f16")
+    return 'f16'
+
+
+def normalize_model_name(name: str) -> str:
+    """
+    Convert a client model name to the GGML naming scheme
+
+    The Flutter client sends enum names such as 'largeV3Turbo', while model
+    files are named 'ggml-large-v3-turbo.bin'.
+    """
+    name = name.strip()
+    if name.startswith('ggml-'):
+        name = name[len('ggml-'):]
+    if name.endswith('.bin'):
+        name = name[:-len('.bin')]
+    return re.sub(r'(?<=[a-z0-9])(?=[A-Z])', '-', name).lower()
+
+
+class LoadedModel:
+    """A loaded model plus the bookkeeping needed for eviction"""
+
+    def __init__(self, name: str, path: Path, model: Engine, load_time: float):
+        self.name = name
+        self.path = path
+        self.model = model
+        self.load_time = load_time
+        # The fake engine serves models without files
+        self.size_bytes = path.stat().st_size if path.exists() else 0
+        self.rss_bytes = 0
+        self.in_use = 0
+        self.last_used = time.monotonic()
+        # Replaced by reload(); closed once the last user releases it
+        self.retired = False
+
+
+class ModelStats:
+    """Load and inference measurements for one model variant"""
+
+    def __init__(self):
+        self.load_time = 0.0
+        self.rss_bytes = 0
+        self.runs = 0
+        self.audio_seconds = 0.0
+        self.compute_seconds = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            'load_time_s': round(self.load_time, 3),
+            'rss_mb': round(self.rss_bytes / 1e6, 1),
+            'runs': self.runs,
+            'rtf': round(self.compute_seconds / self.audio_seconds, 4) if self.audio_seconds else None
+        }
+
+
+class ModelRegistry:
+    """Loads GGML models on demand and keeps the most recently used ones in memory"""
+
+    def __init__(self, models_dir: Path, default_model: str = 'large-v3-turbo',
+                 ram_budget_mb: int = 0, use_gpu: bool = True,
+                 quantized_dir: Optional[Path] = None, auto_quantize: bool = False,
+                 n_states: int = 1, use_mmap: bool = False,
+                 warmup_audio: Optional[np.ndarray] = None, n_threads: int = 4,
+                 engine: str = 'whispercpp', engine_options: Optional[dict] = None,
+                 isolated: bool = False):
+        """
+        Initialize the registry
+
+        Args:
+            models_dir: Directory containing ggml-*.bin files
+            default_model: Model used when a session doesn't request a known one
+            ram_budget_mb: Memory budget for loaded models (0 for unlimited)
+            use_gpu: Whether to use GPU acceleration (Metal on macOS)
+            quantized_dir: Where quantized models produced on demand are cached
+            auto_quantize: Produce missing quantized models with the quantize tool
+            n_states: Decoding states per model (concurrent transcriptions per model)
+            use_mmap: Read model files through a memory mapping while loading
+            warmup_audio: Clip transcribed on every state of a model before it is used
+            n_threads: Threads used for the warm-up transcriptions
+            engine: Inference engine loading the models ('whispercpp' or 'fake')
+            engine_options: Engine specific options passed to load_engine
+            isolated: Run inference in supervised worker processes, so a native
+                crash only interrupts (and retries) the jobs of one worker
+        """
+        self.models_dir = Path(models_dir)
+        self.quantized_dir = Path(quantized_dir) if quantized_dir else default_quantized_dir()
+        self.ram_budget_bytes = ram_budget_mb * 1024 * 1024
+        self.use_gpu = use_gpu
+        self.n_states = n_states
+        self.use_mmap = use_mmap
+        self.warmup_audio = warmup_audio
+        self.n_threads = n_threads
+        self.engine = engine
+        self.engine_options = engine_options or {}
+        self.isolated = isolated
+        self.quantize_tool = find_quantize_tool(self.models_dir) if auto_quantize else None
+
+        self._loaded: "OrderedDict[str, LoadedModel]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._quantizing: Dict[str, Optional[threading.Thread]] = {}
+        self._stats: Dict[str, ModelStats] = {}
+        # Bumped every time reload() swaps a model, so results of the old one aren't reused
+        self._revisions: Dict[str, int] = {}
+
+        self.paths = self.discover()
+        if not self.paths:
+            raise FileNotFoundError(f"No ggml-*.bin models found in {self.models_dir}")
+
+        self.default_model = normalize_model_name(default_model)
+        if self.default_model not in self.paths:
+            raise FileNotFoundError(
+                f"Model not found at {self.models_dir / f'ggml-{self.default_model}.bin'}"
+            )
+
+    def discover(self) -> Dict[str, Path]:
+        """Scan the models directory and the quantized cache for GGML model files"""
+        paths = {}
+        for directory in (self.quantized_dir, self.models_dir):
+            if not directory.is_dir():
+                continue
+            for path in sorted(directory.glob('ggml-*.bin')):
+                name = normalize_model_name(path.name)
+                if any(marker in name for marker in EXCLUDED_MODEL_MARKERS):
+                    continue
+                # Files shipped next to the originals take precedence over cached ones
+                paths[name] = path
+
+        if self.engine == 'fake':
+            for name in FAKE_MODEL_NAMES:
+                paths.setdefault(name, self.models_dir / f"ggml-{name}.bin")
+        return paths
+
+    def available(self) -> List[str]:
+        """Names of all models that can be served"""
+        return sorted(self.paths)
+
+    def resolve(self, requested: Optional[str], compute_type: Optional[str] = None) -> str:
+        """Map a requested model name and computeType to an available model"""
+        name = self._resolve_base(requested)
+
+        quant_type = normalize_compute_type(compute_type)
+        if quant_type == 'f16' or QUANTIZED_SUFFIX.search(name):
+            return name
+
+        variant = f"{name}-{quant_type}"
+        if variant in self.paths:
+            return variant
+
+        # Serve the f16 model until the quantized file has been produced
+        self._start_quantize(name, quant_type)
+        return name
+
+    def _resolve_base(self, requested: Optional[str]) -> str:
+        if not requested:
+            return self.default_model
+
+        name = normalize_model_name(requested)
+        if name in self.paths:
+            return name
+
+        for candidate in MODEL_ALIASES.get(name, []):
+            if candidate in self.paths:
+                return candidate
+
+        logger.warning(f"Model '{requested}' not available, using {self.default_model}")
+        return self.default_model
+
+    def record_run(self, name: str, audio_seconds: float, compute_seconds: float):
+        """Record one transcription for real-time-factor reporting"""
+        with self._lock:
+            stats = self._stats.setdefault(name, ModelStats())
+            stats.runs += 1
+            stats.audio_seconds += audio_seconds
+            stats.compute_seconds += compute_seconds
+
+    def stats(self) -> Dict[str, dict]:
+        """Per-variant load time, memory and RTF for every model that has been used"""
+        with self._lock:
+            report = {}
+            for name, stats in self._stats.items():
+                match = QUANTIZED_SUFFIX.search(name)
+                entry = stats.as_dict()
+                entry['compute_type'] = match.group(1) if match else 'f16'
+                path = self.paths.get(name)
+                entry['file_mb'] = round(path.stat().st_size / 1e6, 1) if path and path.exists() else None
+                entry['loaded'] = name in self._loaded
+                report[name] = entry
+            return report
+
+    def _start_quantize(self, name: str, quant_type: str):
+        """Produce a quantized variant in the background"""
+        variant = f"{name}-{quant_type}"
+        with self._lock:
+            if variant in self._quantizing:
+                return
+            if self.quantize_tool is None:
+                logger.warning(f"{variant} not found and auto-quantize is off or the quantize tool is missing, "
+                               f"serving {name}")
+                self._quantizing[variant] = None
+                return
+            thread = threading.Thread(
+                target=self._quantize,
+                args=(name, quant_type),
+                name=f"quantize-{variant}",
+                daemon=True
+            )
+            self._quantizing[variant] = thread
+        thread.start()
+
+    def _quantize(self, name: str, quant_type: str):
+        variant = f"{name}-{quant_type}"
+        output = self.quantized_dir / f"ggml-{variant}.bin"
+        tmp_output = output.with_suffix('.bin.tmp')
+
+        logger.info(f"Quantizing {name} to {quant_type}: {output}")
+        start = time.time()
+        try:
+            self.quantized_dir.mkdir(parents=True, exist_ok=True)
+            subprocess.run(
+                [str(self.quantize_tool), str(self.paths[name]), str(tmp_output), quant_type],
+                check=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE
+            )
+            os.replace(tmp_output, output)
+        except (OSError, subprocess.CalledProcessError) as e:
+            stderr = getattr(e, 'stderr', b'') or b''
+            logger.error(f"Quantizing {variant} failed: {e} {stderr.decode('utf-8', 'replace')[-500:]}")
+            tmp_output.unlink(missing_ok=True)
+            # Leave the entry in place so a failing tool isn't retried for every session
+            return
+
+        with self._lock:
+            self.paths[variant] = output
+            del self._quantizing[variant]
+        logger.info(f"Quantized {variant} in {time.time() - start:.1f}s")
+
+    @contextmanager
+    def acquire(self, name: str) -> Iterator[Engine]:
+        """Context manager yielding the loaded model, loading it if needed"""
+        entry = self._get_or_load(name)
+        try:
+            yield entry.model
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.monotonic()
+                if entry.retired and not entry.in_use:
+                    logger.info(f"Freeing replaced instance of {entry.name}")
+                    entry.model.close()
+                self._evict_locked()
+
+    def revision(self, name: str) -> int:
+        """Number of times a model has been swapped by reload()"""
+        with self._lock:
+            return self._revisions.get(name, 0)
+
+    def reload(self, name: str, path: Optional[Path] = None, make_default: bool = False) -> float:
+        """
+        Load a model again (or from a new file) and swap it in without downtime
+
+        The new instance is loaded and warmed up while the current one keeps
+        serving. Transcriptions starting after the swap get the new instance; the
+        old one is freed when its last in-flight transcription releases it.
+
+        Args:
+            name: Model to (re)load
+            path: Model file to serve under this name (default: the file on disk now);
+                must lie in models_dir or quantized_dir
+            make_default: Also serve sessions that don't request a model with it; the
+                previous default stays loaded until the RAM budget evicts it
+
+        Returns:
+            Load time of the new instance in seconds
+        """
+        name = normalize_model_name(name)
+        if path is None:
+            # Pick up files added or replaced since startup
+            discovered = self.discover()
+            with self._lock:
+                self.paths.update(discovered)
+            if name not in self.paths:
+                raise ValueError(f"Unknown model: {name}")
+            path = self.paths[name]
+        else:
+            path = Path(path).resolve()
+            allowed = (self.models_dir.resolve(), self.quantized_dir.resolve())
+            if not any(path.is_relative_to(directory) for directory in allowed):
+                raise ValueError(f"Model files can only be loaded from {self.models_dir} or {self.quantized_dir}")
+            if not path.is_file():
+                raise FileNotFoundError(f"Model file not found: {path}")
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            entry = self._load(name, Path(path))
+            with self._lock:
+                self.paths[name] = Path(path)
+                self._record_load_locked(entry)
+                self._revisions[name] = self._revisions.get(name, 0) + 1
+                self._retire_locked(self._loaded.pop(name, None))
+                self._loaded[name] = entry
+
+                if make_default:
+                    self.default_model = name
+                self._evict_locked()
+
+        logger.info(f"Swapped in {name} from {path}" + (" as the default model" if make_default else ""))
+        return entry.load_time
+
+    def _retire_locked(self, entry: Optional[LoadedModel]):
+        """Free a model taken out of the registry, now or when it is last released"""
+        if entry is None:
+            return
+        entry.retired = True
+        if entry.in_use:
+            logger.info(f"Previous instance of {entry.name} will be freed after {entry.in_use} in-flight transcriptions")
+        else:
+            logger.info(f"Freeing previous instance of {entry.name}")
+            entry.model.close()
+
+    def preload(self, name: str):
+        """Load a model without using it"""
+        with self.acquire(name):
+            pass
+
+    def close(self):
+        """Free every loaded model (on shutdown)"""
+        with self._lock:
+            for entry in self._loaded.values():
+                entry.model.close()
+            self._loaded.clear()
+
+    def loaded(self) -> List[str]:
+        """Names of models currently held in memory"""
+        with self._lock:
+            return list(self._loaded)
+
+    def _get_or_load(self, name: str) -> LoadedModel:
+        if name not in self.paths:
+            raise ValueError(f"Unknown model: {name}")
+
+        with self._lock:
+            entry = self._claim_locked(name)
+            if entry is not None:
+                return entry
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # Load outside the registry lock so sessions on other models aren't blocked
+        with load_lock:
+            with self._lock:
+                entry = self._claim_locked(name)
+                if entry is not None:
+                    return entry
+
+            entry = self._load(name, self.paths[name])
+
+            with self._lock:
+                self._record_load_locked(entry)
+                entry.in_use += 1
+                self._loaded[name] = entry
+                self._evict_locked()
+            return entry
+
+    def _load(self, name: str, path: Path) -> LoadedModel:
+        """Load and warm up a model file (not yet visible to sessions)"""
+        logger.info(f"Loading whisper model: {path}")
+        rss_before = current_rss_bytes()
+        start = time.time()
+        model = load_engine(self.engine, str(path), use_gpu=self.use_gpu, n_states=self.n_states,
+                            use_mmap=self.use_mmap, options=self.engine_options, isolated=self.isolated)
+        load_time = time.time() - start
+
+        entry = LoadedModel(name, path, model, load_time)
+        entry.rss_bytes = max(0, current_rss_bytes() - rss_before)
+        logger.info(f"Model {name} loaded in {load_time:.2f}s (+{entry.rss_bytes / 1e6:.0f} MB RSS)")
+
+        if self.warmup_audio is not None:
+            self._warm_up(name, model)
+        return entry
+
+    def _record_load_locked(self, entry: LoadedModel):
+        stats = self._stats.setdefault(entry.name, ModelStats())
+        stats.load_time = entry.load_time
+        stats.rss_bytes = entry.rss_bytes
+
+    def _warm_up(self, name: str, model: Engine):
+        """
+        Run the warm-up clip on every state of a freshly loaded model
+
+        Compute graphs, KV caches and backend buffers are allocated lazily on the
+        first transcription; doing it here keeps that cost off the first real dictation.
+        """
+        start = time.time()
+        for index, state in enumerate(model.states):
+            state_start = time.time()
+            model.transcribe_with_state(state, self.warmup_audio, language=None, n_threads=self.n_threads)
+            logger.info(f"Warm-up of {name} state {index} took {time.time() - state_start:.2f}s")
+        logger.info(f"Model {name} warmed up in {time.time() - start:.2f}s ({len(model.states)} states)")
+
+    def _claim_locked(self, name: str) -> Optional[LoadedModel]:
+        entry = self._loaded.get(name)
+        if entry is not None:
+            entry.in_use += 1
+            self._loaded.move_to_end(name)
+        return entry
+
+    def _evict_locked(self):
+        """Free least recently used idle models until the budget is met"""
+        if not self.ram_budget_bytes:
+            return
+
+        total = sum(entry.size_bytes for entry in self._loaded.values())
+        for name in list(self._loaded):
+            if total <= self.ram_budget_bytes:
+                break
+            entry = self._loaded[name]
+            if entry.in_use:
+                continue
+            logger.info(f"Evicting model {name} to stay within RAM budget")
+            del self._loaded[name]
+            entry.model.close()
+            total -= entry.size_bytes
+
+        if total > self.ram_budget_bytes:
+            logger.warning(
+                f"Loaded models use {total / 1e6:.0f} MB, above the "
+                f"{self.ram_budget_bytes / 1e6:.0f} MB budget (all in use)"
+            )
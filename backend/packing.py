@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Utterance packing
+Several short dictations decoded as one encoder window, separated by silence,
+and the result split back to each dictation by token timestamps
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from engine import SAMPLE_RATE
+
+# Silence between packed utterances; whisper ends segments on long pauses
+PACK_GAP_SECONDS = 1.0
+
+# Longest utterance worth packing, and the window all of them must fit in
+PACK_MAX_SECONDS = 8.0
+PACK_WINDOW_SECONDS = 30.0
+
+# Tokens stamped this far into a gap still belong to the utterance next to it
+TOKEN_TOLERANCE_SECONDS = PACK_GAP_SECONDS / 2
+
+
+def pack_utterances(utterances: Sequence[np.ndarray]) -> Tuple[np.ndarray, List[Tuple[float, float]]]:
+    """
+    Concatenate utterances with PACK_GAP_SECONDS of silence between them
+
+    Returns:
+        (audio, spans): the packed audio and the (start, end) of every utterance in it, in seconds
+    """
+    gap = np.zeros(int(PACK_GAP_SECONDS * SAMPLE_RATE), dtype=utterances[0].dtype)
+    pieces = []
+    spans = []
+    position = 0
+    for utterance in utterances:
+        if pieces:
+            pieces.append(gap)
+            position += len(gap)
+        pieces.append(utterance)
+        spans.append((position / SAMPLE_RATE, (position + len(utterance)) / SAMPLE_RATE))
+        position += len(utterance)
+    return np.concatenate(pieces), spans
+
+
+def packed_seconds(durations: Sequence[float]) -> float:
+    """Length of the packed audio for utterances of these durations"""
+    return sum(durations) + PACK_GAP_SECONDS * max(0, len(durations) - 1)
+
+
+def _owner(t0: float, t1: float, spans: Sequence[Tuple[float, float]]) -> Optional[int]:
+    """The one utterance a token falls into, allowing for TOKEN_TOLERANCE_SECONDS"""
+    for index, (start, end) in enumerate(spans):
+        if t0 >= start - TOKEN_TOLERANCE_SECONDS and t1 <= end + TOKEN_TOLERANCE_SECONDS:
+            return index
+    return None
+
+
+def split_packed(result: Dict, spans: Sequence[Tuple[float, float]]) -> List[Optional[Dict]]:
+    """
+    Split the result of a packed decode (transcribed with token_data) back into utterances
+
+    Segments are cut wherever their tokens move to the next utterance, and
+    re-timed relative to the utterance's own start.
+
+    Returns:
+        One engine-style result per span, or None for utterances that can't be
+        attributed with confidence (they should be decoded on their own). If any
+        token lands between utterances or out of order, every entry is None.
+    """
+    pieces: List[List[Dict]] = [[] for _ in spans]
+    last_owner = 0
+    for segment in result['segments']:
+        tokens = segment.get('tokens')
+        if tokens is None or not len(tokens):
+            continue
+        owners = [_owner(t0 / 100.0, t1 / 100.0, spans) for t0, t1 in zip(tokens['t0'], tokens['t1'])]
+        if None in owners or owners[0] < last_owner or any(b < a for a, b in zip(owners, owners[1:])):
+            return [None] * len(spans)
+        last_owner = owners[-1]
+
+        # Runs of consecutive tokens owned by the same utterance
+        start = 0
+        for end in range(1, len(owners) + 1):
+            if end < len(owners) and owners[end] == owners[start]:
+                continue
+            owner = owners[start]
+            offset, span_end = spans[owner]
+            run = tokens[start:end].copy()
+            run['t0'] = np.clip(run['t0'] - int(round(offset * 100)), 0, int((span_end - offset) * 100))
+            run['t1'] = np.clip(run['t1'] - int(round(offset * 100)), 0, int((span_end - offset) * 100))
+            texts = segment['token_texts'][start:end]
+            pieces[owner].append({
+                'text': b''.join(texts).decode('utf-8', 'replace'),
+                't0': int(run['t0'][0]) / 100.0,
+                't1': int(run['t1'][-1]) / 100.0,
+                'no_speech_prob': segment.get('no_speech_prob', 0.0),
+                'tokens': run,
+                'token_texts': texts
+            })
+            start = end
+
+    return [
+        {
+            'text': ''.join(segment['text'] for segment in segments).strip(),
+            'segments': segments,
+            'language': result['language']
+        } if segments else None
+        for segments in pieces
+    ]
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Transcript post-processing honouring the client's PostProcessingOptions
+Filler removal, punctuation, capitalization and custom-term correction,
+compiled once per language and option set
+"""
+
+import re
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional
+
+from term_correction import correct_terms
+
+# Filler words removed by disfluencyCleanup
+EN_FILLERS = ('um', 'umm', 'uh', 'uhh', 'uhm', 'erm', 'ah', 'ahh', 'hmm', 'hm', 'mmm')
+
+# Fillers that are also words or units ("the ER", "5 mm"); only removed when
+# lowercase and set off by commas
+EN_PAUSE_FILLERS = ('er', 'mm')
+
+# Abbreviations whose period doesn't end a sentence
+EN_ABBREVIATIONS = ('e.g', 'i.e', 'cf', 'vs', 'mr', 'mrs', 'ms', 'dr', 'st', 'approx')
+
+# Japanese fillers that are unambiguous on their own
+JA_FILLERS = ('えーっと', 'えっと', 'えーと', 'えー', 'ええと', 'あのー', 'あのぉ', 'うーん', 'んー', 'そのー', 'まあー')
+
+# Fillers that are also ordinary words (あの人 = "that person"); only removed
+# when followed by a pause (comma or space)
+JA_PAUSE_FILLERS = ('あの', 'その', 'まあ', 'なんか')
+
+EN_PUNCTUATION = re.compile(r"[,;:!?]|\.(?!\d)|(?<!\w)['\"]|['\"](?!\w)")
+JA_PUNCTUATION = re.compile(r'[、。，．！？!?]')
+
+MULTIPLE_SPACES = re.compile(r'\s{2,}')
+SPACE_BEFORE_PUNCTUATION = re.compile(r'\s+([,.;:!?])')
+LEADING_PUNCTUATION = re.compile(r'^[\s,.;:、。]+')
+REPEATED_COMMAS = re.compile(r'([,、])(\s*[,、])+')
+STRAY_PERIODS = re.compile(r'([.!?])(?:\s+\.)+')
+# Sentence ends, but not an ellipsis
+SENTENCE_START = re.compile(r'(^|(?:[!?]|(?<!\.)\.)\s+)([a-z])')
+# "i" and its contractions, but not the "i" of "i.e."
+EN_PRONOUN_I = re.compile(r"\bi(?=\b|'(?:m|ve|ll|d)\b)(?!\.\w)")
+AFTER_ABBREVIATION = re.compile(r'(?i)\b(?:' + '|'.join(re.escape(a) for a in EN_ABBREVIATIONS) + r')\.\s+$')
+
+
+def trie_regex(words: Iterable[str]) -> str:
+    """
+    Regex alternation for a word list, factored through a character trie
+
+    ('um', 'umm', 'uh') becomes 'u(?:h|mm?)', so matching never backtracks
+    through alternatives sharing a prefix.
+    """
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if '' in node:
+            # The word may end here: the rest is optional
+            if len(branches) == 1 and len(branches[0]) == 1:
+                return branches[0] + '?'
+            return '(?:' + '|'.join(branches) + ')?'
+        return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+    return build(trie)
+
+
+class Pipeline:
+    """Ordered text transforms for one language and option set"""
+
+    def __init__(self, language: str, smart_caps: bool, punctuation: bool, disfluency_cleanup: bool):
+        self.language = language
+        self.steps: List[Callable[[str], str]] = []
+
+        if language == 'ja':
+            if disfluency_cleanup:
+                fillers = re.compile(
+                    '(?:' + trie_regex(JA_FILLERS) + '|(?:' + trie_regex(JA_PAUSE_FILLERS) + r')(?=[、,\s]))'
+                    r'ー*[、,]?\s*'
+                )
+                self.steps.append(lambda text: fillers.sub('', text))
+            if not punctuation:
+                self.steps.append(lambda text: JA_PUNCTUATION.sub('', text))
+        else:
+            if disfluency_cleanup and language == 'en':
+                # Hyphenated backchannels ("mm-hmm", "uh-huh") are words of their own
+                fillers = re.compile(
+                    r'(?i:(?:,\s*)?(?<![\w-])(?:' + trie_regex(EN_FILLERS) + r')(?![\w-]),?)'
+                    r'|(?:^|,)\s*(?:' + trie_regex(EN_PAUSE_FILLERS) + r')(?=,)'
+                )
+                self.steps.append(lambda text: fillers.sub('', text))
+            if not punctuation:
+                self.steps.append(lambda text: EN_PUNCTUATION.sub('', text))
+
+        self.steps.append(self._tidy)
+
+        if smart_caps and language != 'ja':
+            self.steps.append(self._capitalize_sentences)
+            if language == 'en':
+                self.steps.append(lambda text: EN_PRONOUN_I.sub('I', text))
+
+    @staticmethod
+    def _tidy(text: str) -> str:
+        """Fix up spacing and punctuation left behind by removed words"""
+        text = REPEATED_COMMAS.sub(r'\1', text)
+        text = STRAY_PERIODS.sub(r'\1', text)
+        text = SPACE_BEFORE_PUNCTUATION.sub(r'\1', text)
+        text = MULTIPLE_SPACES.sub(' ', text)
+        return LEADING_PUNCTUATION.sub('', text).strip()
+
+    @staticmethod
+    def _capitalize_sentences(text: str) -> str:
+        """Uppercase the first letter of every sentence, not after "e.g." or "Dr." """
+        def upper(m: re.Match) -> str:
+            if m.group(1) and AFTER_ABBREVIATION.search(text, max(0, m.start() - 12), m.end(1)):
+                return m.group(0)
+            return m.group(1) + m.group(2).upper()
+        return SENTENCE_START.sub(upper, text)
+
+    def __call__(self, text: str) -> str:
+        for step in self.steps:
+            text = step(text)
+        return text
+
+
+@lru_cache(maxsize=64)
+def get_pipeline(language: str, smart_caps: bool = True, punctuation: bool = True,
+                 disfluency_cleanup: bool = True) -> Pipeline:
+    """Pipeline for a language and option set, compiled on first use"""
+    return Pipeline(language, smart_caps, punctuation, disfluency_cleanup)
+
+
+def postprocess(text: str, language: Optional[str], post: Optional[dict]) -> str:
+    """
+    Apply the client's PostProcessingOptions to a transcript
+
+    Args:
+        text: Transcript as returned by the engine
+        language: Language of the transcript ('en', 'ja', ...)
+        post: The session's 'post' options (smartCaps, punctuation, disfluencyCleanup,
+            customTerms); missing options default to enabled like on the client
+    """
+    post = post or {}
+    language = (language or 'en').lower()
+    pipeline = get_pipeline(
+        language,
+        bool(post.get('smartCaps', True)),
+        bool(post.get('punctuation', True)),
+        bool(post.get('disfluencyCleanup', True))
+    )
+    terms = post.get('customTerms')
+    if isinstance(terms, list):
+        return correct_terms(pipeline(text), [term for term in terms if isinstance(term, str)], language)
+    return pipeline(text)
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for transcription results
+Keeps recent results in memory (LRU, bounded by size) with an optional on-disk tier
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(audio: np.ndarray, model: str, language: Optional[str], params: Optional[dict] = None) -> str:
+    """
+    Build a cache key for a transcription request
+
+    Args:
+        audio: PCM samples that will be transcribed
+        model: Name of the model that produces the result
+        language: Requested language ('auto' or None for auto-detect)
+        params: Any other options that influence the output (prompt, decoding params, ...)
+
+    Returns:
+        Hex digest identifying the request
+    """
+    digest = hashlib.sha256()
+    digest.update(str(audio.dtype).encode('utf-8'))
+    digest.update(np.ascontiguousarray(audio).tobytes())
+
+    # Fingerprint everything else with a canonical JSON encoding
+    fingerprint = json.dumps(
+        {'model': model, 'language': language or 'auto', 'params': params or {}},
+        sort_keys=True,
+        default=str
+    )
+    digest.update(fingerprint.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class TranscriptionCache:
+    """LRU cache of transcription results keyed by make_cache_key()"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entries: int = 1024,
+                 disk_dir: Optional[str] = None, max_disk_bytes: int = 512 * 1024 * 1024):
+        """
+        Initialize the cache
+
+        Args:
+            max_bytes: Memory budget for cached results (serialized size)
+            max_entries: Maximum number of results kept in memory
+            disk_dir: Directory for the on-disk tier (None to disable)
+            max_disk_bytes: Size budget for the on-disk tier
+        """
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+
+        self._entries: "OrderedDict[str, Tuple[dict, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        # Files of the disk tier, least recently used first, and their total size;
+        # scanned once here, then kept up to date by reads and writes
+        self._disk_files: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._disk_lock = threading.Lock()
+
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self._scan_disk()
+            logger.info(f"Transcription cache disk tier: {self.disk_dir} "
+                        f"({len(self._disk_files)} entries, {self._disk_bytes / 1e6:.1f} MB)")
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return a copy of the cached result for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[0])
+
+        result = self._read_disk(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._insert(key, result, self._encoded_size(result))
+        return dict(result)
+
+    def put(self, key: str, result: dict):
+        """Store a result in memory and, if enabled, on disk"""
+        encoded = json.dumps(result).encode('utf-8')
+
+        with self._lock:
+            self._insert(key, dict(result), len(encoded))
+
+        if self.disk_dir:
+            self._write_disk(key, encoded)
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache counters"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def _insert(self, key: str, result: dict, size: int):
+        """Insert under lock and evict least recently used entries"""
+        if size > self.max_bytes:
+            return
+
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[1]
+
+        self._entries[key] = (result, size)
+        self._bytes += size
+
+        while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+
+    @staticmethod
+    def _encoded_size(result: dict) -> int:
+        return len(json.dumps(result).encode('utf-8'))
+
+    def _disk_path(self, key: str) -> Path:
+        # Shard by prefix so a single directory doesn't grow unbounded
+        return self.disk_dir / key[:2] / f"{key}.json"
+
+    def _read_disk(self, key: str) -> Optional[dict]:
+        if not self.disk_dir:
+            return None
+
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            os.utime(path)  # Keeps the LRU order across restarts
+        except FileNotFoundError:
+            with self._disk_lock:
+                self._forget_disk_locked(key)
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable cache entry {path}: {e}")
+            path.unlink(missing_ok=True)
+            with self._disk_lock:
+                self._forget_disk_locked(key)
+            return None
+
+        with self._disk_lock:
+            if key in self._disk_files:
+                self._disk_files.move_to_end(key)
+        return result
+
+    def _write_disk(self, key: str, encoded: bytes):
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write atomically so concurrent readers never see partial files
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(encoded)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write cache entry {path}: {e}")
+            return
+
+        with self._disk_lock:
+            self._forget_disk_locked(key)
+            self._disk_files[key] = len(encoded)
+            self._disk_bytes += len(encoded)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._prune_disk_locked()
+
+    def _scan_disk(self):
+        """Index the files already in the disk tier, oldest first"""
+        files = []
+        for path in self.disk_dir.glob('*/*.json'):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, path.stem, st.st_size))
+
+        for _, key, size in sorted(files):
+            self._disk_files[key] = size
+            self._disk_bytes += size
+        if self._disk_bytes > self.max_disk_bytes:
+            self._prune_disk_locked()
+
+    def _forget_disk_locked(self, key: str):
+        size = self._disk_files.pop(key, None)
+        if size is not None:
+            self._disk_bytes -= size
+
+    def _prune_disk_locked(self):
+        """Remove least recently used files until the disk tier fits its budget"""
+        while self._disk_files and self._disk_bytes > self.max_disk_bytes:
+            key, size = self._disk_files.popitem(last=False)
+            self._disk_bytes -= size
+            self._disk_path(key).unlink(missing_ok=True)
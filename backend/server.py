@@ -7,15 +7,33 @@ WebSocket server for real-time transcription using whisper.cpp with Metal GPU ac
 import asyncio
 import json
 import logging
+import multiprocessing
 import os
+import secrets
 import sys
 import signal
+import socket
+import stat
+import time
 import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional, Any
+from typing import Any, Dict, List, Optional, Tuple
 import websockets
 import numpy as np
-from whisper_wrapper import WhisperModel
+from model_registry import ModelRegistry, normalize_model_name
+from audio_utils import EnergyGate, audio_ctx_for, warmup_audio
+from confidence import score_transcript
+from postprocess import postprocess
+from fallback import FALLBACK_MODES, FallbackPolicy, shift_segment, transcribe_with_fallback
+from engine import ENGINES, SAMPLE_RATE, gpu_backend
+from mel import IncrementalMel, load_mel_filters
+from audio_ring import RING_PREFIX, AudioRing, RingError
+from packing import PACK_MAX_SECONDS, PACK_WINDOW_SECONDS, pack_utterances, packed_seconds, split_packed
+from result_cache import TranscriptionCache, make_cache_key
+from session_resume import ACK_INTERVAL_BYTES, WINDOW_BYTES, ResultMailbox, parse_audio_frame, parse_channel_frame
+from worker_fleet import WorkerFleet
 
 # Configure logging
 logging.basicConfig(
@@ -24,59 +42,250 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Session audio buffers start at 10s and double as needed
+INITIAL_BUFFER_SAMPLES = 10 * SAMPLE_RATE
+
+# How often a draining server checks for running sessions
+DRAIN_POLL_SECONDS = 0.1
+
 
 class TranscriptionSession:
     """Manages a single transcription session with audio buffering"""
 
-    def __init__(self, session_id: str, config: dict):
+    def __init__(self, session_id: str, config: dict, model_name: str):
         self.session_id = session_id
         self.config = config
-        self.audio_buffer = []
+        self.model_name = model_name
+        # PCM16 samples in a buffer grown by doubling; n_samples of it are used
+        self.audio_buffer = np.empty(INITIAL_BUFFER_SAMPLES, dtype=np.int16)
+        self.n_samples = 0
         self.is_active = False
         self.sample_rate = 16000  # Target sample rate
 
+        # Live partial decoding state
+        self.enable_partial = bool(config.get('enablePartial', False))
+        self.partial_in_flight = False
+        self.last_partial_samples = 0
+
+        # Resumption state: sequenced frames, acks and the owning connection
+        self.resumable = bool(config.get('resumable', False))
+        self.bytes_received = 0
+        self.last_seq = -1
+        self.last_ack_bytes = 0
+        self.websocket = None
+        self.detached_at: Optional[float] = None
+        self.finalizing = False
+
+        # Channel of the session on its connection (multiplexed frames)
+        self.channel: Optional[int] = None
+        self.window_bytes = WINDOW_BYTES
+
+        # Log-mel frames computed as audio arrives (whisper.cpp engine, opt-in)
+        self.mel: Optional[IncrementalMel] = None
+
+        # Shared-memory ring the client writes audio into (same-host clients)
+        self.ring: Optional[AudioRing] = None
+
     def add_audio_chunk(self, audio_data: bytes):
         """Add audio chunk to buffer"""
         # Convert bytes to numpy array (PCM 16-bit little-endian)
-        audio_array = np.frombuffer(audio_data, dtype=np.int16)
-        self.audio_buffer.extend(audio_array)
+        self.add_samples(np.frombuffer(audio_data, dtype=np.int16))
+
+    def add_samples(self, audio_array: np.ndarray):
+        """Append PCM16 samples (the array may be a view into a ring; it is copied)"""
+        end = self.n_samples + len(audio_array)
+        if end > len(self.audio_buffer):
+            grown = np.empty(max(end, 2 * len(self.audio_buffer)), dtype=np.int16)
+            grown[:self.n_samples] = self.audio_buffer[:self.n_samples]
+            self.audio_buffer = grown
+        self.audio_buffer[self.n_samples:end] = audio_array
+        self.n_samples = end
+        self.bytes_received += 2 * len(audio_array)
+        if self.mel is not None:
+            self.mel.append(audio_array)
+
+    def drain_ring(self) -> int:
+        """
+        Move the audio the client has written into the ring to the buffer
+
+        Returns:
+            Number of samples moved
+        """
+        if self.ring is None:
+            return 0
+        n_samples = 0
+        for view in self.ring.read():
+            self.add_samples(view)
+            n_samples += len(view)
+        self.ring.consume(2 * n_samples)
+        return n_samples
+
+    def close_ring(self):
+        """Detach from the client's ring (the client removes it)"""
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+    def add_audio_frame(self, seq: int, offset: int, pcm: bytes) -> bool:
+        """
+        Add a sequenced audio frame, skipping bytes that were already received
+
+        Returns:
+            False if the frame starts past the received audio (frames were lost)
+        """
+        if offset > self.bytes_received:
+            return False
+
+        overlap = self.bytes_received - offset
+        if overlap < len(pcm):
+            self.add_audio_chunk(pcm[overlap:])
+        self.last_seq = max(self.last_seq, seq)
+        return True
 
     def get_audio_array(self) -> np.ndarray:
         """Get complete audio as numpy array"""
-        return np.array(self.audio_buffer, dtype=np.int16)
+        return self.audio_buffer[:self.n_samples].copy()
+
+    def get_audio_tail(self, seconds: float) -> np.ndarray:
+        """Get the most recent audio (the rolling buffer used for partials)"""
+        n_samples = int(seconds * self.sample_rate)
+        return self.audio_buffer[max(0, self.n_samples - n_samples):self.n_samples].copy()
 
     def clear_buffer(self):
         """Clear audio buffer"""
-        self.audio_buffer.clear()
+        self.n_samples = 0
+        if self.mel is not None:
+            self.mel = IncrementalMel(self.mel.filters)
+
+
+class FinalJob:
+    """A final transcription moving through the prepare -> infer -> finish stages"""
+
+    def __init__(self, session: TranscriptionSession):
+        self.session = session
+        self.session_id = session.session_id
+        # Set by a stage that answers early (silence, cache hit)
+        self.response: Optional[dict] = None
+        self.whisper_language: Optional[str] = None
+        self.cache_key: Optional[str] = None
+        self.speech: Optional[np.ndarray] = None
+        self.offset = 0.0
+        self.mel = None
+        self.result: Optional[dict] = None
+        self.stage_seconds: Dict[str, float] = {}
 
 
 class WhisperCppBackend:
     """Main backend service for whisper.cpp transcription"""
 
-    def __init__(self):
+    def __init__(self, cache: Optional[TranscriptionCache] = None, models_dir: Optional[Path] = None,
+                 default_model: str = 'large-v3-turbo', model_ram_budget_mb: int = 0,
+                 quantized_dir: Optional[Path] = None, auto_quantize: bool = False,
+                 pool_size: int = 1, partial_model: Optional[str] = None,
+                 partial_interval: float = 1.0, partial_window: float = 10.0,
+                 use_mmap: bool = False, warmup: str = 'clip', n_threads: int = 4,
+                 engine: str = 'whispercpp', engine_options: Optional[dict] = None,
+                 resume_ttl: float = 60.0, fallback: Optional[FallbackPolicy] = None,
+                 energy_gate: Optional[EnergyGate] = None, trim_silence: bool = True,
+                 dynamic_audio_ctx: bool = False, incremental_mel: bool = False,
+                 prepare_ahead: int = 2, pack_max: int = 0, isolated: bool = False):
         self.sessions: Dict[str, TranscriptionSession] = {}
+        self.cache = cache
+        self.fallback = fallback or FallbackPolicy()
 
-        # Model path
-        backend_dir = Path(__file__).parent
-        self.model_path = backend_dir / "whisper.cpp" / "models" / "ggml-large-v3-turbo.bin"
+        # Silent sessions (accidental hotkey taps) skip decoding entirely
+        self.energy_gate = energy_gate or EnergyGate()
+
+        # Dead air around the speech is cut before decoding, and the encoder
+        # context can shrink to the remaining audio
+        self.trim_silence = trim_silence
+        self.dynamic_audio_ctx = dynamic_audio_ctx
+
+        # Sessions compute their mel while streaming; only whisper.cpp accepts one
+        self.incremental_mel = incremental_mel and engine == 'whispercpp'
+
+        # Sessions survive a dropped connection for resume_ttl seconds, and their
+        # finals stay collectable for as long (0 disables resumption)
+        self.resume_ttl = resume_ttl
+        self.mailbox = ResultMailbox(ttl=resume_ttl)
+
+        self.n_threads = n_threads
 
-        if not self.model_path.exists():
-            raise FileNotFoundError(f"Model not found at {self.model_path}")
+        # Finals and partials run on separate executors so partials never queue ahead of finals
+        self.pool_size = pool_size
+        self.final_executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='final')
 
-        logger.info(f"Loading whisper model: {self.model_path}")
+        # Stages of a final around the engine call; at most prepare_ahead prepared
+        # finals wait for an engine state, bounding the audio and mels held in memory
+        self.prepare_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prepare')
+        self.finish_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='finish')
+        self.prepared_slots = asyncio.Semaphore(pool_size + max(prepare_ahead, pack_max))
+
+        # Short finals queued for an engine state may share one encoder window
+        # (up to pack_max of them; below 2 disables packing)
+        self.pack_max = pack_max
+        self.infer_queue: List[Tuple[FinalJob, asyncio.Future]] = []
+        self.idle_infer_workers = pool_size
+        self.partial_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='partial')
+        self.finals_in_flight = 0
+        self._finals_lock = threading.Lock()
+
+        # Set on shutdown: no new sessions, running ones may finish
+        self.draining = False
+
+        self.partial_interval = partial_interval
+        self.partial_window = partial_window
+
+        # Models directory
+        backend_dir = Path(__file__).parent
+        models_dir = models_dir or backend_dir / "whisper.cpp" / "models"
+
+        self.registry = ModelRegistry(
+            models_dir,
+            default_model=default_model,
+            ram_budget_mb=model_ram_budget_mb,
+            use_gpu=True,
+            quantized_dir=quantized_dir,
+            auto_quantize=auto_quantize,
+            n_states=pool_size,
+            use_mmap=use_mmap,
+            warmup_audio=warmup_audio(warmup),
+            n_threads=n_threads,
+            engine=engine,
+            engine_options=engine_options,
+            isolated=isolated
+        )
+        logger.info(f"Available models: {', '.join(self.registry.available())}")
         logger.info("This will take a few seconds on first load...")
 
-        # Load model once and keep in memory
-        self.model = WhisperModel(str(self.model_path), use_gpu=True)
+        # Load the default model up front and keep it in memory
+        self.registry.preload(self.registry.default_model)
+
+        # Small model for low-latency partials (two-tier decoding)
+        self.partial_model = None
+        if partial_model and normalize_model_name(partial_model) in self.registry.paths:
+            self.partial_model = normalize_model_name(partial_model)
+            self.registry.preload(self.partial_model)
+            logger.info(f"Live partials enabled with model {self.partial_model}")
+        elif partial_model:
+            logger.warning(f"Partial model '{partial_model}' not found - live partials disabled")
 
-        logger.info(f"Model loaded successfully with Metal GPU acceleration!")
+        gpu = gpu_backend(engine, self.registry.use_gpu)
+        logger.info(f"Model loaded successfully with {gpu + ' GPU' if gpu else 'CPU'} acceleration!")
         logger.info("Ready for fast transcriptions!")
 
     def create_session(self, session_id: str, config: dict) -> TranscriptionSession:
         """Create a new transcription session"""
-        session = TranscriptionSession(session_id, config)
+        model_name = self.registry.resolve(config.get('model'), config.get('computeType'))
+        session = TranscriptionSession(session_id, config, model_name)
+        session.resumable = session.resumable and self.resume_ttl > 0
+        if self.incremental_mel:
+            try:
+                session.mel = IncrementalMel(load_mel_filters(str(self.registry.paths[model_name])))
+            except (OSError, ValueError) as e:
+                logger.warning(f"No incremental mel for {model_name}: {e}")
         self.sessions[session_id] = session
-        logger.info(f"Created session: {session_id}")
+        logger.info(f"Created session: {session_id} (model: {model_name})")
         return session
 
     def get_session(self, session_id: str) -> Optional[TranscriptionSession]:
@@ -86,57 +295,387 @@ class WhisperCppBackend:
     def remove_session(self, session_id: str):
         """Remove a session"""
         if session_id in self.sessions:
-            del self.sessions[session_id]
+            self.sessions.pop(session_id).close_ring()
             logger.info(f"Removed session: {session_id}")
 
-    def transcribe_session(self, session_id: str) -> dict:
-        """Transcribe audio from a session using whisper.cpp"""
+    async def reload_model(self, name: str, path: Optional[str] = None, make_default: bool = False) -> float:
+        """Hot-swap a model in the background (see ModelRegistry.reload); returns its load time"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, self.registry.reload, name, Path(path) if path else None, make_default
+        )
+
+    def busy_sessions(self) -> int:
+        """Sessions still recording or being finalized (detached ones wait for a resume that may not come)"""
+        return sum(1 for session in self.sessions.values()
+                   if session.finalizing or (session.is_active and session.detached_at is None))
+
+    async def drain(self, timeout: float) -> bool:
+        """
+        Stop taking new sessions and wait for the running ones to finish
+
+        Returns:
+            True if everything finished within timeout seconds
+        """
+        self.draining = True
+        deadline = time.monotonic() + timeout
+        while self.finals_in_flight or self.busy_sessions():
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(DRAIN_POLL_SECONDS)
+        return True
+
+    def expire_detached(self):
+        """Drop detached sessions and mailbox results past their TTL"""
+        now = time.monotonic()
+        for session_id, session in list(self.sessions.items()):
+            if session.detached_at is not None and not session.finalizing and now - session.detached_at > self.resume_ttl:
+                logger.info(f"Session {session_id} was not resumed within {self.resume_ttl:.0f}s")
+                self.remove_session(session_id)
+        self.mailbox.expire()
+
+    async def run_final(self, session_id: str) -> dict:
+        """
+        Schedule the authoritative transcription of a session
+
+        The final moves through prepare -> infer -> finish, each stage on its own
+        executor, so the Python work of one session overlaps the native decode of
+        another. A session only starts preparing once its prepared output has a
+        free slot ahead of inference (bounded hand-off).
+        """
+        with self._finals_lock:
+            self.finals_in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            async with self.prepared_slots:
+                job = await loop.run_in_executor(self.prepare_executor, self.prepare_final, session_id)
+                if job.response is not None:
+                    return job.response
+                await self.infer(job)
+            return await loop.run_in_executor(self.finish_executor, self.finish_final, job)
+        except Exception as e:
+            logger.error(f"Transcription failed for session {session_id}: {e}")
+            raise
+        finally:
+            with self._finals_lock:
+                self.finals_in_flight -= 1
+
+    async def infer(self, job: 'FinalJob'):
+        """Run the infer stage of a final, possibly packed with other queued finals"""
+        loop = asyncio.get_running_loop()
+        if self.pack_max < 2:
+            await loop.run_in_executor(self.final_executor, self.infer_final, job)
+            return
+
+        future = loop.create_future()
+        self.infer_queue.append((job, future))
+        self.dispatch_infer()
+        await future
+
+    def dispatch_infer(self):
+        """Hand queued finals to idle engine workers, packing compatible short ones together"""
+        loop = asyncio.get_running_loop()
+        while self.idle_infer_workers and self.infer_queue:
+            batch = [self.infer_queue.pop(0)]
+            head = batch[0][0]
+            if self.packable(head):
+                durations = [len(head.speech) / SAMPLE_RATE]
+                for entry in list(self.infer_queue):
+                    if len(batch) >= self.pack_max:
+                        break
+                    job = entry[0]
+                    duration = len(job.speech) / SAMPLE_RATE
+                    if (self.packable(job) and job.session.model_name == head.session.model_name
+                            and job.whisper_language == head.whisper_language
+                            and packed_seconds(durations + [duration]) <= PACK_WINDOW_SECONDS):
+                        self.infer_queue.remove(entry)
+                        batch.append(entry)
+                        durations.append(duration)
+
+            self.idle_infer_workers -= 1
+            task = loop.run_in_executor(self.final_executor, self.infer_batch, [job for job, _ in batch])
+            task.add_done_callback(lambda task, batch=batch: self.infer_done(batch, task))
+
+    def infer_done(self, batch: List[Tuple['FinalJob', asyncio.Future]], task: asyncio.Future):
+        self.idle_infer_workers += 1
+        for _, future in batch:
+            if future.done():
+                continue
+            if task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(None)
+        self.dispatch_infer()
+
+    @staticmethod
+    def packable(job: 'FinalJob') -> bool:
+        """Short finals with an explicit language (one window is detected as one language)"""
+        return job.whisper_language is not None and len(job.speech) / SAMPLE_RATE <= PACK_MAX_SECONDS
+
+    def infer_batch(self, jobs: List['FinalJob']):
+        """Infer stage of one final, or of several packed into one window"""
+        if len(jobs) == 1:
+            self.infer_final(jobs[0])
+        else:
+            self.infer_packed(jobs)
+
+    def infer_packed(self, jobs: List['FinalJob']):
+        """
+        Decode several finals as one window and split the result by token timestamps
+
+        Finals that can't be attributed unambiguously, or that contain a segment
+        the fallback policy would re-decode, are decoded on their own instead.
+        """
+        head = jobs[0]
+        audio, spans = pack_utterances([job.speech for job in jobs])
+
+        with self.registry.acquire(head.session.model_name) as model:
+            start = time.time()
+            result = model.transcribe(
+                audio,
+                language=head.whisper_language,
+                n_threads=self.n_threads,
+                audio_ctx=audio_ctx_for(len(audio)) if self.dynamic_audio_ctx else 0,
+                token_data=True,
+                temperature_inc=self.fallback.temperature_inc
+            )
+            elapsed = time.time() - start
+
+        pieces = split_packed(result, spans)
+        speech_seconds = sum(end - start for start, end in spans)
+        solo = []
+        for job, piece, (span_start, span_end) in zip(jobs, pieces, spans):
+            if piece is None or (self.fallback.mode == 'confidence' and
+                                 any(self.fallback.needs_retry(segment) for segment in piece['segments'])):
+                solo.append(job)
+                continue
+            piece['retries'] = []
+            piece['retry_seconds'] = 0.0
+            if job.offset:
+                piece['segments'] = [shift_segment(segment, job.offset) for segment in piece['segments']]
+            job.result = piece
+            job.mel = None
+            # The window's cost is shared in proportion to speech
+            job.stage_seconds['infer'] = elapsed * (span_end - span_start) / speech_seconds
+
+        logger.info(f"Packed {len(jobs)} finals into {len(audio) / SAMPLE_RATE:.1f}s in {elapsed:.2f}s, "
+                    f"{len(solo)} decoded on their own")
+        for job in solo:
+            self.infer_final(job)
+
+    def should_run_partial(self, session: TranscriptionSession) -> bool:
+        """Whether enough new audio arrived to schedule another partial"""
+        if not self.partial_model or not session.enable_partial or session.partial_in_flight:
+            return False
+
+        # Partials yield to finals: they compete for the same CPU/GPU
+        if self.finals_in_flight:
+            return False
+
+        new_samples = session.n_samples - session.last_partial_samples
+        return new_samples >= self.partial_interval * session.sample_rate
+
+    async def run_partial(self, session_id: str) -> Optional[dict]:
+        """Schedule a partial transcription of a session's rolling buffer"""
         session = self.get_session(session_id)
         if not session:
-            raise ValueError(f"Session {session_id} not found")
+            return None
 
+        session.partial_in_flight = True
+        session.last_partial_samples = session.n_samples
         try:
-            audio_array = session.get_audio_array()
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.partial_executor, self.transcribe_partial, session_id)
+        finally:
+            session.partial_in_flight = False
+
+    def transcribe_partial(self, session_id: str) -> Optional[dict]:
+        """Transcribe the tail of a session's audio with the partial model"""
+        session = self.get_session(session_id)
+
+        # The session may have ended, or a final started, while this job was queued
+        if not session or not session.is_active or self.finals_in_flight:
+            return None
+
+        total_samples = session.n_samples
+        audio_array = session.get_audio_tail(self.partial_window)
+        if len(audio_array) < 1600 or not self.energy_gate.has_speech(audio_array, session.sample_rate):
+            return None
+
+        language = session.config.get('language') or 'auto'
+        whisper_language = None if language == 'auto' else language
+
+        with self.registry.acquire(self.partial_model) as model:
+            # Partials are superseded anyway: never pay for temperature fallback
+            result = model.transcribe(audio_array, language=whisper_language, n_threads=self.n_threads,
+                                      temperature_inc=0.0,
+                                      audio_ctx=audio_ctx_for(len(audio_array)) if self.dynamic_audio_ctx else 0)
+
+        t1 = total_samples / session.sample_rate
+        return {
+            'session_id': session_id,
+            'text': postprocess(result['text'], result['language'], session.config.get('post')),
+            't0': t1 - len(audio_array) / session.sample_rate,
+            't1': t1
+        }
+
+    @staticmethod
+    def empty_result(session_id: str) -> dict:
+        """Final result of a session without speech"""
+        return {
+            'session_id': session_id,
+            'text': '',
+            'segments': [],
+            'language': 'en',
+            'avg_logprob': 0.0,
+            'no_speech_prob': 1.0,
+            'words': [],
+            'retries': [],
+            'retry_seconds': 0.0,
+            'cache_hit': False
+        }
 
-            if len(audio_array) < 1600:  # Less than 0.1 seconds
-                return {
-                    'session_id': session_id,
-                    'text': '',
-                    'segments': [],
-                    'language': 'en',
-                    'avg_logprob': 0.0
-                }
+    def prepare_final(self, session_id: str) -> 'FinalJob':
+        """
+        First stage of a final: convert the buffer, gate, look up the cache, trim
+        and finish the mel. Silent sessions and cache hits leave with a response.
+        """
+        session = self.get_session(session_id)
+        if not session:
+            raise ValueError(f"Session {session_id} not found")
+
+        start = time.time()
+        job = FinalJob(session)
+        audio_array = session.get_audio_array()
+
+        if len(audio_array) < 1600:  # Less than 0.1 seconds
+            job.response = self.empty_result(session_id)
+            return job
+
+        # No plausible speech: decoding would only cost time and risk a hallucination
+        if not self.energy_gate.has_speech(audio_array, session.sample_rate):
+            logger.info(f"Skipping decode of {len(audio_array)/16000:.2f}s of silence for session {session_id}")
+            job.response = self.empty_result(session_id)
+            return job
 
-            logger.info(f"Transcribing {len(audio_array)/16000:.2f}s of audio for session {session_id}")
+        logger.info(f"Transcribing {len(audio_array)/16000:.2f}s of audio for session {session_id}")
 
-            # Get language from session config, default to 'auto' for auto-detection
-            # Handle None/null values by using 'auto'
-            language = session.config.get('language') or 'auto'
+        # Get language from session config, default to 'auto' for auto-detection
+        # Handle None/null values by using 'auto'
+        language = session.config.get('language') or 'auto'
 
-            # Convert 'auto' to None for whisper.cpp (None means auto-detect)
-            whisper_language = None if language == 'auto' else language
-            logger.info(f"Using language: {language} (whisper param: {whisper_language})")
+        # Convert 'auto' to None for whisper.cpp (None means auto-detect)
+        job.whisper_language = None if language == 'auto' else language
+        logger.info(f"Using language: {language} (whisper param: {job.whisper_language})")
 
-            # Use the in-memory model - MUCH faster!
-            result = self.model.transcribe(
+        # Retries and replays of the same audio are served from the cache
+        if self.cache is not None:
+            # A model swapped by reload_model produces different results under the same name
+            revision = self.registry.revision(session.model_name)
+            job.cache_key = make_cache_key(
                 audio_array,
-                language=whisper_language,
-                n_threads=4
+                f"{session.model_name}@{revision}" if revision else session.model_name,
+                job.whisper_language,
+                {'task': session.config.get('task'), 'post': session.config.get('post'),
+                 'fallback': self.fallback.mode}
             )
+            cached = self.cache.get(job.cache_key)
+            if cached is not None:
+                logger.info(f"Cache hit for session {session_id}")
+                cached['session_id'] = session_id
+                cached['cache_hit'] = True
+                job.response = cached
+                return job
+
+        # Only the speech is decoded; timestamps are shifted back afterwards
+        speech_start, speech_end = 0, len(audio_array)
+        if self.trim_silence:
+            speech_start, speech_end = self.energy_gate.speech_bounds(audio_array, session.sample_rate)
+            if (speech_start, speech_end) != (0, len(audio_array)):
+                logger.info(f"Trimmed {speech_start/16000:.2f}s leading and "
+                            f"{(len(audio_array) - speech_end)/16000:.2f}s trailing silence")
+        job.speech = audio_array[speech_start:speech_end]
+        job.offset = speech_start / session.sample_rate
+        job.mel = session.mel.finalize(speech_start, speech_end) if session.mel is not None else None
+
+        job.stage_seconds['prepare'] = time.time() - start
+        return job
+
+    def infer_final(self, job: 'FinalJob') -> 'FinalJob':
+        """Second stage of a final: the engine call, including low-confidence re-decodes"""
+        session = job.session
+
+        # Use the in-memory model - MUCH faster!
+        with self.registry.acquire(session.model_name) as model:
+            start = time.time()
+            result = transcribe_with_fallback(
+                model,
+                job.speech,
+                self.fallback,
+                language=job.whisper_language,
+                n_threads=self.n_threads,
+                dynamic_audio_ctx=self.dynamic_audio_ctx,
+                mel=job.mel
+            )
+            elapsed = time.time() - start
+        job.mel = None
 
-            full_text = result['text']
-            segments = result['segments']
-            language = result['language']
+        if job.offset:
+            result['segments'] = [shift_segment(segment, job.offset) for segment in result['segments']]
+            for retry in result['retries']:
+                retry['t0'] += job.offset
+                retry['t1'] += job.offset
 
-            logger.info(f"Transcription complete: '{full_text}' (language: {language})")
+        job.result = result
+        job.stage_seconds['infer'] = elapsed
+        return job
 
-            return {
-                'session_id': session_id,
-                'text': full_text,
-                'segments': segments,
-                'language': language,
-                'avg_logprob': 0.0
-            }
+    def finish_final(self, job: 'FinalJob') -> dict:
+        """Last stage of a final: scores, post-processing and the cache"""
+        start = time.time()
+        session = job.session
+        result = job.result
+
+        elapsed = job.stage_seconds['infer']
+        audio_duration = len(job.speech) / session.sample_rate
+        self.registry.record_run(session.model_name, audio_duration, elapsed)
+
+        full_text = result['text']
+        language = result['language']
+        scores = score_transcript(result)
+
+        logger.info(f"Transcription complete: '{full_text}' (language: {language}, "
+                    f"model: {session.model_name}, RTF: {elapsed / audio_duration:.3f}, "
+                    f"avg_logprob: {scores['avg_logprob']:.3f}, no_speech: {scores['no_speech_prob']:.2f})")
+
+        response = {
+            'session_id': job.session_id,
+            'text': postprocess(full_text, language, session.config.get('post')),
+            'segments': scores['segments'],
+            'language': language,
+            'avg_logprob': scores['avg_logprob'],
+            'no_speech_prob': scores['no_speech_prob'],
+            'words': scores['words'],
+            'retries': result['retries'],
+            'retry_seconds': result['retry_seconds'],
+            'cache_hit': False
+        }
+
+        if job.cache_key is not None:
+            self.cache.put(job.cache_key, response)
+
+        job.stage_seconds['finish'] = time.time() - start
+        logger.debug(f"Stages of {job.session_id}: " +
+                     ', '.join(f"{stage} {seconds * 1000:.1f}ms" for stage, seconds in job.stage_seconds.items()))
+        return response
+
+    def transcribe_session(self, session_id: str) -> dict:
+        """Transcribe audio from a session using whisper.cpp (all stages on the calling thread)"""
+        try:
+            job = self.prepare_final(session_id)
+            if job.response is not None:
+                return job.response
+            return self.finish_final(self.infer_final(job))
 
         except Exception as e:
             logger.error(f"Transcription failed for session {session_id}: {e}")
@@ -146,13 +685,29 @@ class WhisperCppBackend:
 class WebSocketServer:
     """WebSocket server handler"""
 
-    def __init__(self, backend: WhisperCppBackend):
+    def __init__(self, backend: WhisperCppBackend, unix_socket: Optional[str] = None):
         self.backend = backend
-
-    async def handle_client(self, websocket, path):
-        """Handle WebSocket client connection"""
+        self.unix_socket = unix_socket
+        # Clients on the Unix socket name their audio rings with this
+        self.ring_prefix = f"{RING_PREFIX}{secrets.token_hex(4)}_"
+        # Finals outlive the connection that asked for them (see handle_end_session)
+        self.final_tasks = set()
+
+    async def handle_client(self, websocket, path, local: bool = False):
+        """
+        Handle WebSocket client connection
+
+        Args:
+            websocket: The client connection
+            path: Request path
+            local: Whether it came through the Unix socket (only then may it share audio rings)
+        """
         client_addr = websocket.remote_address
         logger.info(f"Client connected: {client_addr}")
+        websocket.local = local
+        websocket.session_ids = set()
+        websocket.channels = {}
+        websocket.tasks = set()
 
         try:
             async for message in websocket:
@@ -167,6 +722,30 @@ class WebSocketServer:
             logger.info(f"Client disconnected: {client_addr}")
         except Exception as e:
             logger.error(f"Error handling client {client_addr}: {e}")
+        finally:
+            self.release_sessions(websocket)
+            for task in websocket.tasks:
+                task.cancel()
+
+    def release_sessions(self, websocket):
+        """Detach resumable sessions of a closed connection and drop the others"""
+        for session_id in websocket.session_ids:
+            session = self.backend.get_session(session_id)
+            # A session resumed on another connection no longer belongs to this one
+            if not session or session.websocket is not websocket:
+                continue
+            if session.resumable:
+                session.detached_at = time.monotonic()
+                logger.info(f"Session {session_id} detached, resumable for {self.backend.resume_ttl:.0f}s")
+            elif not session.finalizing:
+                self.backend.remove_session(session_id)
+
+    async def expire_sessions(self):
+        """Periodically drop detached sessions and results nobody came back for"""
+        interval = min(5.0, max(0.5, self.backend.resume_ttl / 4))
+        while True:
+            await asyncio.sleep(interval)
+            self.backend.expire_detached()
 
     async def handle_json_message(self, websocket, message_str: str):
         """Handle JSON messages from client"""
@@ -182,10 +761,25 @@ class WebSocketServer:
                 await self.handle_hello(websocket, message_id, data)
             elif message_type == 'start_session':
                 await self.handle_start_session(websocket, message_id, data)
+            elif message_type == 'audio_written':
+                await self.handle_audio_written(websocket, message_id, data)
             elif message_type == 'end_session':
-                await self.handle_end_session(websocket, message_id, data)
+                # Finals run in the background so other sessions on the connection keep
+                # streaming, and aren't cancelled with it: a resumed session still gets one
+                task = asyncio.create_task(self.handle_end_session(websocket, message_id, data))
+                self.final_tasks.add(task)
+                task.add_done_callback(self.final_tasks.discard)
+            elif message_type == 'resume_session':
+                await self.handle_resume_session(websocket, message_id, data)
             elif message_type == 'cancel':
                 await self.handle_cancel(websocket, message_id, data)
+            elif message_type == 'model_stats':
+                await self.handle_model_stats(websocket, message_id, data)
+            elif message_type == 'reload_model':
+                # Loading takes seconds; the connection keeps serving meanwhile
+                task = asyncio.create_task(self.handle_reload_model(websocket, message_id, data))
+                websocket.tasks.add(task)
+                task.add_done_callback(websocket.tasks.discard)
             else:
                 await self.send_error(websocket, message_id, 'UNSUPPORTED_MESSAGE', f'Unknown message type: {message_type}')
 
@@ -200,11 +794,23 @@ class WebSocketServer:
         """Handle audio chunk data"""
         logger.debug(f"Received {len(audio_data)} bytes of audio data")
 
-        if not hasattr(websocket, 'current_session_id'):
+        channel_frame = parse_channel_frame(audio_data)
+        if channel_frame is not None:
+            # Multiplexed: the header names the session
+            channel, seq, offset, pcm = channel_frame
+            session_id = websocket.channels.get(channel)
+            if session_id is None:
+                await self.send_error(websocket, None, 'UNKNOWN_CHANNEL', f'No session on channel {channel}')
+                return
+            frame = (seq, offset, pcm)
+        elif not hasattr(websocket, 'current_session_id'):
             logger.warning("No current session ID on websocket - audio chunk ignored")
             return
+        else:
+            # Legacy framing: audio belongs to the connection's current session
+            session_id = websocket.current_session_id
+            frame = None
 
-        session_id = websocket.current_session_id
         session = self.backend.get_session(session_id)
 
         if not session:
@@ -215,10 +821,106 @@ class WebSocketServer:
             logger.warning(f"Session {session_id} is not active - audio chunk ignored")
             return
 
-        session.add_audio_chunk(audio_data)
-        total_audio_duration = len(session.audio_buffer) / session.sample_rate
+        if frame is None and session.resumable:
+            frame = parse_audio_frame(audio_data)
+
+        if frame is None:
+            session.add_audio_chunk(audio_data)
+        else:
+            seq, offset, pcm = frame
+            if channel_frame is not None and offset + len(pcm) > session.last_ack_bytes + session.window_bytes:
+                # Per-session flow control: the client must wait for an audio_ack
+                await self.send_error(websocket, None, 'FLOW_CONTROL',
+                                      f'Frame ends past the window of {session.window_bytes} bytes '
+                                      f'after offset {session.last_ack_bytes}', session_id)
+                return
+            if not session.add_audio_frame(seq, offset, pcm):
+                logger.warning(f"Audio gap in session {session_id}: frame {seq} at byte {offset}, "
+                               f"expected {session.bytes_received}")
+                await self.send_audio_ack(websocket, session)
+                await self.send_error(websocket, None, 'AUDIO_GAP',
+                                      f'Expected audio at byte {session.bytes_received}, got {offset}', session_id)
+                return
+            if session.bytes_received - session.last_ack_bytes >= ACK_INTERVAL_BYTES:
+                await self.send_audio_ack(websocket, session)
+
+        total_audio_duration = session.n_samples / session.sample_rate
         logger.debug(f"Added {len(audio_data)} bytes to session {session_id}, total: {total_audio_duration:.2f}s")
 
+        if self.backend.should_run_partial(session):
+            asyncio.create_task(self.send_partial(websocket, session_id))
+
+    async def handle_audio_written(self, websocket, message_id: str, data: dict):
+        """Handle audio_written - the client has written new audio into the session's ring"""
+        session_id = data.get('sessionId')
+        session = self.backend.get_session(session_id)
+
+        if not session or session.ring is None:
+            await self.send_error(websocket, message_id, 'NO_AUDIO_RING', f'Session {session_id} has no audio ring', session_id)
+            return
+
+        if not session.is_active:
+            logger.warning(f"Session {session_id} is not active - ring audio ignored")
+            return
+
+        n_samples = session.drain_ring()
+        logger.debug(f"Read {n_samples} samples from the ring of session {session_id}, "
+                     f"total: {session.n_samples / session.sample_rate:.2f}s")
+
+        if self.backend.should_run_partial(session):
+            asyncio.create_task(self.send_partial(websocket, session_id))
+
+    def assign_channel(self, websocket, session: TranscriptionSession):
+        """Give a session the lowest free channel number on its connection"""
+        channel = 1
+        while channel in websocket.channels:
+            channel += 1
+        if channel > 0xFFFF:
+            raise RuntimeError('Too many sessions on one connection')
+        websocket.channels[channel] = session.session_id
+        session.channel = channel
+
+    def release_channel(self, session: TranscriptionSession):
+        """Free the channel a session holds on its connection"""
+        channels = getattr(session.websocket, 'channels', None)
+        if channels is not None and channels.get(session.channel) == session.session_id:
+            del channels[session.channel]
+        session.channel = None
+
+    async def send_audio_ack(self, websocket, session: TranscriptionSession):
+        """Tell the client how much audio has been received (it can drop anything before offset)"""
+        session.last_ack_bytes = session.bytes_received
+        response = {
+            'type': 'audio_ack',
+            'data': {
+                'sessionId': session.session_id,
+                'channel': session.channel,
+                'seq': session.last_seq,
+                'offset': session.bytes_received,
+                'window': session.window_bytes
+            }
+        }
+        await websocket.send(json.dumps(response))
+
+    async def send_partial(self, websocket, session_id: str):
+        """Decode and send a partial result for a session"""
+        try:
+            result = await self.backend.run_partial(session_id)
+            session = self.backend.get_session(session_id)
+            if result is None or not session or not session.is_active:
+                return
+
+            response = {
+                'type': 'partial',
+                'data': result
+            }
+            await websocket.send(json.dumps(response))
+
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        except Exception as e:
+            logger.error(f"Partial transcription failed for session {session_id}: {e}")
+
     async def handle_hello(self, websocket, message_id: str, data: dict):
         """Handle hello message"""
         logger.info(f"Hello from client - app_version: {data.get('app_version')}, locale: {data.get('locale')}")
@@ -228,9 +930,13 @@ class WebSocketServer:
             'id': message_id,
             'data': {
                 'serverVersion': '0.3.0',
-                'backend': 'whisper.cpp',
-                'gpu': 'Metal',
-                'models': ['large-v3-turbo', 'large-v3']
+                'backend': 'whisper.cpp' if self.backend.registry.engine == 'whispercpp' else self.backend.registry.engine,
+                'gpu': gpu_backend(self.backend.registry.engine, self.backend.registry.use_gpu),
+                'models': self.backend.registry.available(),
+                # Same-host clients may switch to the Unix socket, and there to shared-memory audio
+                'unixSocket': self.unix_socket,
+                'audioRing': websocket.local,
+                'audioRingPrefix': self.ring_prefix if websocket.local else None
             }
         }
 
@@ -244,11 +950,33 @@ class WebSocketServer:
             await self.send_error(websocket, message_id, 'BAD_REQUEST', 'sessionId is required')
             return
 
+        if self.backend.draining:
+            await self.send_error(websocket, message_id, 'SHUTTING_DOWN', 'Server is shutting down', session_id)
+            return
+
         # Create new session
         session = self.backend.create_session(session_id, data)
         session.is_active = True
 
-        logger.info(f"Started transcription session: {session_id}")
+        # Registered before anything is sent, so a disconnect from here on releases it
+        session.websocket = websocket
+        websocket.session_ids.add(session_id)
+        self.assign_channel(websocket, session)
+
+        ring_name = data.get('audioRing')
+        if ring_name and not websocket.local:
+            await self.send_error(websocket, message_id, 'RING_UNAVAILABLE',
+                                  'Shared-memory audio is only available over the Unix socket', session_id)
+        elif ring_name:
+            try:
+                session.ring = AudioRing.attach(ring_name, self.ring_prefix)
+                logger.info(f"Session {session_id} reads audio from shared memory ring {ring_name}")
+            except RingError as e:
+                # The session still works with audio over the WebSocket
+                logger.warning(str(e))
+                await self.send_error(websocket, message_id, 'RING_UNAVAILABLE', str(e), session_id)
+
+        logger.info(f"Started transcription session: {session_id} (channel {session.channel})")
 
         # Store current session in websocket context for audio chunks
         websocket.current_session_id = session_id
@@ -259,7 +987,11 @@ class WebSocketServer:
             'id': message_id,
             'data': {
                 'sessionId': session_id,
-                'status': 'ready'
+                'status': 'ready',
+                'resumable': session.resumable,
+                'channel': session.channel,
+                'window': session.window_bytes,
+                'audioRing': session.ring is not None
             }
         }
         await websocket.send(json.dumps(response))
@@ -273,39 +1005,188 @@ class WebSocketServer:
             await self.send_error(websocket, message_id, 'BAD_REQUEST', 'sessionId is required')
             return
 
+        # A repeated end_session (e.g. after a reconnect) is answered from the mailbox
+        result = self.backend.mailbox.get(session_id)
+        if result is not None:
+            await websocket.send(json.dumps({'type': 'final', 'data': result}))
+            return
+
+        # Stop accepting audio and partials for this session
+        session = self.backend.get_session(session_id)
+        if session:
+            if session.finalizing:
+                # The final goes to whichever connection owns the session when it's ready;
+                # asking again (e.g. from a new connection) makes that one the owner
+                logger.info(f"Session {session_id} is already being finalized")
+                if session.resumable and session.websocket is not websocket:
+                    self.release_channel(session)
+                    session.websocket = websocket
+                    session.detached_at = None
+                    websocket.session_ids.add(session_id)
+                return
+            # Audio written to the ring after the last audio_written still counts
+            if session.is_active:
+                session.drain_ring()
+            session.is_active = False
+            session.finalizing = True
+
+        # Transcribe the session (runs synchronously, but in executor). Shielded, so
+        # a cancelled handler (server shutdown) still lets the final settle below
+        final = asyncio.ensure_future(self.backend.run_final(session_id))
         try:
-            # Transcribe the session (runs synchronously, but in executor)
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, self.backend.transcribe_session, session_id)
+            result = await asyncio.shield(final)
+        except asyncio.CancelledError:
+            final.add_done_callback(
+                lambda task: self.settle_final(session_id, session, None if task.cancelled() or task.exception()
+                                               else task.result()))
+            raise
+        except Exception as e:
+            logger.error(f"Error ending session {session_id}: {e}")
+            # The final failed for good (e.g. an inference worker crashed twice)
+            self.settle_final(session_id, session, None)
+            try:
+                await self.send_error(websocket, message_id, 'INTERNAL', str(e), session_id)
+            except websockets.exceptions.ConnectionClosed:
+                pass
+            return
 
-            # Send final result
-            response = {
-                'type': 'final',
-                'data': result
-            }
-            await websocket.send(json.dumps(response))
+        self.settle_final(session_id, session, result)
+        if getattr(websocket, 'current_session_id', None) == session_id:
+            delattr(websocket, 'current_session_id')
 
-            # Clean up session
-            self.backend.remove_session(session_id)
-            if hasattr(websocket, 'current_session_id'):
-                delattr(websocket, 'current_session_id')
+        # Send final result to the connection that owns the session now
+        response = {
+            'type': 'final',
+            'data': result
+        }
+        target = session.websocket if session and session.websocket else websocket
+        try:
+            await target.send(json.dumps(response))
+        except websockets.exceptions.ConnectionClosed:
+            if session and session.resumable:
+                logger.info(f"Connection lost before the final of {session_id}, kept for resume")
+            else:
+                logger.info(f"Connection closed before the final of {session_id} was sent")
+
+    def settle_final(self, session_id: str, session: Optional[TranscriptionSession], result: Optional[dict]):
+        """Keep a finished final for a resume (resumable sessions) and drop its session"""
+        if result is not None and session and session.resumable:
+            self.backend.mailbox.put(session_id, result)
+        self.backend.remove_session(session_id)
+        if session:
+            self.release_channel(session)
+
+    async def handle_resume_session(self, websocket, message_id: str, data: dict):
+        """Handle resume_session command - reattach a session after a reconnect"""
+        session_id = data.get('sessionId')
 
-        except Exception as e:
-            logger.error(f"Error ending session {session_id}: {e}")
-            await self.send_error(websocket, message_id, 'INTERNAL', str(e))
+        if not session_id:
+            await self.send_error(websocket, message_id, 'BAD_REQUEST', 'sessionId is required')
+            return
+
+        result = self.backend.mailbox.get(session_id)
+        session = self.backend.get_session(session_id)
+
+        if result is None and (not session or not session.resumable):
+            await self.send_error(websocket, message_id, 'SESSION_NOT_FOUND',
+                                  f'Session {session_id} cannot be resumed', session_id)
+            return
+
+        if result is not None:
+            status = 'completed'
+            offset = None
+        else:
+            self.release_channel(session)
+            session.websocket = websocket
+            session.detached_at = None
+            websocket.session_ids.add(session_id)
+            self.assign_channel(websocket, session)
+            if session.finalizing:
+                status = 'finalizing'
+            else:
+                status = 'active'
+                websocket.current_session_id = session_id
+            offset = session.bytes_received
+
+        logger.info(f"Resumed session {session_id} ({status})")
+        response = {
+            'type': 'session_resumed',
+            'id': message_id,
+            'data': {
+                'sessionId': session_id,
+                'status': status,
+                'offset': offset,
+                'seq': session.last_seq if session else None,
+                'channel': session.channel if session and result is None else None
+            }
+        }
+        await websocket.send(json.dumps(response))
+
+        if result is not None:
+            await websocket.send(json.dumps({'type': 'final', 'data': result}))
 
     async def handle_cancel(self, websocket, message_id: str, data: dict):
         """Handle cancel command"""
         session_id = data.get('sessionId')
 
         if session_id:
+            session = self.backend.get_session(session_id)
+            if session:
+                self.release_channel(session)
             self.backend.remove_session(session_id)
 
-        if hasattr(websocket, 'current_session_id'):
-            delattr(websocket, 'current_session_id')
+        if getattr(websocket, 'current_session_id', None) == session_id or not session_id:
+            if hasattr(websocket, 'current_session_id'):
+                delattr(websocket, 'current_session_id')
 
         logger.info(f"Cancelled session: {session_id}")
 
+    async def handle_model_stats(self, websocket, message_id: str, data: dict):
+        """Handle model_stats command - report load time, memory and RTF per model variant"""
+        response = {
+            'type': 'model_stats',
+            'id': message_id,
+            'data': {
+                'models': self.backend.registry.stats(),
+                'loaded': self.backend.registry.loaded()
+            }
+        }
+        await websocket.send(json.dumps(response))
+
+    async def handle_reload_model(self, websocket, message_id: str, data: dict):
+        """Handle reload_model admin command - swap in a model without dropping sessions"""
+        model = data.get('model')
+
+        if not model:
+            await self.send_error(websocket, message_id, 'BAD_REQUEST', 'model is required')
+            return
+
+        make_default = bool(data.get('default', False))
+        try:
+            load_time = await self.backend.reload_model(model, data.get('path'), make_default)
+        except (OSError, ValueError, RuntimeError) as e:
+            logger.error(f"Reloading model {model} failed: {e}")
+            try:
+                await self.send_error(websocket, message_id, 'RELOAD_FAILED', str(e))
+            except websockets.exceptions.ConnectionClosed:
+                pass
+            return
+
+        response = {
+            'type': 'model_reloaded',
+            'id': message_id,
+            'data': {
+                'model': normalize_model_name(model),
+                'defaultModel': self.backend.registry.default_model,
+                'loadTime': round(load_time, 3),
+                'loaded': self.backend.registry.loaded()
+            }
+        }
+        try:
+            await websocket.send(json.dumps(response))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
     async def send_error(self, websocket, message_id: Optional[str], code: str, message: str, session_id: Optional[str] = None):
         """Send error message to client"""
         response = {
@@ -320,24 +1201,186 @@ class WebSocketServer:
         await websocket.send(json.dumps(response))
 
 
-async def main():
-    """Main server entry point"""
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments"""
     parser = argparse.ArgumentParser(description='UltraWhisper v3 Backend Server (whisper.cpp + Metal)')
     parser.add_argument('--port', type=int, default=0, help='Port to listen on (0 for random)')
     parser.add_argument('--host', default='127.0.0.1', help='Host to bind to')
+    parser.add_argument('--unix-socket', default=None, help='Also accept WebSocket connections on this Unix domain socket path (same-host clients)')
     parser.add_argument('--debug', action='store_true', help='Enable debug logging')
-
-    args = parser.parse_args()
-
+    parser.add_argument('--workers', type=int, default=1, help='Number of backend processes sharing the port, each with its own models')
+    parser.add_argument('--engine', choices=ENGINES, default='whispercpp', help="Inference engine; 'fake' simulates transcription without libwhisper or model files")
+    parser.add_argument('--isolate-workers', action='store_true', help='Run inference in supervised worker processes that are restarted after a native crash (the interrupted job is retried once)')
+    parser.add_argument('--fake-rtf', type=float, default=0.05, help='Compute seconds per audio second of the fake engine')
+    parser.add_argument('--fake-latency', type=float, default=0.02, help='Fixed seconds per call of the fake engine')
+    parser.add_argument('--models-dir', default=None, help='Directory containing ggml-*.bin models')
+    parser.add_argument('--default-model', default='large-v3-turbo', help='Model used when a session does not request one')
+    parser.add_argument('--model-ram-budget-mb', type=int, default=0, help='Evict idle models above this memory budget in MB (0 for unlimited)')
+    parser.add_argument('--quantized-dir', default=None, help='Cache directory for quantized models produced on demand')
+    parser.add_argument('--auto-quantize', action='store_true', help='Run the quantize tool in the background when a missing GGML computeType (e.g. q8_0) is requested')
+    parser.add_argument('--mmap-load', '--mmap', dest='mmap_load', action='store_true',
+                        help='Read model files through a memory mapping while loading (load I/O only: weights are '
+                             'still copied into each process, so it does not lower RSS with --workers)')
+    parser.add_argument('--warmup', default='clip', help="Warm-up audio run on every state after loading: 'clip' (bundled sample), 'synthetic', 'none' or a WAV path")
+    parser.add_argument('--threads', type=int, default=4, help='Threads per transcription')
+    parser.add_argument('--autotune', action='store_true', help='Benchmark pool size x threads once per host/model and apply the cached best configuration')
+    parser.add_argument('--autotune-force', action='store_true', help='Re-run autotuning even if a cached configuration exists')
+    parser.add_argument('--autotune-cache', default=None, help='Path of the autotune cache file')
+    parser.add_argument('--fallback', choices=FALLBACK_MODES, default='confidence', help="Decoding fallback: 'confidence' re-decodes only low-confidence segments with beam search, 'whisper' uses whisper.cpp's temperature fallback, 'off' disables both")
+    parser.add_argument('--fallback-logprob', type=float, default=-1.0, help='Segments with a lower avg_logprob are re-decoded')
+    parser.add_argument('--fallback-beam', type=int, default=5, help='Beam width of the re-decodes')
+    parser.add_argument('--fallback-budget', type=float, default=1.0, help='Seconds a session may spend on re-decodes')
+    parser.add_argument('--gate-rms-db', type=float, default=-50.0, help='20 ms frames with a lower RMS level (dBFS) count as silence')
+    parser.add_argument('--gate-peak-db', type=float, default=-35.0, help='20 ms frames with a lower peak level (dBFS) count as silence')
+    parser.add_argument('--gate-speech-ratio', type=float, default=0.1, help='Share of speech frames below which a session is not decoded (0 disables the energy gate)')
+    parser.add_argument('--no-trim-silence', action='store_true', help='Decode leading and trailing silence instead of trimming it')
+    parser.add_argument('--dynamic-audio-ctx', action='store_true', help='Shrink the encoder context to the decoded audio instead of the full 30s window')
+    parser.add_argument('--incremental-mel', action='store_true', help='Compute the log-mel spectrogram while audio streams in instead of after end_session (whisper.cpp engine; word timestamps become per-segment estimates)')
+    parser.add_argument('--prepare-ahead', type=int, default=2, help='Finals prepared ahead of a free engine state (bounded queue between the prepare and infer stages)')
+    parser.add_argument('--pack-max', type=int, default=0, help='Short finals queued together that may be decoded as one 30s window (0 disables utterance packing)')
+    parser.add_argument('--pool-size', type=int, default=1, help='Number of transcriptions that can run concurrently per model')
+    parser.add_argument('--partial-model', default=None, help='Small model (e.g. base, tiny) for live partial results; disabled if unset')
+    parser.add_argument('--partial-interval', type=float, default=1.0, help='Seconds of new audio between partial results')
+    parser.add_argument('--partial-window', type=float, default=10.0, help='Seconds of recent audio decoded for each partial')
+    parser.add_argument('--resume-ttl', type=float, default=60.0, help='Seconds a dropped session and its final stay resumable (0 disables resumption)')
+    parser.add_argument('--cache-mb', type=int, default=0, help='Memory budget for the transcription result cache in MB (0 disables the cache)')
+    parser.add_argument('--drain-timeout', type=float, default=30.0, help='Seconds a shutdown waits for running sessions and finals before closing connections')
+    parser.add_argument('--cache-dir', default=None, help='Directory for the on-disk result cache tier (requires --cache-mb)')
+
+    return parser.parse_args()
+
+
+def resolve_models_dir(args: argparse.Namespace) -> Path:
+    return Path(args.models_dir) if args.models_dir else Path(__file__).parent / "whisper.cpp" / "models"
+
+
+def tuned_config(args: argparse.Namespace, n_cpus: Optional[int] = None) -> Optional[dict]:
+    """
+    Pool size and thread count from autotuning, if it was requested
+
+    Args:
+        args: Parsed command line arguments
+        n_cpus: CPUs the configuration may use (default: all of them)
+
+    Returns:
+        The tuned configuration, or None when autotuning is off or doesn't apply
+    """
+    if not (args.autotune or args.autotune_force):
+        return None
+    if args.engine != 'whispercpp':
+        logger.warning(f"Autotuning only applies to the whisper.cpp engine, ignored for '{args.engine}'")
+        return None
+
+    # Imported lazily: only needed when tuning
+    from autotune import load_tuned_config
+
+    model_path = resolve_models_dir(args) / f"ggml-{normalize_model_name(args.default_model)}.bin"
+    return load_tuned_config(
+        model_path,
+        warmup_audio('clip'),
+        cache_path=Path(args.autotune_cache) if args.autotune_cache else None,
+        force=args.autotune_force,
+        n_cpus=n_cpus
+    )
+
+
+def tune_fleet(args: argparse.Namespace):
+    """
+    Autotune once for all workers of a fleet, before they are forked
+
+    Each worker gets its share of the CPUs. The benchmark runs in a spawned
+    process, so the workers don't inherit Metal/ggml state from the supervisor.
+    """
+    if not (args.autotune or args.autotune_force):
+        return
+    n_cpus = max(1, (os.cpu_count() or 4) // args.workers)
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        tuned = pool.apply(tuned_config, (args, n_cpus))
+    if tuned:
+        args.pool_size = tuned['pool_size']
+        args.threads = tuned['n_threads']
+    args.autotune = args.autotune_force = False
+
+
+def create_backend(args: argparse.Namespace) -> WhisperCppBackend:
+    """Create the transcription backend from command line arguments"""
+    cache = None
+    if args.cache_mb > 0:
+        cache = TranscriptionCache(max_bytes=args.cache_mb * 1024 * 1024, disk_dir=args.cache_dir)
+        logger.info(f"Transcription cache enabled ({args.cache_mb} MB)")
+
+    models_dir = resolve_models_dir(args)
+
+    pool_size = args.pool_size
+    n_threads = args.threads
+    engine_options = None
+    if args.engine == 'fake':
+        engine_options = {'rtf': args.fake_rtf, 'latency': args.fake_latency}
+
+    tuned = tuned_config(args)
+    if tuned:
+        pool_size = tuned['pool_size']
+        n_threads = tuned['n_threads']
+
+    return WhisperCppBackend(
+        cache=cache,
+        models_dir=models_dir,
+        default_model=args.default_model,
+        model_ram_budget_mb=args.model_ram_budget_mb,
+        quantized_dir=Path(args.quantized_dir) if args.quantized_dir else None,
+        auto_quantize=args.auto_quantize,
+        pool_size=pool_size,
+        partial_model=args.partial_model,
+        partial_interval=args.partial_interval,
+        partial_window=args.partial_window,
+        use_mmap=args.mmap_load,
+        warmup=args.warmup,
+        n_threads=n_threads,
+        engine=args.engine,
+        engine_options=engine_options,
+        resume_ttl=args.resume_ttl,
+        fallback=FallbackPolicy(
+            mode=args.fallback,
+            logprob_threshold=args.fallback_logprob,
+            beam_size=args.fallback_beam,
+            budget_seconds=args.fallback_budget
+        ),
+        energy_gate=EnergyGate(
+            rms_db=args.gate_rms_db,
+            peak_db=args.gate_peak_db,
+            speech_ratio=args.gate_speech_ratio
+        ),
+        trim_silence=not args.no_trim_silence,
+        dynamic_audio_ctx=args.dynamic_audio_ctx,
+        incremental_mel=args.incremental_mel,
+        prepare_ahead=args.prepare_ahead,
+        pack_max=args.pack_max,
+        isolated=args.isolate_workers
+    )
+
+
+async def main(args: argparse.Namespace, sock: Optional[socket.socket] = None):
+    """
+    Main server entry point
+
+    Args:
+        args: Parsed command line arguments
+        sock: Pre-bound listening socket when running as a fleet worker
+    """
     if args.debug:
         logging.getLogger().setLevel(logging.DEBUG)
 
     # Initialize backend
-    backend = WhisperCppBackend()
+    backend = create_backend(args)
     logger.info("Backend initialized successfully")
 
+    # The Unix socket path belongs to one process; fleet workers only share the TCP port
+    unix_socket = args.unix_socket if sock is None else None
+    if args.unix_socket and sock is not None:
+        logger.warning("--unix-socket is not supported with --workers, ignored")
+
     # Create WebSocket server
-    server_handler = WebSocketServer(backend)
+    server_handler = WebSocketServer(backend, unix_socket=unix_socket)
 
     # Start server
     try:
@@ -346,32 +1389,81 @@ async def main():
             path = getattr(websocket, 'path', '/ws')
             await server_handler.handle_client(websocket, path)
 
-        server = await websockets.serve(
-            websocket_handler,
-            args.host,
-            args.port
-        )
+        async def unix_handler(websocket):
+            path = getattr(websocket, 'path', '/ws')
+            await server_handler.handle_client(websocket, path, local=True)
+
+        if sock is not None:
+            server = await websockets.serve(websocket_handler, sock=sock)
+        else:
+            server = await websockets.serve(
+                websocket_handler,
+                args.host,
+                args.port
+            )
+
+        servers = [server]
+        if unix_socket:
+            # A socket file left behind by a crashed server would make the bind fail
+            if os.path.exists(unix_socket) and stat.S_ISSOCK(os.stat(unix_socket).st_mode):
+                os.unlink(unix_socket)
+            servers.append(await websockets.unix_serve(unix_handler, unix_socket))
+            # Only the user running the server may connect
+            os.chmod(unix_socket, 0o600)
 
         # Get the actual port
         actual_port = server.sockets[0].getsockname()[1]
 
-        # Print port for Flutter app to read
-        print(f"SERVER_PORT:{actual_port}")
-        sys.stdout.flush()
+        # Print port for Flutter app to read (the fleet supervisor prints it for workers)
+        if sock is None:
+            print(f"SERVER_PORT:{actual_port}")
+            if unix_socket:
+                print(f"SERVER_UNIX_SOCKET:{unix_socket}")
+            sys.stdout.flush()
 
         logger.info(f"WebSocket server started on {args.host}:{actual_port}")
-        logger.info(f"Using Metal GPU acceleration on Apple M3 Max")
+        if unix_socket:
+            logger.info(f"WebSocket server listening on Unix socket {unix_socket}")
 
-        # Set up signal handlers
-        def signal_handler(signum, frame):
-            logger.info("Shutting down server...")
-            server.close()
+        drain_tasks = []
 
-        signal.signal(signal.SIGINT, signal_handler)
-        signal.signal(signal.SIGTERM, signal_handler)
+        async def drain_and_close():
+            # Stop accepting connections but keep the open ones until they are done
+            for listener in servers:
+                listener.server.close()
+            if await backend.drain(args.drain_timeout):
+                logger.info("All sessions finished")
+            else:
+                logger.warning(f"Closing with {backend.busy_sessions()} sessions still running "
+                               f"after {args.drain_timeout:.0f}s")
+            for listener in servers:
+                listener.close()
+
+        # Set up signal handlers: the first signal drains, a second one closes right away
+        def signal_handler():
+            if backend.draining:
+                logger.info("Closing connections now...")
+                for listener in servers:
+                    listener.close()
+                return
+            logger.info(f"Shutting down server, draining for up to {args.drain_timeout:.0f}s...")
+            backend.draining = True
+            drain_tasks.append(asyncio.create_task(drain_and_close()))
+
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGTERM, signal_handler)
+        # Fleet workers ignore SIGINT: the supervisor turns Ctrl-C into SIGTERM
+        if sock is None:
+            loop.add_signal_handler(signal.SIGINT, signal_handler)
+
+        expiry = asyncio.create_task(server_handler.expire_sessions())
 
         # Wait for server to close
-        await server.wait_closed()
+        await asyncio.gather(*(listener.wait_closed() for listener in servers))
+        expiry.cancel()
+        backend.registry.close()
+        if unix_socket and os.path.exists(unix_socket):
+            os.unlink(unix_socket)
 
     except Exception as e:
         logger.error(f"Server error: {e}")
@@ -379,4 +1471,11 @@ async def main():
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    args = parse_args()
+
+    if args.workers > 1:
+        tune_fleet(args)
+        fleet = WorkerFleet(args.workers, args.host, args.port, lambda sock: asyncio.run(main(args, sock)))
+        sys.exit(fleet.run())
+
+    asyncio.run(main(args))
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Resumable and multiplexed session support
+Sequenced and channel-tagged audio frames, and a short-lived mailbox of finished results
+"""
+
+import logging
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Header of a sequenced audio frame: magic, sequence number, byte offset of the
+# PCM payload within the session's audio stream (all little-endian)
+FRAME_MAGIC = b'UWA1'
+FRAME_HEADER = struct.Struct('<4sIQ')
+
+# Header of a channel-tagged frame: magic, channel assigned by session_started,
+# sequence number and byte offset. Lets several sessions share one connection.
+CHANNEL_FRAME_MAGIC = b'UWC1'
+CHANNEL_FRAME_HEADER = struct.Struct('<4sHIQ')
+
+# Acknowledge received audio after at least this many bytes (0.5s of 16kHz PCM16)
+ACK_INTERVAL_BYTES = 16000
+
+# Unacknowledged audio a client may have in flight per multiplexed session (10s)
+WINDOW_BYTES = 320000
+
+
+def encode_audio_frame(seq: int, offset: int, pcm: bytes) -> bytes:
+    """Build a sequenced audio frame (used by clients and tests)"""
+    return FRAME_HEADER.pack(FRAME_MAGIC, seq, offset) + pcm
+
+
+def parse_audio_frame(data: bytes) -> Optional[Tuple[int, int, bytes]]:
+    """
+    Split a sequenced audio frame into (seq, offset, pcm)
+
+    Returns:
+        None if data doesn't start with the frame header
+    """
+    if len(data) < FRAME_HEADER.size or data[:4] != FRAME_MAGIC:
+        return None
+    _, seq, offset = FRAME_HEADER.unpack_from(data)
+    return seq, offset, data[FRAME_HEADER.size:]
+
+
+def encode_channel_frame(channel: int, seq: int, offset: int, pcm: bytes) -> bytes:
+    """Build a channel-tagged audio frame (used by clients and tests)"""
+    return CHANNEL_FRAME_HEADER.pack(CHANNEL_FRAME_MAGIC, channel, seq, offset) + pcm
+
+
+def parse_channel_frame(data: bytes) -> Optional[Tuple[int, int, int, bytes]]:
+    """
+    Split a channel-tagged audio frame into (channel, seq, offset, pcm)
+
+    Returns:
+        None if data doesn't start with the channel frame header
+    """
+    if len(data) < CHANNEL_FRAME_HEADER.size or data[:4] != CHANNEL_FRAME_MAGIC:
+        return None
+    _, channel, seq, offset = CHANNEL_FRAME_HEADER.unpack_from(data)
+    return channel, seq, offset, data[CHANNEL_FRAME_HEADER.size:]
+
+
+class ResultMailbox:
+    """
+    Finished results kept for a while so a reconnecting client can collect them
+
+    A final produced while its connection is gone (or that was lost on the way
+    out) is delivered again on resume_session or a repeated end_session instead
+    of being decoded a second time.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 256):
+        """
+        Initialize the mailbox
+
+        Args:
+            ttl: Seconds a result stays available
+            max_entries: Oldest results are dropped beyond this count
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._results: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, session_id: str, result: dict):
+        with self._lock:
+            self._results[session_id] = (time.monotonic() + self.ttl, result)
+            self._results.move_to_end(session_id)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def get(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._results.get(session_id)
+            if entry is None:
+                return None
+            expires_at, result = entry
+            if expires_at < time.monotonic():
+                del self._results[session_id]
+                return None
+            return result
+
+    def expire(self) -> List[str]:
+        """Drop expired results and return their session ids"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [session_id for session_id, (expires_at, _) in self._results.items() if expires_at < now]
+            for session_id in expired:
+                del self._results[session_id]
+        return expired
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._results)
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Custom-term correction
+Rewrites near-misses of the user's dictionary terms ("cube control" -> "kubectl")
+using an Aho-Corasick automaton for exact matches and a phonetic index for fuzzy ones
+"""
+
+import logging
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Longest run of transcript words compared against one term
+MAX_WINDOW_WORDS = 3
+
+# Terms shorter than this (normalized) are only corrected on exact matches
+MIN_FUZZY_LENGTH = 4
+
+# Largest phonetic-key edit distance still treated as a sound-alike
+MAX_KEY_DISTANCE = 2
+
+# Fuzzy candidates must also be this similar character-wise (1 - edit distance / length);
+# short words need more, or "pods" would become "codes"
+MIN_SIMILARITY = 0.5
+MIN_SHORT_SIMILARITY = 0.75
+SHORT_LENGTH = 8
+
+# Endings that make a word an inflection of a term rather than a misspelling of it
+INFLECTION_SUFFIXES = ('s', 'es', 'ed', 'd', 'ing', 'er', 'ers', 'ly')
+
+# Word lists telling whether a transcript word is already English (macOS ships the first)
+DICTIONARY_PATHS = ('/usr/share/dict/words', '/usr/dict/words')
+
+# Fuzzy lookups remembered per term set
+MEMO_SIZE = 8192
+
+WORD = re.compile(r"[A-Za-z0-9']+")
+NON_ALNUM = re.compile(r'[^a-z0-9]')
+
+# Letter pairs and letters mapped to a sound class; vowels are dropped after the first letter
+PHONETIC_DIGRAPHS = (('ph', 'F'), ('ck', 'K'), ('sh', 'X'), ('ch', 'X'), ('th', '0'), ('gh', ''), ('wh', 'W'))
+PHONETIC_LETTERS = {
+    'b': 'B', 'c': 'K', 'd': 'T', 'f': 'F', 'g': 'K', 'j': 'J', 'k': 'K', 'l': 'L', 'm': 'M',
+    'n': 'N', 'p': 'P', 'q': 'K', 'r': 'R', 's': 'S', 't': 'T', 'v': 'F', 'w': 'W', 'x': 'KS', 'z': 'S',
+}
+
+
+def normalize(text: str) -> str:
+    """Lowercase alphanumerics only, so spacing, case and punctuation don't matter"""
+    return NON_ALNUM.sub('', text.lower())
+
+
+def phonetic_key(normalized: str) -> str:
+    """Coarse sound-alike key of a normalized string (a simplified metaphone)"""
+    key = []
+    i = 0
+    while i < len(normalized):
+        pair = normalized[i:i + 2]
+        code = next((sound for digraph, sound in PHONETIC_DIGRAPHS if pair == digraph), None)
+        if code is not None:
+            i += 2
+        else:
+            char = normalized[i]
+            i += 1
+            if char == 'c' and normalized[i:i + 1] in ('e', 'i', 'y'):
+                code = 'S'
+            elif char.isdigit():
+                code = char
+            elif char in PHONETIC_LETTERS:
+                code = PHONETIC_LETTERS[char]
+            else:
+                # Vowels, h and y only count at the start
+                code = 'A' if not key and i == 1 else ''
+        if code and (not key or key[-1] != code):
+            key.append(code)
+    return ''.join(key)
+
+
+def edit_distance(a: str, b: str, limit: Optional[int] = None) -> int:
+    """Levenshtein distance, or limit + 1 as soon as it is known to exceed limit"""
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+@lru_cache(maxsize=1)
+def system_dictionary() -> Optional[FrozenSet[str]]:
+    """Lowercase words of the system word list, or None if there is none"""
+    for path in DICTIONARY_PATHS:
+        try:
+            with open(path, encoding='utf-8', errors='ignore') as f:
+                return frozenset(line.strip().lower() for line in f if line.strip())
+        except OSError:
+            continue
+    logger.warning("No system word list found: every transcript word is treated as English, "
+                   "so only capitalized or multi-word near-misses of terms are corrected")
+    return None
+
+
+def is_abbreviation(part: str, word: str) -> bool:
+    """Whether part abbreviates word: its letters in order, starting with the same one ("ctl", "control")"""
+    if len(part) < 2 or part[0] != word[:1]:
+        return False
+    letters = iter(word)
+    return all(char in letters for char in part)
+
+
+def substring_distance(pattern: str, text: str) -> int:
+    """Fewest edits turning pattern into some substring of text"""
+    previous = [0] * (len(text) + 1)
+    for i, char_p in enumerate(pattern, 1):
+        current = [i]
+        for j, char_t in enumerate(text, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_p != char_t)))
+        previous = current
+    return min(previous)
+
+
+def is_inflection(candidate: str, normalized: str) -> bool:
+    """Whether one string is the other plus an inflectional ending ("terraformed", "reporter")"""
+    edits = edit_distance(candidate, normalized)
+    for longer, shorter in ((candidate, normalized), (normalized, candidate)):
+        for suffix in INFLECTION_SUFFIXES:
+            if longer.endswith(suffix) and edit_distance(longer[:-len(suffix)], shorter) < edits:
+                return True
+    return False
+
+
+class AhoCorasick:
+    """Multi-pattern exact matcher, linear in the text length"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[str]] = [[]]
+
+        for pattern in patterns:
+            node = 0
+            for char in pattern:
+                if char not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+            self.output[node].append(pattern)
+
+        # Breadth-first failure links; depth-1 nodes fail to the root
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[child] = target if target != child else 0
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """All (start, end, pattern) occurrences in text"""
+        matches = []
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for pattern in self.output[node]:
+                matches.append((index + 1 - len(pattern), index + 1, pattern))
+        return matches
+
+
+class PhoneticIndex:
+    """
+    Phonetic keys indexed by their deletion neighbourhoods
+
+    Two keys within edit distance d share a variant with at most d characters
+    deleted from each, so a lookup is a handful of dictionary probes whatever
+    the number of terms.
+    """
+
+    def __init__(self, max_distance: int = MAX_KEY_DISTANCE):
+        self.max_distance = max_distance
+        self.variants: Dict[str, Set[str]] = {}
+
+    @staticmethod
+    def deletions(key: str, depth: int) -> Set[str]:
+        """key and every string obtained by deleting up to depth characters"""
+        found = {key}
+        frontier = {key}
+        for _ in range(depth):
+            frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+            found |= frontier
+        return found
+
+    def radius(self, key: str) -> int:
+        """Edit distance tolerated around a query key of this length"""
+        return min(self.max_distance, len(key) // 3)
+
+    def add(self, key: str):
+        # Deep enough for the radius of any query key this one is within reach of
+        depth = min(self.max_distance, -(-len(key) // 3))
+        for variant in self.deletions(key, depth):
+            self.variants.setdefault(variant, set()).add(key)
+
+    def search(self, key: str) -> List[Tuple[int, str]]:
+        """(distance, key) of every stored key within the radius of key"""
+        radius = self.radius(key)
+        candidates: Set[str] = set()
+        for variant in self.deletions(key, radius):
+            candidates |= self.variants.get(variant, set())
+        results = []
+        for candidate in candidates:
+            distance = edit_distance(key, candidate, radius)
+            if distance <= radius:
+                results.append((distance, candidate))
+        return results
+
+
+class TermCorrector:
+    """Index over one dictionary of custom terms"""
+
+    def __init__(self, terms: Iterable[str], dictionary: Optional[FrozenSet[str]] = None):
+        """
+        Index the terms
+
+        Args:
+            terms: The user's custom terms
+            dictionary: Lowercase English words (default: the system word list)
+        """
+        self.dictionary = dictionary if dictionary is not None else system_dictionary()
+        self.terms: Dict[str, str] = {}
+        for term in terms:
+            normalized = normalize(term)
+            if normalized:
+                self.terms.setdefault(normalized, term.strip())
+
+        self.automaton = AhoCorasick(self.terms)
+        # Terms that are also ordinary words ("Rust", "Notion") need a capital to be matched
+        self.word_terms = {normalized for normalized in self.terms
+                           if self.dictionary is not None and self.is_word(normalized)}
+
+        self.by_key: Dict[str, List[str]] = {}
+        self.index = PhoneticIndex()
+        for normalized in self.terms:
+            if len(normalized) >= MIN_FUZZY_LENGTH:
+                key = phonetic_key(normalized)
+                self.by_key.setdefault(key, []).append(normalized)
+                self.index.add(key)
+
+        # Fuzzy lookups by window text; speech repeats itself
+        self.memo: Dict[str, Optional[Tuple[int, float, str]]] = {}
+
+    def is_word(self, word: str) -> bool:
+        """Whether a lowercase word (or its stem) is English; without a word list, any word is"""
+        if self.dictionary is None:
+            return True
+        word = word.split("'")[0]
+        return word in self.dictionary or any(
+            word.endswith(suffix) and word[:-len(suffix)] in self.dictionary for suffix in INFLECTION_SUFFIXES
+        )
+
+    def correct(self, text: str, fuzzy: bool = True) -> str:
+        """Rewrite exact (case/spacing) and, if fuzzy, sound-alike occurrences of the terms"""
+        if not self.terms or not text:
+            return text
+
+        matches = self._exact_matches(text)
+        if fuzzy and self.by_key:
+            matches.extend(self._fuzzy_matches(text, matches))
+
+        parts = []
+        position = 0
+        for start, end, term in sorted(matches):
+            parts.append(text[position:start])
+            parts.append(term)
+            position = end
+        parts.append(text[position:])
+        return ''.join(parts)
+
+    def _exact_matches(self, text: str) -> List[Tuple[int, int, str]]:
+        """Term occurrences ignoring case and spacing, aligned to word boundaries"""
+        stream = []
+        positions = []
+        starts = set()
+        ends = set()
+        previous_alnum = False
+        for index, char in enumerate(text.lower()):
+            alnum = char.isascii() and char.isalnum()
+            if alnum:
+                if not previous_alnum:
+                    starts.add(len(stream))
+                stream.append(char)
+                positions.append(index)
+            elif previous_alnum:
+                ends.add(len(stream))
+            previous_alnum = alnum
+        ends.add(len(stream))
+
+        # Leftmost-longest, non-overlapping
+        found = sorted(
+            (m for m in self.automaton.find(''.join(stream)) if m[0] in starts and m[1] in ends),
+            key=lambda m: (m[0], -(m[1] - m[0]))
+        )
+        matches = []
+        covered = 0
+        for start, end, pattern in found:
+            if start >= covered:
+                first, last = positions[start], positions[end - 1] + 1
+                if pattern in self.word_terms and not self._capitalized(text, first, last, self.terms[pattern]):
+                    continue
+                matches.append((first, last, self.terms[pattern]))
+                covered = end
+        return matches
+
+    @staticmethod
+    def _capitalized(text: str, start: int, end: int, term: str) -> bool:
+        """Whether text[start:end] is written as the term, or capitalized other than by starting a sentence"""
+        if text[start:end] == term:
+            return True
+        before = text[:start].rstrip()
+        return text[start].isupper() and bool(before) and before[-1] not in '.!?'
+
+    def _fuzzy_matches(self, text: str, taken: List[Tuple[int, int, str]]) -> List[Tuple[int, int, str]]:
+        """Sound-alike runs of up to MAX_WINDOW_WORDS words outside the exact matches"""
+        words = [m for m in WORD.finditer(text)
+                 if not any(start < m.end() and m.start() < end for start, end, _ in taken)]
+        candidates = []
+        for i in range(len(words)):
+            for n in range(1, min(MAX_WINDOW_WORDS, len(words) - i) + 1):
+                # Only words separated by spaces or hyphens run together
+                if n > 1 and text[words[i + n - 2].end():words[i + n - 1].start()].strip(' -'):
+                    break
+                # A word that is already English is never replaced on its own
+                if n == 1 and self.is_word(words[i].group().lower()):
+                    continue
+                window = [normalize(w.group()) for w in words[i:i + n]]
+                match = self._best_term(''.join(window))
+                if match and (n == 1 or self._window_fits(window, match, words[i:i + n])):
+                    distance, similarity, term = match
+                    candidates.append((distance, -similarity, i, i + n, term))
+
+        # Closest windows first, so "use postgres sequel" yields "use PostgreSQL"
+        matches = []
+        used = [False] * len(words)
+        for _, _, first, last, term in sorted(candidates):
+            if not any(used[first:last]):
+                used[first:last] = [True] * (last - first)
+                matches.append((words[first].start(), words[last - 1].end(), term))
+        return matches
+
+    def _window_fits(self, window: List[str], match: Tuple[int, float, str], words: List[re.Match]) -> bool:
+        """
+        Stricter test for multi-word windows
+
+        A window holding a word that isn't English (the usual trace of a misheard
+        term) passes if every word sounds like part of the term. A window of real
+        words must spell the term out instead: split into one part per word, each
+        a close spelling or an abbreviation of its word ("cube control" -> kube|ctl),
+        so "make back" is not taken for "MacBook".
+        """
+        normalized = normalize(match[2])
+        if all(self.is_word(w.group().lower()) for w in words):
+            return self._spells_out(window, normalized)
+
+        term_key = phonetic_key(normalized)
+        for word in window:
+            key = phonetic_key(word)
+            if not key or substring_distance(key, term_key) > len(key) // 3:
+                return False
+        return True
+
+    def _spells_out(self, window: List[str], normalized: str) -> bool:
+        """Whether normalized splits into consecutive parts, one per word, each close to or abbreviating it"""
+        word = window[0]
+        if len(window) == 1:
+            return self._part_fits(word, normalized)
+        return any(self._part_fits(word, normalized[:i]) and self._spells_out(window[1:], normalized[i:])
+                   for i in range(1, len(normalized) - len(window) + 2))
+
+    @staticmethod
+    def _part_fits(word: str, part: str) -> bool:
+        length = max(len(word), len(part))
+        return is_abbreviation(part, word) or 1 - edit_distance(word, part) / length >= MIN_SHORT_SIMILARITY
+
+    def _best_term(self, candidate: str) -> Optional[Tuple[int, float, str]]:
+        """(phonetic distance, similarity, term) of the closest sound-alike term, if any"""
+        if len(candidate) < MIN_FUZZY_LENGTH or candidate in self.terms:
+            return None
+        if candidate in self.memo:
+            return self.memo[candidate]
+        if len(self.memo) >= MEMO_SIZE:
+            self.memo.clear()
+
+        best = None
+        for distance, found in self.index.search(phonetic_key(candidate)):
+            for normalized in self.by_key[found]:
+                length = max(len(candidate), len(normalized))
+                threshold = MIN_SHORT_SIMILARITY if length < SHORT_LENGTH else MIN_SIMILARITY
+                max_edits = int((1 - threshold) * length)
+                edits = edit_distance(candidate, normalized, max_edits)
+                if edits <= max_edits and not is_inflection(candidate, normalized):
+                    similarity = 1 - edits / length
+                    if best is None or (distance, -similarity) < best[:2]:
+                        best = (distance, -similarity, normalized)
+        match = (best[0], -best[1], self.terms[best[2]]) if best else None
+        self.memo[candidate] = match
+        return match
+
+
+@lru_cache(maxsize=16)
+def _corrector(terms: Tuple[str, ...], dictionary: Optional[FrozenSet[str]]) -> TermCorrector:
+    return TermCorrector(terms, dictionary)
+
+
+def get_corrector(terms: Iterable[str], dictionary: Optional[FrozenSet[str]] = None) -> TermCorrector:
+    """Corrector for a term set, built once and shared by every session using it"""
+    return _corrector(tuple(sorted(set(terms))), dictionary)
+
+
+def correct_terms(text: str, terms: Optional[List[str]], language: Optional[str] = None,
+                  dictionary: Optional[FrozenSet[str]] = None) -> str:
+    """
+    Rewrite near-misses of custom terms in a transcript
+
+    Sound-alike matching only applies to Latin-script transcripts; in Japanese
+    only exact (case/spacing-insensitive) occurrences are normalized. Words that
+    are already English (per dictionary, default the system word list) are
+    left alone unless capitalized.
+    """
+    if not terms:
+        return text
+    return get_corrector(terms, dictionary).correct(text, fuzzy=language != 'ja')
@@ -5,11 +5,16 @@ Provides efficient in-memory transcription using libwhisper.dylib
 """
 
 import ctypes
+import mmap
 import os
+import queue
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import numpy as np
 
+from engine import TOKEN_DTYPE
+
 # Load the whisper library
 backend_dir = Path(__file__).parent
 lib_path = backend_dir / "whisper.cpp" / "build" / "src" / "libwhisper.dylib"
@@ -21,6 +26,13 @@ libwhisper = ctypes.CDLL(str(lib_path))
 
 
 # Define structures
+class WhisperAheads(ctypes.Structure):
+    _fields_ = [
+        ("n_heads", ctypes.c_size_t),
+        ("heads", ctypes.c_void_p),
+    ]
+
+
 class WhisperContextParams(ctypes.Structure):
     _fields_ = [
         ("use_gpu", ctypes.c_bool),
@@ -29,11 +41,118 @@ class WhisperContextParams(ctypes.Structure):
         ("dtw_token_timestamps", ctypes.c_bool),
         ("dtw_aheads_preset", ctypes.c_int),
         ("dtw_n_top", ctypes.c_int),
-        ("dtw_aheads", ctypes.c_void_p),  # Simplified
+        ("dtw_aheads", WhisperAheads),
         ("dtw_mem_size", ctypes.c_size_t),
     ]
 
 
+class WhisperGreedyParams(ctypes.Structure):
+    _fields_ = [
+        ("best_of", ctypes.c_int),
+    ]
+
+
+class WhisperBeamSearchParams(ctypes.Structure):
+    _fields_ = [
+        ("beam_size", ctypes.c_int),
+        ("patience", ctypes.c_float),
+    ]
+
+
+class WhisperVadParams(ctypes.Structure):
+    _fields_ = [
+        ("threshold", ctypes.c_float),
+        ("min_speech_duration_ms", ctypes.c_int),
+        ("min_silence_duration_ms", ctypes.c_int),
+        ("max_speech_duration_s", ctypes.c_float),
+        ("speech_pad_ms", ctypes.c_int),
+        ("samples_overlap", ctypes.c_float),
+    ]
+
+
+# Mirrors struct whisper_full_params in whisper.h (v1.8.2) field for field,
+# so it can be passed by value and every field is at the right offset
+class WhisperFullParams(ctypes.Structure):
+    _fields_ = [
+        ("strategy", ctypes.c_int),
+        ("n_threads", ctypes.c_int),
+        ("n_max_text_ctx", ctypes.c_int),
+        ("offset_ms", ctypes.c_int),
+        ("duration_ms", ctypes.c_int),
+        ("translate", ctypes.c_bool),
+        ("no_context", ctypes.c_bool),
+        ("no_timestamps", ctypes.c_bool),
+        ("single_segment", ctypes.c_bool),
+        ("print_special", ctypes.c_bool),
+        ("print_progress", ctypes.c_bool),
+        ("print_realtime", ctypes.c_bool),
+        ("print_timestamps", ctypes.c_bool),
+        ("token_timestamps", ctypes.c_bool),
+        ("thold_pt", ctypes.c_float),
+        ("thold_ptsum", ctypes.c_float),
+        ("max_len", ctypes.c_int),
+        ("split_on_word", ctypes.c_bool),
+        ("max_tokens", ctypes.c_int),
+        ("debug_mode", ctypes.c_bool),
+        ("audio_ctx", ctypes.c_int),
+        ("tdrz_enable", ctypes.c_bool),
+        ("suppress_regex", ctypes.c_char_p),
+        ("initial_prompt", ctypes.c_char_p),
+        ("carry_initial_prompt", ctypes.c_bool),
+        ("prompt_tokens", ctypes.c_void_p),
+        ("prompt_n_tokens", ctypes.c_int),
+        ("language", ctypes.c_char_p),
+        ("detect_language", ctypes.c_bool),
+        ("suppress_blank", ctypes.c_bool),
+        ("suppress_nst", ctypes.c_bool),
+        ("temperature", ctypes.c_float),
+        ("max_initial_ts", ctypes.c_float),
+        ("length_penalty", ctypes.c_float),
+        ("temperature_inc", ctypes.c_float),
+        ("entropy_thold", ctypes.c_float),
+        ("logprob_thold", ctypes.c_float),
+        ("no_speech_thold", ctypes.c_float),
+        ("greedy", WhisperGreedyParams),
+        ("beam_search", WhisperBeamSearchParams),
+        ("new_segment_callback", ctypes.c_void_p),
+        ("new_segment_callback_user_data", ctypes.c_void_p),
+        ("progress_callback", ctypes.c_void_p),
+        ("progress_callback_user_data", ctypes.c_void_p),
+        ("encoder_begin_callback", ctypes.c_void_p),
+        ("encoder_begin_callback_user_data", ctypes.c_void_p),
+        ("abort_callback", ctypes.c_void_p),
+        ("abort_callback_user_data", ctypes.c_void_p),
+        ("logits_filter_callback", ctypes.c_void_p),
+        ("logits_filter_callback_user_data", ctypes.c_void_p),
+        ("grammar_rules", ctypes.c_void_p),
+        ("n_grammar_rules", ctypes.c_size_t),
+        ("i_start_rule", ctypes.c_size_t),
+        ("grammar_penalty", ctypes.c_float),
+        ("vad", ctypes.c_bool),
+        ("vad_model_path", ctypes.c_char_p),
+        ("vad_params", WhisperVadParams),
+    ]
+
+
+class WhisperTokenData(ctypes.Structure):
+    _fields_ = [
+        ("id", ctypes.c_int32),
+        ("tid", ctypes.c_int32),
+        ("p", ctypes.c_float),
+        ("plog", ctypes.c_float),
+        ("pt", ctypes.c_float),
+        ("ptsum", ctypes.c_float),
+        ("t0", ctypes.c_int64),
+        ("t1", ctypes.c_int64),
+        ("t_dtw", ctypes.c_int64),
+        ("vlen", ctypes.c_float),
+    ]
+
+
+# Token arrays are filled in place and viewed as TOKEN_DTYPE without copying
+assert ctypes.sizeof(WhisperTokenData) == TOKEN_DTYPE.itemsize
+
+
 # Opaque pointers
 class WhisperContext(ctypes.Structure):
     pass
@@ -52,22 +171,43 @@ libwhisper.whisper_init_from_file_with_params.argtypes = [
 ]
 libwhisper.whisper_init_from_file_with_params.restype = ctypes.POINTER(WhisperContext)
 
+libwhisper.whisper_init_from_buffer_with_params.argtypes = [
+    ctypes.c_void_p,
+    ctypes.c_size_t,
+    WhisperContextParams
+]
+libwhisper.whisper_init_from_buffer_with_params.restype = ctypes.POINTER(WhisperContext)
+
 libwhisper.whisper_free.argtypes = [ctypes.POINTER(WhisperContext)]
 libwhisper.whisper_free.restype = None
 
-# We need a reference to whisper_full_params, but it's complex
-# So we'll use the C function to get default params
-libwhisper.whisper_full_default_params_by_ref.argtypes = [ctypes.c_int]
-libwhisper.whisper_full_default_params_by_ref.restype = ctypes.c_void_p
+libwhisper.whisper_init_state.argtypes = [ctypes.POINTER(WhisperContext)]
+libwhisper.whisper_init_state.restype = ctypes.POINTER(WhisperState)
+
+libwhisper.whisper_free_state.argtypes = [ctypes.POINTER(WhisperState)]
+libwhisper.whisper_free_state.restype = None
+
+# Default params are returned by value into a Python-owned struct
+libwhisper.whisper_full_default_params.argtypes = [ctypes.c_int]
+libwhisper.whisper_full_default_params.restype = WhisperFullParams
 
 libwhisper.whisper_full.argtypes = [
     ctypes.POINTER(WhisperContext),
-    ctypes.c_void_p,  # whisper_full_params pointer
+    WhisperFullParams,
     ctypes.POINTER(ctypes.c_float),  # audio data
     ctypes.c_int  # number of samples
 ]
 libwhisper.whisper_full.restype = ctypes.c_int
 
+libwhisper.whisper_full_with_state.argtypes = [
+    ctypes.POINTER(WhisperContext),
+    ctypes.POINTER(WhisperState),
+    WhisperFullParams,
+    ctypes.POINTER(ctypes.c_float),  # audio data
+    ctypes.c_int  # number of samples
+]
+libwhisper.whisper_full_with_state.restype = ctypes.c_int
+
 libwhisper.whisper_full_n_segments.argtypes = [ctypes.POINTER(WhisperContext)]
 libwhisper.whisper_full_n_segments.restype = ctypes.c_int
 
@@ -92,54 +232,380 @@ libwhisper.whisper_full_get_segment_t1.restype = ctypes.c_int64
 libwhisper.whisper_full_lang_id.argtypes = [ctypes.POINTER(WhisperContext)]
 libwhisper.whisper_full_lang_id.restype = ctypes.c_int
 
+# Same accessors for results stored in a separately allocated state
+libwhisper.whisper_full_n_segments_from_state.argtypes = [ctypes.POINTER(WhisperState)]
+libwhisper.whisper_full_n_segments_from_state.restype = ctypes.c_int
+
+libwhisper.whisper_full_get_segment_text_from_state.argtypes = [
+    ctypes.POINTER(WhisperState),
+    ctypes.c_int
+]
+libwhisper.whisper_full_get_segment_text_from_state.restype = ctypes.c_char_p
+
+libwhisper.whisper_full_get_segment_t0_from_state.argtypes = [
+    ctypes.POINTER(WhisperState),
+    ctypes.c_int
+]
+libwhisper.whisper_full_get_segment_t0_from_state.restype = ctypes.c_int64
+
+libwhisper.whisper_full_get_segment_t1_from_state.argtypes = [
+    ctypes.POINTER(WhisperState),
+    ctypes.c_int
+]
+libwhisper.whisper_full_get_segment_t1_from_state.restype = ctypes.c_int64
+
+libwhisper.whisper_full_lang_id_from_state.argtypes = [ctypes.POINTER(WhisperState)]
+libwhisper.whisper_full_lang_id_from_state.restype = ctypes.c_int
+
 libwhisper.whisper_lang_str.argtypes = [ctypes.c_int]
 libwhisper.whisper_lang_str.restype = ctypes.c_char_p
 
+# Token level results
+libwhisper.whisper_full_n_tokens.argtypes = [ctypes.POINTER(WhisperContext), ctypes.c_int]
+libwhisper.whisper_full_n_tokens.restype = ctypes.c_int
+
+libwhisper.whisper_full_get_token_data.argtypes = [
+    ctypes.POINTER(WhisperContext),
+    ctypes.c_int,  # segment
+    ctypes.c_int  # token
+]
+libwhisper.whisper_full_get_token_data.restype = WhisperTokenData
+
+libwhisper.whisper_full_get_token_text.argtypes = [
+    ctypes.POINTER(WhisperContext),
+    ctypes.c_int,  # segment
+    ctypes.c_int  # token
+]
+libwhisper.whisper_full_get_token_text.restype = ctypes.c_char_p
+
+libwhisper.whisper_full_get_segment_no_speech_prob.argtypes = [ctypes.POINTER(WhisperContext), ctypes.c_int]
+libwhisper.whisper_full_get_segment_no_speech_prob.restype = ctypes.c_float
+
+libwhisper.whisper_full_n_tokens_from_state.argtypes = [ctypes.POINTER(WhisperState), ctypes.c_int]
+libwhisper.whisper_full_n_tokens_from_state.restype = ctypes.c_int
+
+libwhisper.whisper_full_get_token_data_from_state.argtypes = [
+    ctypes.POINTER(WhisperState),
+    ctypes.c_int,  # segment
+    ctypes.c_int  # token
+]
+libwhisper.whisper_full_get_token_data_from_state.restype = WhisperTokenData
+
+libwhisper.whisper_full_get_token_text_from_state.argtypes = [
+    ctypes.POINTER(WhisperContext),
+    ctypes.POINTER(WhisperState),
+    ctypes.c_int,  # segment
+    ctypes.c_int  # token
+]
+libwhisper.whisper_full_get_token_text_from_state.restype = ctypes.c_char_p
+
+libwhisper.whisper_full_get_segment_no_speech_prob_from_state.argtypes = [ctypes.POINTER(WhisperState), ctypes.c_int]
+libwhisper.whisper_full_get_segment_no_speech_prob_from_state.restype = ctypes.c_float
+
+# Ids at or above end-of-text are special (sot, language, timestamps, ...)
+libwhisper.whisper_token_eot.argtypes = [ctypes.POINTER(WhisperContext)]
+libwhisper.whisper_token_eot.restype = ctypes.c_int
+
+libwhisper.whisper_lang_max_id.argtypes = []
+libwhisper.whisper_lang_max_id.restype = ctypes.c_int
+
+# Language detection runs the encoder on a mel computed by pcm_to_mel
+libwhisper.whisper_pcm_to_mel.argtypes = [
+    ctypes.POINTER(WhisperContext),
+    ctypes.POINTER(ctypes.c_float),
+    ctypes.c_int,
+    ctypes.c_int  # n_threads
+]
+libwhisper.whisper_pcm_to_mel.restype = ctypes.c_int
+
+libwhisper.whisper_pcm_to_mel_with_state.argtypes = [
+    ctypes.POINTER(WhisperContext),
+    ctypes.POINTER(WhisperState),
+    ctypes.POINTER(ctypes.c_float),
+    ctypes.c_int,
+    ctypes.c_int  # n_threads
+]
+libwhisper.whisper_pcm_to_mel_with_state.restype = ctypes.c_int
+
+# A mel computed outside the library (see mel.py) replaces pcm_to_mel
+libwhisper.whisper_set_mel.argtypes = [
+    ctypes.POINTER(WhisperContext),
+    ctypes.POINTER(ctypes.c_float),
+    ctypes.c_int,  # n_len
+    ctypes.c_int  # n_mel
+]
+libwhisper.whisper_set_mel.restype = ctypes.c_int
+
+libwhisper.whisper_set_mel_with_state.argtypes = [
+    ctypes.POINTER(WhisperContext),
+    ctypes.POINTER(WhisperState),
+    ctypes.POINTER(ctypes.c_float),
+    ctypes.c_int,  # n_len
+    ctypes.c_int  # n_mel
+]
+libwhisper.whisper_set_mel_with_state.restype = ctypes.c_int
+
+libwhisper.whisper_lang_auto_detect.argtypes = [
+    ctypes.POINTER(WhisperContext),
+    ctypes.c_int,  # offset_ms
+    ctypes.c_int,  # n_threads
+    ctypes.POINTER(ctypes.c_float)  # lang_probs
+]
+libwhisper.whisper_lang_auto_detect.restype = ctypes.c_int
+
+libwhisper.whisper_lang_auto_detect_with_state.argtypes = [
+    ctypes.POINTER(WhisperContext),
+    ctypes.POINTER(WhisperState),
+    ctypes.c_int,  # offset_ms
+    ctypes.c_int,  # n_threads
+    ctypes.POINTER(ctypes.c_float)  # lang_probs
+]
+libwhisper.whisper_lang_auto_detect_with_state.restype = ctypes.c_int
+
+
+class WhisperTimings(ctypes.Structure):
+    _fields_ = [
+        ("sample_ms", ctypes.c_float),
+        ("encode_ms", ctypes.c_float),
+        ("decode_ms", ctypes.c_float),
+        ("batchd_ms", ctypes.c_float),
+        ("prompt_ms", ctypes.c_float),
+    ]
+
+
+# Performance information (default state only)
+libwhisper.whisper_get_timings.argtypes = [ctypes.POINTER(WhisperContext)]
+libwhisper.whisper_get_timings.restype = ctypes.POINTER(WhisperTimings)
+
+# whisper_get_timings returns a C++ `new` allocation with no matching free function,
+# and releasing it through another allocator is undefined, so each call leaks its
+# 20 bytes; callers fetch it once per benchmark run, never per transcription
+
+libwhisper.whisper_reset_timings.argtypes = [ctypes.POINTER(WhisperContext)]
+libwhisper.whisper_reset_timings.restype = None
+
+libwhisper.whisper_bench_memcpy_str.argtypes = [ctypes.c_int]
+libwhisper.whisper_bench_memcpy_str.restype = ctypes.c_char_p
+
 
 # Sampling strategy enum
 WHISPER_SAMPLING_GREEDY = 0
 WHISPER_SAMPLING_BEAM_SEARCH = 1
 
+# Map language codes
+LANGUAGE_ALIASES = {
+    'en': 'en',
+    'english': 'en',
+    'ja': 'ja',
+    'japanese': 'ja',
+}
+
+
+def bench_memcpy(n_threads: int = 1) -> str:
+    """Run whisper.cpp's memcpy bandwidth benchmark and return its report"""
+    report = libwhisper.whisper_bench_memcpy_str(n_threads)
+    return report.decode('utf-8') if report else ""
+
 
 class WhisperModel:
     """High-level Python wrapper for whisper.cpp model"""
 
-    def __init__(self, model_path: str, use_gpu: bool = True):
+    def __init__(self, model_path: str, use_gpu: bool = True, n_states: int = 1, use_mmap: bool = False):
         """
         Initialize whisper model
 
         Args:
             model_path: Path to the .bin model file
             use_gpu: Whether to use GPU acceleration (Metal on macOS)
+            n_states: Number of decoding states, i.e. transcriptions that can run concurrently
+            use_mmap: Read the model file through a read-only memory mapping while loading
         """
         self.model_path = model_path
+        self.states: List = []
 
         # Get default context params
         cparams = libwhisper.whisper_context_default_params()
         cparams.use_gpu = use_gpu
 
         # Load model
-        self.ctx = libwhisper.whisper_init_from_file_with_params(
-            model_path.encode('utf-8'),
-            cparams
-        )
+        if use_mmap:
+            self.ctx = self._init_from_mmap(model_path, cparams)
+        else:
+            self.ctx = libwhisper.whisper_init_from_file_with_params(
+                model_path.encode('utf-8'),
+                cparams
+            )
 
         if not self.ctx:
             raise RuntimeError(f"Failed to load model from {model_path}")
+        self.token_eot = libwhisper.whisper_token_eot(self.ctx)
+
+        # The context owns a default state (None); extra states share the weights
+        self.states.append(None)
+        for _ in range(n_states - 1):
+            state = libwhisper.whisper_init_state(self.ctx)
+            if not state:
+                self.close()
+                raise RuntimeError(f"Failed to allocate whisper state for {model_path}")
+            self.states.append(state)
+
+        self._idle_states = queue.Queue()
+        for state in self.states:
+            self._idle_states.put(state)
+
+    @staticmethod
+    def _init_from_mmap(model_path: str, cparams: WhisperContextParams):
+        """
+        Initialize the context from a read-only mapping of the model file
+
+        The file is read straight out of the shared page cache, so processes on the
+        same host (and warm restarts) don't hit the disk or stage the file through
+        read() buffers. whisper.cpp copies every tensor into its own backend buffers
+        while loading, so the mapping is released as soon as init returns: this
+        speeds up loading only, each process still holds its own resident weights.
+        """
+        with open(model_path, 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            if hasattr(mapping, 'madvise'):
+                mapping.madvise(mmap.MADV_SEQUENTIAL)
+                mapping.madvise(mmap.MADV_WILLNEED)
+
+            # numpy can expose the address of a read-only buffer, ctypes cannot
+            view = np.frombuffer(mapping, dtype=np.uint8)
+            try:
+                return libwhisper.whisper_init_from_buffer_with_params(
+                    ctypes.c_void_p(view.ctypes.data),
+                    view.nbytes,
+                    cparams
+                )
+            finally:
+                del view
+        finally:
+            mapping.close()
+
+    @staticmethod
+    def make_params(
+        language: Optional[str] = None,
+        n_threads: int = 4,
+        audio_ctx: int = 0,
+        beam_size: int = 0,
+        token_timestamps: bool = False,
+        temperature_inc: Optional[float] = None
+    ) -> WhisperFullParams:
+        """
+        Build whisper_full params from the library defaults
+
+        Args:
+            language: Language code ('en', 'ja', 'auto', etc.) or None for auto-detect
+            n_threads: Number of threads to use
+            audio_ctx: Encoder context size (0 for the model default)
+            beam_size: Beam width for beam search (0 or 1 for greedy decoding)
+            token_timestamps: Estimate per-token t0/t1
+            temperature_inc: Temperature step of whisper.cpp's fallback retries
+                (0 disables them, None keeps the library default)
+        """
+        strategy = WHISPER_SAMPLING_BEAM_SEARCH if beam_size > 1 else WHISPER_SAMPLING_GREEDY
+        params = libwhisper.whisper_full_default_params(strategy)
+
+        params.n_threads = n_threads
+
+        # We want transcription, not translation!
+        # This ensures we get Japanese as Japanese, not translated to English
+        params.translate = False
+
+        # The library default is 'en'; 'auto' makes whisper.cpp detect the language
+        if language and language != 'auto':
+            lang_code = LANGUAGE_ALIASES.get(language.lower(), language.lower())
+        else:
+            lang_code = 'auto'
+        # ctypes keeps the bytes object alive for as long as params
+        params.language = lang_code.encode('utf-8')
+
+        params.audio_ctx = audio_ctx
+        if beam_size > 1:
+            params.beam_search.beam_size = beam_size
+        params.token_timestamps = token_timestamps
+        if temperature_inc is not None:
+            params.temperature_inc = temperature_inc
+
+        return params
+
+    @contextmanager
+    def borrow_state(self):
+        """Context manager lending an idle state, blocking until one is free"""
+        state = self._idle_states.get()
+        try:
+            yield state
+        finally:
+            self._idle_states.put(state)
 
     def transcribe(
         self,
         audio: np.ndarray,
         language: Optional[str] = None,
-        n_threads: int = 4
+        n_threads: int = 4,
+        audio_ctx: int = 0,
+        beam_size: int = 0,
+        token_data: bool = False,
+        temperature_inc: Optional[float] = None,
+        mel: Optional[Tuple[np.ndarray, int]] = None
     ) -> Dict:
         """
         Transcribe audio using the loaded model
 
+        Safe to call from several threads; concurrent calls are limited to n_states.
+
+        Args:
+            audio: Audio data as float32 numpy array (PCM, 16kHz, mono)
+            language: Language code ('en', 'ja', 'auto', etc.) or None for auto-detect
+            n_threads: Number of threads to use
+            audio_ctx: Encoder context size (0 for the model default of 1500 = 30s)
+            beam_size: Beam width for beam search (0 or 1 for greedy decoding)
+            token_data: Also return per-token data and timestamps for every segment
+            temperature_inc: Temperature step of the library's fallback (0 disables it)
+            mel: Precomputed (mel, n_len_org) of the audio from mel.py, used instead of
+                computing the spectrogram inside whisper_full; token timestamps are
+                then spread over each segment rather than aligned by whisper.cpp
+
+        Returns:
+            Dictionary with transcription results
+        """
+        with self.borrow_state() as state:
+            return self.transcribe_with_state(
+                state, audio, language=language, n_threads=n_threads,
+                audio_ctx=audio_ctx, beam_size=beam_size, token_data=token_data,
+                temperature_inc=temperature_inc, mel=mel
+            )
+
+    def transcribe_with_state(
+        self,
+        state,
+        audio: np.ndarray,
+        language: Optional[str] = None,
+        n_threads: int = 4,
+        audio_ctx: int = 0,
+        beam_size: int = 0,
+        token_data: bool = False,
+        temperature_inc: Optional[float] = None,
+        mel: Optional[Tuple[np.ndarray, int]] = None
+    ) -> Dict:
+        """
+        Transcribe audio using a specific state (see borrow_state)
+
         Args:
+            state: State from borrow_state(), None for the context's default state
             audio: Audio data as float32 numpy array (PCM, 16kHz, mono)
             language: Language code ('en', 'ja', 'auto', etc.) or None for auto-detect
             n_threads: Number of threads to use
+            audio_ctx: Encoder context size (0 for the model default of 1500 = 30s)
+            beam_size: Beam width for beam search (0 or 1 for greedy decoding)
+            token_data: Also return per-token data and timestamps for every segment
+            temperature_inc: Temperature step of the library's fallback (0 disables it)
+            mel: Precomputed (mel, n_len_org) of the audio from mel.py, used instead of
+                computing the spectrogram inside whisper_full; token timestamps are
+                then spread over each segment rather than aligned by whisper.cpp
 
         Returns:
             Dictionary with transcription results
@@ -152,90 +618,105 @@ class WhisperModel:
             else:
                 audio = audio.astype(np.float32)
 
-        # Get default transcription params
-        # Use greedy sampling (0)
-        params_ptr = libwhisper.whisper_full_default_params_by_ref(
-            WHISPER_SAMPLING_GREEDY
-        )
-
-        # Modify params (we need to access the struct in memory)
-        # The struct starts with strategy, then n_threads at offset 4
-        params_bytes = ctypes.cast(params_ptr, ctypes.POINTER(ctypes.c_int))
-        params_bytes[1] = n_threads  # n_threads is second field
-
-        # Set translate to false (offset 20) - we want transcription, not translation!
-        # This ensures we get Japanese as Japanese, not translated to English
-        translate_ptr = ctypes.cast(
-            ctypes.addressof(ctypes.cast(params_ptr, ctypes.POINTER(ctypes.c_char)).contents) + 20,
-            ctypes.POINTER(ctypes.c_bool)
+        params = self.make_params(
+            language=language,
+            n_threads=n_threads,
+            audio_ctx=audio_ctx,
+            beam_size=beam_size,
+            # Token timestamps are refined with the signal energy whisper_full
+            # computes from the samples, which the mel path doesn't pass
+            token_timestamps=token_data and mel is None,
+            temperature_inc=temperature_inc
         )
-        translate_ptr[0] = False
-
-        # Set language if specified
-        # Language field is at offset ~160 bytes (const char *), after all the bools/ints/floats
-        if language and language != 'auto':
-            # Map language codes
-            lang_map = {
-                'en': 'en',
-                'english': 'en',
-                'ja': 'ja',
-                'japanese': 'ja',
-            }
-            lang_code = lang_map.get(language.lower(), language.lower())
-
-            # Create a persistent C string for the language
-            lang_cstr = ctypes.c_char_p(lang_code.encode('utf-8'))
-
-            # The language field is at byte offset 160 in the struct (on 64-bit systems)
-            # Cast params_ptr to char* then offset to language field position
-            params_as_bytes = ctypes.cast(params_ptr, ctypes.POINTER(ctypes.c_char))
-            lang_field_ptr = ctypes.cast(
-                ctypes.addressof(params_as_bytes.contents) + 160,
-                ctypes.POINTER(ctypes.c_char_p)
-            )
-            lang_field_ptr[0] = lang_cstr.value
 
         # Create pointer to audio data
         audio_ptr = audio.ctypes.data_as(ctypes.POINTER(ctypes.c_float))
+        n_samples = len(audio)
+
+        if mel is not None:
+            mel_data, n_len_org = mel
+            mel_data = np.ascontiguousarray(mel_data, dtype=np.float32)
+            n_mel, n_len = mel_data.shape
+            mel_ptr = mel_data.ctypes.data_as(ctypes.POINTER(ctypes.c_float))
+            if state is None:
+                status = libwhisper.whisper_set_mel(self.ctx, mel_ptr, n_len, n_mel)
+            else:
+                status = libwhisper.whisper_set_mel_with_state(self.ctx, state, mel_ptr, n_len, n_mel)
+            if status != 0:
+                raise RuntimeError(f"Setting the mel spectrogram failed with code {status}")
+            # whisper_full skips pcm_to_mel without samples; set_mel counts the
+            # 30s of padding frames as audio, so the duration bounds the decode
+            n_samples = 0
+            params.duration_ms = n_len_org * 10
 
         # Run transcription
-        result = libwhisper.whisper_full(
-            self.ctx,
-            params_ptr,
-            audio_ptr,
-            len(audio)
-        )
+        if state is None:
+            result = libwhisper.whisper_full(
+                self.ctx,
+                params,
+                audio_ptr,
+                n_samples
+            )
+        else:
+            result = libwhisper.whisper_full_with_state(
+                self.ctx,
+                state,
+                params,
+                audio_ptr,
+                n_samples
+            )
 
         if result != 0:
             raise RuntimeError(f"Transcription failed with code {result}")
 
         # Extract results
-        n_segments = libwhisper.whisper_full_n_segments(self.ctx)
+        if state is None:
+            n_segments = libwhisper.whisper_full_n_segments(self.ctx)
+        else:
+            n_segments = libwhisper.whisper_full_n_segments_from_state(state)
 
         segments = []
         full_text = ""
 
         for i in range(n_segments):
-            text = libwhisper.whisper_full_get_segment_text(self.ctx, i)
+            if state is None:
+                text = libwhisper.whisper_full_get_segment_text(self.ctx, i)
+                t0 = libwhisper.whisper_full_get_segment_t0(self.ctx, i)
+                t1 = libwhisper.whisper_full_get_segment_t1(self.ctx, i)
+            else:
+                text = libwhisper.whisper_full_get_segment_text_from_state(state, i)
+                t0 = libwhisper.whisper_full_get_segment_t0_from_state(state, i)
+                t1 = libwhisper.whisper_full_get_segment_t1_from_state(state, i)
             text = text.decode('utf-8') if text else ""
 
-            t0 = libwhisper.whisper_full_get_segment_t0(self.ctx, i)
-            t1 = libwhisper.whisper_full_get_segment_t1(self.ctx, i)
-
             # Convert from centiseconds to seconds
             t0_sec = t0 / 100.0
             t1_sec = t1 / 100.0
 
-            segments.append({
+            if state is None:
+                no_speech_prob = libwhisper.whisper_full_get_segment_no_speech_prob(self.ctx, i)
+            else:
+                no_speech_prob = libwhisper.whisper_full_get_segment_no_speech_prob_from_state(state, i)
+
+            segment = {
                 'text': text,
                 't0': t0_sec,
-                't1': t1_sec
-            })
+                't1': t1_sec,
+                'no_speech_prob': float(no_speech_prob)
+            }
+            if token_data:
+                segment['tokens'], segment['token_texts'] = self._segment_tokens(state, i)
+                if mel is not None:
+                    self._spread_token_times(segment)
+            segments.append(segment)
 
             full_text += text
 
         # Get detected language
-        lang_id = libwhisper.whisper_full_lang_id(self.ctx)
+        if state is None:
+            lang_id = libwhisper.whisper_full_lang_id(self.ctx)
+        else:
+            lang_id = libwhisper.whisper_full_lang_id_from_state(state)
         lang_str = libwhisper.whisper_lang_str(lang_id)
         detected_language = lang_str.decode('utf-8') if lang_str else 'unknown'
 
@@ -245,7 +726,105 @@ class WhisperModel:
             'language': detected_language
         }
 
+    def _segment_tokens(self, state, i_segment: int) -> Tuple[np.ndarray, List[bytes]]:
+        """
+        Token data of a segment as a TOKEN_DTYPE array plus each token's raw text
+
+        The structs are written straight into one ctypes buffer that numpy then
+        views, so each token costs two calls instead of one per field. Special
+        tokens (timestamps, sot, ...) are left out. Texts stay bytes because a
+        multi-byte character can be split across tokens.
+        """
+        if state is None:
+            n_tokens = libwhisper.whisper_full_n_tokens(self.ctx, i_segment)
+        else:
+            n_tokens = libwhisper.whisper_full_n_tokens_from_state(state, i_segment)
+
+        buffer = (WhisperTokenData * n_tokens)()
+        texts = []
+        count = 0
+        for j in range(n_tokens):
+            if state is None:
+                data = libwhisper.whisper_full_get_token_data(self.ctx, i_segment, j)
+            else:
+                data = libwhisper.whisper_full_get_token_data_from_state(state, i_segment, j)
+            if data.id >= self.token_eot:
+                continue
+            buffer[count] = data
+            if state is None:
+                text = libwhisper.whisper_full_get_token_text(self.ctx, i_segment, j)
+            else:
+                text = libwhisper.whisper_full_get_token_text_from_state(self.ctx, state, i_segment, j)
+            texts.append(text or b'')
+            count += 1
+
+        return np.frombuffer(buffer, dtype=TOKEN_DTYPE, count=count), texts
+
+    @staticmethod
+    def _spread_token_times(segment: Dict):
+        """Approximate token t0/t1 by sharing the segment's span in proportion to text length"""
+        tokens = segment['tokens']
+        if not len(tokens):
+            return
+        weights = np.array([max(1, len(text.strip())) for text in segment['token_texts']], dtype=np.float64)
+        edges = np.round(segment['t0'] * 100 + np.concatenate([[0.0], np.cumsum(weights)]) / weights.sum()
+                         * (segment['t1'] - segment['t0']) * 100).astype(np.int64)
+        tokens['t0'] = edges[:-1]
+        tokens['t1'] = edges[1:]
+
+    def detect_language(self, audio: np.ndarray, n_threads: int = 4) -> Tuple[str, float]:
+        """
+        Detect the spoken language of the first 30s of audio
+
+        Returns:
+            Language code and its probability
+        """
+        if audio.dtype != np.float32:
+            scale = 32768.0 if audio.dtype == np.int16 else 1.0
+            audio = audio.astype(np.float32) / scale
+        audio_ptr = audio.ctypes.data_as(ctypes.POINTER(ctypes.c_float))
+        probs = (ctypes.c_float * (libwhisper.whisper_lang_max_id() + 1))()
+
+        with self.borrow_state() as state:
+            if state is None:
+                result = libwhisper.whisper_pcm_to_mel(self.ctx, audio_ptr, len(audio), n_threads)
+                lang_id = libwhisper.whisper_lang_auto_detect(self.ctx, 0, n_threads, probs) if result == 0 else -1
+            else:
+                result = libwhisper.whisper_pcm_to_mel_with_state(self.ctx, state, audio_ptr, len(audio), n_threads)
+                lang_id = (libwhisper.whisper_lang_auto_detect_with_state(self.ctx, state, 0, n_threads, probs)
+                           if result == 0 else -1)
+
+        if lang_id < 0:
+            raise RuntimeError(f"Language detection failed with code {lang_id if result == 0 else result}")
+        return libwhisper.whisper_lang_str(lang_id).decode('utf-8'), probs[lang_id]
+
+    def timings(self) -> Dict[str, float]:
+        """
+        Average per-call timings (ms) of the default state since the last reset
+
+        Leaks one small allocation per call (see whisper_get_timings above), so
+        call it once per benchmark run rather than per transcription.
+        """
+        timings = libwhisper.whisper_get_timings(self.ctx)
+        if not timings:
+            return {}
+        return {name: getattr(timings.contents, name) for name, _ in WhisperTimings._fields_}
+
+    def reset_timings(self):
+        """Reset the default state's timing counters"""
+        libwhisper.whisper_reset_timings(self.ctx)
+
+    def close(self):
+        """Free the extra states and the whisper context"""
+        for state in getattr(self, 'states', []):
+            if state:
+                libwhisper.whisper_free_state(state)
+        self.states = []
+
+        if getattr(self, 'ctx', None):
+            libwhisper.whisper_free(self.ctx)
+            self.ctx = None
+
     def __del__(self):
         """Free the whisper context when the object is destroyed"""
-        if hasattr(self, 'ctx') and self.ctx:
-            libwhisper.whisper_free(self.ctx)
+        self.close()
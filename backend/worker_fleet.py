@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Multi-process backend fleet
+Forks N server processes that share one listening port
+"""
+
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+# A worker dying within this many seconds of its start is a fast failure; it is
+# respawned only after waiting as long
+RESPAWN_BACKOFF_SECONDS = 1.0
+
+# Consecutive fast failures of one worker after which the fleet shuts down
+MAX_FAST_FAILURES = 5
+
+
+def supports_reuse_port() -> bool:
+    """SO_REUSEPORT load-balances connections across sockets only on Linux"""
+    return hasattr(socket, 'SO_REUSEPORT') and sys.platform.startswith('linux')
+
+
+def create_listen_socket(host: str, port: int, reuse_port: bool, listen: bool = True) -> socket.socket:
+    """Create a TCP socket bound to host:port"""
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    if listen:
+        sock.listen(socket.SOMAXCONN)
+    sock.setblocking(False)
+    return sock
+
+
+class WorkerFleet:
+    """
+    Supervises N forked server processes behind one port
+
+    On Linux every worker listens on its own SO_REUSEPORT socket and the kernel
+    balances incoming connections between them. Elsewhere the workers accept
+    from one inherited listening socket. Either way a WebSocket connection is
+    owned by exactly one worker, so all chunks of a session stay on that worker.
+    """
+
+    def __init__(self, n_workers: int, host: str, port: int,
+                 worker_main: Callable[[socket.socket], int]):
+        """
+        Initialize the fleet
+
+        Args:
+            n_workers: Number of server processes
+            host: Host to bind to
+            port: Port to listen on (0 for random)
+            worker_main: Runs a worker on the given listening socket, returns an exit code
+        """
+        self.n_workers = n_workers
+        self.host = host
+        self.worker_main = worker_main
+        self.reuse_port = supports_reuse_port()
+
+        # With SO_REUSEPORT the parent only reserves the port; an unlistened socket
+        # is not part of the kernel's balancing group
+        self.sock = create_listen_socket(host, port, self.reuse_port, listen=not self.reuse_port)
+        self.port = self.sock.getsockname()[1]
+
+        self.workers: Dict[int, int] = {}  # pid -> worker index
+        self.started_at: Dict[int, float] = {}
+        self.fast_failures: Dict[int, int] = {}  # worker index -> consecutive fast failures
+        self.stopping = False
+
+    def run(self) -> int:
+        """
+        Start the workers and supervise them until shutdown
+
+        Returns:
+            0 after a clean shutdown, 1 if a worker died (the whole fleet stops
+            once one keeps dying right after it starts)
+        """
+        # Print port for Flutter app to read
+        print(f"SERVER_PORT:{self.port}")
+        sys.stdout.flush()
+
+        mode = 'SO_REUSEPORT' if self.reuse_port else 'shared socket'
+        logger.info(f"Starting {self.n_workers} workers on {self.host}:{self.port} ({mode})")
+
+        for index in range(self.n_workers):
+            self._spawn(index)
+
+        signal.signal(signal.SIGINT, self._handle_signal)
+        signal.signal(signal.SIGTERM, self._handle_signal)
+
+        exit_code = 0
+        while self.workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+
+            index = self.workers.pop(pid, None)
+            if index is None:
+                continue
+
+            code = os.waitstatus_to_exitcode(status)
+            if self.stopping:
+                logger.info(f"Worker {index} (pid {pid}) exited with {code}")
+                continue
+
+            exit_code = 1
+            if time.monotonic() - self.started_at.pop(pid, 0.0) < RESPAWN_BACKOFF_SECONDS:
+                self.fast_failures[index] = self.fast_failures.get(index, 0) + 1
+            else:
+                self.fast_failures[index] = 0
+
+            if self.fast_failures[index] >= MAX_FAST_FAILURES:
+                logger.error(f"Worker {index} (pid {pid}) died with {code}, the {MAX_FAST_FAILURES}th time in a row "
+                             f"right after starting; shutting down")
+                self.stop()
+                continue
+
+            logger.error(f"Worker {index} (pid {pid}) died with {code}, restarting")
+            if self.fast_failures[index]:
+                time.sleep(RESPAWN_BACKOFF_SECONDS)
+            self._spawn(index)
+
+        self.sock.close()
+        return exit_code
+
+    def _spawn(self, index: int):
+        pid = os.fork()
+        if pid == 0:
+            self._run_child(index)
+
+        self.workers[pid] = index
+        self.started_at[pid] = time.monotonic()
+        logger.info(f"Worker {index} started (pid {pid})")
+
+    def _run_child(self, index: int):
+        """Entry point of a forked worker; never returns"""
+        code = 1
+        try:
+            # Ctrl-C reaches the whole process group; workers leave it to the
+            # supervisor, which relays it as one SIGTERM so the drain isn't cut short
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+            if self.reuse_port:
+                self.sock.close()
+                sock = create_listen_socket(self.host, self.port, reuse_port=True)
+            else:
+                sock = self.sock
+
+            code = self.worker_main(sock)
+        except BaseException as e:
+            logger.error(f"Worker {index} failed: {e}")
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code or 0)
+
+    def _handle_signal(self, signum, frame):
+        logger.info("Shutting down workers...")
+        self.stop()
+
+    def stop(self):
+        """Ask every worker to exit"""
+        self.stopping = True
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
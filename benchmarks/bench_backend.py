@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+In-process benchmark suite for the ctypes whisper.cpp backend
+
+Drives WhisperModel directly (the same code path as server.py) over a matrix of
+audio lengths, languages, thread counts, audio_ctx values and decoding
+strategies, and reports load times, RTF, peak RSS and latency percentiles as JSON.
+
+Usage:
+    python benchmarks/bench_backend.py --output bench.json
+    python benchmarks/bench_backend.py --baseline benchmarks/baseline.json
+    python benchmarks/bench_backend.py --save-baseline benchmarks/baseline.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Add backend to path
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR / 'backend'))
+
+from audio_utils import SAMPLE_RATE, SAMPLE_WAV, load_wav
+from whisper_wrapper import WhisperModel
+
+DEFAULT_MODEL = REPO_DIR / "backend" / "whisper.cpp" / "models" / "ggml-large-v3-turbo.bin"
+
+# Silence inserted between repetitions when building longer clips from a sample
+GAP_SECONDS = 0.3
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return (peak if sys.platform == 'darwin' else peak * 1024) / 1e6
+
+
+def drop_page_cache(path: Path) -> bool:
+    """Evict a file from the page cache so the next load is cold (Linux only)"""
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        return True
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
+
+
+def build_clip(speech: np.ndarray, seconds: float) -> np.ndarray:
+    """Repeat real speech (with short gaps) up to the requested length"""
+    gap = np.zeros(int(GAP_SECONDS * SAMPLE_RATE), dtype=np.int16)
+    target = int(seconds * SAMPLE_RATE)
+    parts = []
+    total = 0
+    while total < target:
+        parts.extend([speech, gap])
+        total += len(speech) + len(gap)
+    return np.concatenate(parts)[:target]
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(np.asarray(values), q))
+
+
+def measure_load(model_path: Path, use_gpu: bool) -> Dict[str, float]:
+    """Cold and warm load times of a model"""
+    cold_evicted = drop_page_cache(model_path)
+
+    start = time.time()
+    model = WhisperModel(str(model_path), use_gpu=use_gpu)
+    cold = time.time() - start
+    model.close()
+
+    start = time.time()
+    model = WhisperModel(str(model_path), use_gpu=use_gpu)
+    warm = time.time() - start
+    model.close()
+
+    return {
+        'cold_load_s': round(cold, 3),
+        'cold_load_from_disk': cold_evicted,
+        'warm_load_s': round(warm, 3)
+    }
+
+
+def run_matrix(args: argparse.Namespace) -> dict:
+    speech = load_wav(Path(args.audio))
+
+    report = {
+        'host': platform.node(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'models': {},
+        'runs': []
+    }
+
+    for model_path in args.model:
+        model_path = Path(model_path)
+        name = model_path.stem.replace('ggml-', '')
+        print(f"== {name}", file=sys.stderr)
+
+        load = measure_load(model_path, not args.cpu)
+        model = WhisperModel(str(model_path), use_gpu=not args.cpu)
+        load['rss_after_load_mb'] = round(peak_rss_mb(), 1)
+        report['models'][name] = load
+        print(f"   load: cold {load['cold_load_s']}s, warm {load['warm_load_s']}s", file=sys.stderr)
+
+        try:
+            matrix = itertools.product(args.lengths, args.languages, args.threads, args.audio_ctx, args.beam)
+            for seconds, language, n_threads, audio_ctx, beam in matrix:
+                clip = build_clip(speech, seconds)
+                kwargs = dict(language=language, n_threads=n_threads, audio_ctx=audio_ctx, beam_size=beam)
+
+                # Untimed first run: graphs and buffers are allocated lazily
+                model.transcribe(clip, **kwargs)
+
+                latencies = []
+                for _ in range(args.repeats):
+                    start = time.time()
+                    model.transcribe(clip, **kwargs)
+                    latencies.append(time.time() - start)
+
+                run = {
+                    'model': name,
+                    'audio_s': seconds,
+                    'language': language,
+                    'threads': n_threads,
+                    'audio_ctx': audio_ctx,
+                    'beam': beam,
+                    'p50_s': round(percentile(latencies, 50), 4),
+                    'p95_s': round(percentile(latencies, 95), 4),
+                    'mean_s': round(float(np.mean(latencies)), 4),
+                    'rtf': round(float(np.mean(latencies)) / seconds, 4),
+                    'peak_rss_mb': round(peak_rss_mb(), 1)
+                }
+                report['runs'].append(run)
+                print(f"   {seconds:>5.1f}s lang={language:<4} threads={n_threads:<2} "
+                      f"audio_ctx={audio_ctx:<4} beam={beam}: p50 {run['p50_s']:.3f}s "
+                      f"p95 {run['p95_s']:.3f}s RTF {run['rtf']:.3f}", file=sys.stderr)
+        finally:
+            model.close()
+
+    return report
+
+
+def run_key(run: dict) -> tuple:
+    return (run['model'], run['audio_s'], run['language'], run['threads'], run['audio_ctx'], run['beam'])
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Return a description of every run slower than the baseline beyond tolerance"""
+    baseline_runs = {run_key(run): run for run in baseline.get('runs', [])}
+    regressions = []
+    for run in report['runs']:
+        base = baseline_runs.get(run_key(run))
+        if base is None:
+            continue
+        for metric in ('p50_s', 'p95_s'):
+            if run[metric] > base[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{run_key(run)} {metric}: {base[metric]:.3f}s -> {run[metric]:.3f}s "
+                    f"(+{(run[metric] / base[metric] - 1) * 100:.0f}%)"
+                )
+
+    for name, load in report['models'].items():
+        base = baseline.get('models', {}).get(name)
+        if base and load['warm_load_s'] > base['warm_load_s'] * (1 + tolerance):
+            regressions.append(f"{name} warm load: {base['warm_load_s']:.2f}s -> {load['warm_load_s']:.2f}s")
+
+    return regressions
+
+
+def parse_list(cast):
+    return lambda value: [cast(v) for v in value.split(',')]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the whisper.cpp ctypes backend in-process')
+    parser.add_argument('--model', action='append', default=None, help='Model file (repeatable)')
+    parser.add_argument('--audio', default=str(SAMPLE_WAV), help='Speech sample (16-bit PCM WAV)')
+    parser.add_argument('--lengths', type=parse_list(float), default=[3.0, 10.0, 30.0], help='Audio lengths in seconds')
+    parser.add_argument('--languages', type=parse_list(str), default=['en', 'auto'], help='Languages to request')
+    parser.add_argument('--threads', type=parse_list(int), default=[4], help='Thread counts')
+    parser.add_argument('--audio-ctx', type=parse_list(int), default=[0], help='audio_ctx values (0 = model default)')
+    parser.add_argument('--beam', type=parse_list(int), default=[0], help='Beam sizes (0 = greedy)')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed runs per configuration')
+    parser.add_argument('--cpu', action='store_true', help='Disable GPU acceleration')
+    parser.add_argument('--output', default=None, help='Write the JSON report here (default: stdout)')
+    parser.add_argument('--baseline', default=None, help='Compare against this baseline report')
+    parser.add_argument('--save-baseline', default=None, help='Store the report as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='Allowed slowdown vs baseline (0.10 = 10%%)')
+    args = parser.parse_args(argv)
+
+    args.model = args.model or [str(DEFAULT_MODEL)]
+    for model_path in args.model:
+        if not os.path.exists(model_path):
+            print(f"ERROR: Model not found at {model_path}", file=sys.stderr)
+            return 1
+
+    report = run_matrix(args)
+
+    encoded = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(encoded)
+    else:
+        print(encoded)
+
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(encoded)
+        print(f"Baseline saved to {args.save_baseline}", file=sys.stderr)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) vs {args.baseline}:", file=sys.stderr)
+            for line in regressions:
+                print(f"  ✗ {line}", file=sys.stderr)
+            return 1
+        print(f"\n✓ No regressions vs {args.baseline}", file=sys.stderr)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the server-side post-processing pipeline
+
+Measures the one-off compile time and the per-result cost of every option
+combination for English and Japanese transcripts, plus custom-term correction
+against dictionaries of increasing size, and reports them as JSON.
+
+Usage:
+    python benchmarks/bench_postprocess.py
+    python benchmarks/bench_postprocess.py --iterations 50000 --output post.json
+    python benchmarks/bench_postprocess.py --term-counts 100 1000 10000
+"""
+
+import argparse
+import itertools
+import json
+import random
+import string
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+# Add backend to path
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR / 'backend'))
+
+from postprocess import get_pipeline
+from term_correction import _corrector, get_corrector
+
+SAMPLES = {
+    'en': "Um, so i think, uh, we should ship the release on friday. hmm, unless the tests, "
+          "you know, fail again. then i'll, er, take a look at it myself.",
+    'ja': "えーと、今日はあの人と会います。あの、すみません、うーん、まあ、そうですね。"
+          "えっと、明日の会議は十時からです。",
+}
+
+
+def bench_combination(language: str, text: str, options: tuple, iterations: int) -> dict:
+    get_pipeline.cache_clear()
+    start = time.perf_counter()
+    pipeline = get_pipeline(language, *options)
+    compile_us = (time.perf_counter() - start) * 1e6
+
+    # Timed in batches so timer overhead doesn't dominate
+    batch = 100
+    per_call = []
+    for _ in range(max(1, iterations // batch)):
+        start = time.perf_counter()
+        for _ in range(batch):
+            pipeline(text)
+        per_call.append((time.perf_counter() - start) / batch * 1e6)
+
+    smart_caps, punctuation, disfluency_cleanup = options
+    return {
+        'language': language,
+        'smartCaps': smart_caps,
+        'punctuation': punctuation,
+        'disfluencyCleanup': disfluency_cleanup,
+        'compile_us': round(compile_us, 1),
+        'p50_us': round(float(np.percentile(per_call, 50)), 2),
+        'p95_us': round(float(np.percentile(per_call, 95)), 2),
+        'output': pipeline(text)
+    }
+
+TERMS = ['kubectl', 'MacBook', 'PostgreSQL', 'Kubernetes', 'GitHub', 'Terraform', 'ultra-whisper']
+
+TERMS_SAMPLE = ("so please run cube control get pods, then check the postgres sequel logs on my mac book "
+                "and push the fix to git hub before the cooper netties upgrade tomorrow.")
+
+# English words of the sample, so the output doesn't depend on the machine's word list
+SAMPLE_ENGLISH = frozenset("""
+    and before book check control cooper cube fix get git hub logs mac my on please pods push run sequel so
+    the then to tomorrow upgrade
+""".split())
+
+
+def bench_terms(count: int, iterations: int) -> dict:
+    """Index build and correction cost for a dictionary of count terms"""
+    rng = random.Random(count)
+    terms = TERMS + [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 12)))
+                     for _ in range(max(0, count - len(TERMS)))]
+
+    _corrector.cache_clear()
+    start = time.perf_counter()
+    corrector = get_corrector(terms, SAMPLE_ENGLISH)
+    build_ms = (time.perf_counter() - start) * 1e3
+
+    start = time.perf_counter()
+    output = corrector.correct(TERMS_SAMPLE)
+    cold_us = (time.perf_counter() - start) * 1e6
+
+    per_call = []
+    for _ in range(max(1, iterations // 100)):
+        start = time.perf_counter()
+        corrector.correct(TERMS_SAMPLE)
+        per_call.append((time.perf_counter() - start) * 1e6)
+
+    return {
+        'terms': len(terms),
+        'build_ms': round(build_ms, 1),
+        'cold_us': round(cold_us, 1),
+        'p50_us': round(float(np.percentile(per_call, 50)), 2),
+        'p95_us': round(float(np.percentile(per_call, 95)), 2),
+        'output': output
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark transcript post-processing')
+    parser.add_argument('--iterations', type=int, default=20000, help='Calls per option combination')
+    parser.add_argument('--term-counts', type=int, nargs='+', default=[10, 1000, 5000],
+                        help='Custom dictionary sizes to benchmark term correction with')
+    parser.add_argument('--output', default=None, help='Write the JSON report here (default: stdout)')
+    args = parser.parse_args(argv)
+
+    runs = []
+    for language, text in SAMPLES.items():
+        for options in itertools.product((True, False), repeat=3):
+            run = bench_combination(language, text, options, args.iterations)
+            runs.append(run)
+            print(f"   {language} caps={int(options[0])} punct={int(options[1])} clean={int(options[2])}: "
+                  f"compile {run['compile_us']:.0f}us, p50 {run['p50_us']:.1f}us p95 {run['p95_us']:.1f}us",
+                  file=sys.stderr)
+
+    term_runs = []
+    for count in args.term_counts:
+        run = bench_terms(count, args.iterations)
+        term_runs.append(run)
+        print(f"   terms={run['terms']}: build {run['build_ms']:.0f}ms, cold {run['cold_us']:.0f}us, "
+              f"p50 {run['p50_us']:.1f}us p95 {run['p95_us']:.1f}us", file=sys.stderr)
+
+    report = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'runs': runs, 'term_correction': term_runs}
+    encoded = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(encoded)
+    else:
+        print(encoded)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
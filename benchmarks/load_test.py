@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+End-to-end WebSocket load generator for server.py
+
+Opens N concurrent connections that each behave like the Flutter client:
+hello, start_session, binary PCM chunks paced in real time, end_session.
+Concurrency is ramped through the given levels and, per level, the time from
+end_session to final, partial lag, error rate and server RSS are reported as JSON.
+
+Usage:
+    python backend/server.py --port 8765 &
+    python benchmarks/load_test.py --url ws://127.0.0.1:8765 --concurrency 1,2,4,8 --server-pid $!
+"""
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import websockets
+
+# Add backend to path
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR / 'backend'))
+
+from audio_utils import SAMPLE_RATE, SAMPLE_WAV, load_wav
+
+
+def read_rss_mb(pid: int) -> Optional[float]:
+    """Current RSS of another process"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    # macOS has no /proc
+    try:
+        output = subprocess.run(['ps', '-o', 'rss=', '-p', str(pid)], capture_output=True, text=True, check=True)
+        return int(output.stdout.strip()) / 1024
+    except (OSError, ValueError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    return round(float(np.percentile(np.asarray(values), q)), 4) if values else None
+
+
+class LevelStats:
+    """Measurements collected for one concurrency level"""
+
+    def __init__(self):
+        self.final_latencies: List[float] = []
+        self.partial_lags: List[float] = []
+        self.sessions = 0
+        self.errors: List[str] = []
+        self.rss_samples: List[float] = []
+
+    def summary(self, concurrency: int, wall: float) -> dict:
+        return {
+            'concurrency': concurrency,
+            'sessions': self.sessions,
+            'completed': len(self.final_latencies),
+            'errors': len(self.errors),
+            'error_rate': round(len(self.errors) / self.sessions, 4) if self.sessions else 0.0,
+            'final_p50_s': percentile(self.final_latencies, 50),
+            'final_p95_s': percentile(self.final_latencies, 95),
+            'final_max_s': round(max(self.final_latencies), 4) if self.final_latencies else None,
+            'partials': len(self.partial_lags),
+            'partial_lag_p50_s': percentile(self.partial_lags, 50),
+            'partial_lag_p95_s': percentile(self.partial_lags, 95),
+            'server_rss_peak_mb': round(max(self.rss_samples), 1) if self.rss_samples else None,
+            'wall_s': round(wall, 2),
+            'error_samples': self.errors[:5]
+        }
+
+
+class DictationClient:
+    """One simulated Flutter client on its own connection"""
+
+    def __init__(self, args: argparse.Namespace, audio: np.ndarray, stats: LevelStats):
+        self.args = args
+        self.audio = audio
+        self.stats = stats
+        self.waiters: Dict[str, asyncio.Future] = {}
+        self.session_start: Dict[str, float] = {}
+
+    async def run(self):
+        try:
+            async with websockets.connect(self.args.url, max_size=None) as websocket:
+                receiver = asyncio.create_task(self.receive(websocket))
+                try:
+                    await self.request(websocket, 'hello', 'hello', {'app_version': 'load-test', 'locale': 'en_US'})
+                    for _ in range(self.args.sessions_per_client):
+                        await self.dictate(websocket)
+                finally:
+                    receiver.cancel()
+        except Exception as e:
+            self.stats.errors.append(f"connection: {e!r}")
+
+    async def request(self, websocket, message_type: str, key: str, data: dict) -> dict:
+        """Send a command and wait for the reply registered under key"""
+        future = asyncio.get_running_loop().create_future()
+        self.waiters[key] = future
+        await websocket.send(json.dumps({'type': message_type, 'id': str(uuid.uuid4()), 'data': data}))
+        return await asyncio.wait_for(future, self.args.timeout)
+
+    async def dictate(self, websocket):
+        session_id = str(uuid.uuid4())
+        self.stats.sessions += 1
+        try:
+            await self.request(websocket, 'start_session', f"started:{session_id}", {
+                'sessionId': session_id,
+                'language': self.args.language,
+                'task': 'transcribe',
+                'model': self.args.model,
+                'device': 'auto',
+                'computeType': self.args.compute_type,
+                'vad': False,
+                'enablePartial': True,
+                'post': {'smartCaps': True, 'punctuation': True, 'disfluencyCleanup': True}
+            })
+
+            # Stream audio paced like a live microphone
+            chunk_samples = int(SAMPLE_RATE * self.args.chunk_ms / 1000)
+            chunk_interval = self.args.chunk_ms / 1000 / self.args.speed
+            start = time.monotonic()
+            self.session_start[session_id] = start
+            for index, offset in enumerate(range(0, len(self.audio), chunk_samples)):
+                await websocket.send(self.audio[offset:offset + chunk_samples].tobytes())
+                delay = start + (index + 1) * chunk_interval - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            end_sent = time.monotonic()
+            final = await self.request(websocket, 'end_session', f"final:{session_id}", {'sessionId': session_id})
+            if final.get('type') == 'error':
+                self.stats.errors.append(f"{final['data'].get('code')}: {final['data'].get('message')}")
+            else:
+                self.stats.final_latencies.append(time.monotonic() - end_sent)
+        except asyncio.TimeoutError:
+            self.stats.errors.append(f"timeout in session {session_id}")
+        finally:
+            self.session_start.pop(session_id, None)
+
+    async def receive(self, websocket):
+        async for message in websocket:
+            if isinstance(message, bytes):
+                continue
+            envelope = json.loads(message)
+            message_type = envelope.get('type')
+            data = envelope.get('data') or {}
+            session_id = data.get('sessionId') or data.get('session_id')
+
+            if message_type == 'hello_ack':
+                self.resolve('hello', envelope)
+            elif message_type == 'session_started':
+                self.resolve(f"started:{session_id}", envelope)
+            elif message_type == 'final':
+                self.resolve(f"final:{session_id}", envelope)
+            elif message_type == 'partial':
+                start = self.session_start.get(session_id)
+                if start is not None:
+                    # How far the partial's end lags behind the audio sent so far
+                    audio_sent = (time.monotonic() - start) * self.args.speed
+                    self.stats.partial_lags.append(max(0.0, audio_sent - data.get('t1', 0.0)))
+            elif message_type == 'error':
+                # Errors fail whatever the session was waiting for
+                key = f"final:{session_id}" if f"final:{session_id}" in self.waiters else f"started:{session_id}"
+                if not self.resolve(key, envelope):
+                    self.stats.errors.append(f"{data.get('code')}: {data.get('message')}")
+
+    def resolve(self, key: str, envelope: dict) -> bool:
+        future = self.waiters.pop(key, None)
+        if future is None or future.done():
+            return False
+        future.set_result(envelope)
+        return True
+
+
+async def sample_rss(pid: int, stats: LevelStats, interval: float = 0.5):
+    while True:
+        rss = read_rss_mb(pid)
+        if rss is not None:
+            stats.rss_samples.append(rss)
+        await asyncio.sleep(interval)
+
+
+async def run_level(args: argparse.Namespace, audio: np.ndarray, concurrency: int) -> dict:
+    stats = LevelStats()
+    sampler = asyncio.create_task(sample_rss(args.server_pid, stats)) if args.server_pid else None
+
+    start = time.monotonic()
+    clients = [DictationClient(args, audio, stats) for _ in range(concurrency)]
+    await asyncio.gather(*(client.run() for client in clients))
+    wall = time.monotonic() - start
+
+    if sampler:
+        sampler.cancel()
+    return stats.summary(concurrency, wall)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    audio = load_wav(Path(args.audio))
+    if args.seconds:
+        audio = np.resize(audio, int(args.seconds * SAMPLE_RATE))
+
+    levels = []
+    for concurrency in args.concurrency:
+        print(f"== concurrency {concurrency}", file=sys.stderr)
+        summary = await run_level(args, audio, concurrency)
+        levels.append(summary)
+        print(f"   final p50 {summary['final_p50_s']}s p95 {summary['final_p95_s']}s, "
+              f"partial lag p50 {summary['partial_lag_p50_s']}s, errors {summary['errors']}/{summary['sessions']}, "
+              f"server RSS {summary['server_rss_peak_mb']} MB", file=sys.stderr)
+
+    return {
+        'url': args.url,
+        'audio_s': round(len(audio) / SAMPLE_RATE, 2),
+        'chunk_ms': args.chunk_ms,
+        'speed': args.speed,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'levels': levels
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Simulate N real-time dictation clients against server.py')
+    parser.add_argument('--url', required=True, help='Server URL, e.g. ws://127.0.0.1:8765')
+    parser.add_argument('--concurrency', type=lambda v: [int(c) for c in v.split(',')], default=[1, 2, 4, 8],
+                        help='Comma-separated concurrency levels to ramp through')
+    parser.add_argument('--sessions-per-client', type=int, default=3, help='Dictations per connection and level')
+    parser.add_argument('--audio', default=str(SAMPLE_WAV), help='Speech sample (16-bit PCM WAV)')
+    parser.add_argument('--seconds', type=float, default=0.0, help='Loop the sample to this length (0 = as is)')
+    parser.add_argument('--chunk-ms', type=int, default=100, help='Audio per binary chunk')
+    parser.add_argument('--speed', type=float, default=1.0, help='Streaming speed relative to real time')
+    parser.add_argument('--language', default='en', help="Session language ('auto' to detect)")
+    parser.add_argument('--model', default='largeV3Turbo', help='Model requested by the sessions')
+    parser.add_argument('--compute-type', default='float16', help='computeType requested by the sessions')
+    parser.add_argument('--server-pid', type=int, default=None, help='Sample RSS of this process')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Seconds to wait for any reply')
+    parser.add_argument('--output', default=None, help='Write the JSON report here (default: stdout)')
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+
+    encoded = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(encoded)
+    else:
+        print(encoded)
+
+    return 1 if any(level['errors'] for level in report['levels']) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
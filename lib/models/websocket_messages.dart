@@ -153,6 +153,24 @@ class TranscriptionSegment {
   Map<String, dynamic> toJson() => _$TranscriptionSegmentToJson(this);
 }
 
+@JsonSerializable()
+class WordConfidence {
+  final String word;
+  final double t0;
+  final double t1;
+  final double probability;
+  
+  const WordConfidence({
+    required this.word,
+    required this.t0,
+    required this.t1,
+    required this.probability,
+  });
+  
+  factory WordConfidence.fromJson(Map<String, dynamic> json) => _$WordConfidenceFromJson(json);
+  Map<String, dynamic> toJson() => _$WordConfidenceToJson(this);
+}
+
 @JsonSerializable()
 class FinalEvent {
   @JsonKey(name: 'session_id')
@@ -163,6 +181,9 @@ class FinalEvent {
   final String lang;
   @JsonKey(name: 'avg_logprob')
   final double avgLogprob;
+  @JsonKey(name: 'no_speech_prob')
+  final double? noSpeechProb;
+  final List<WordConfidence>? words;
   
   const FinalEvent({
     required this.sessionId,
@@ -170,6 +191,8 @@ class FinalEvent {
     required this.segments,
     required this.lang,
     required this.avgLogprob,
+    this.noSpeechProb,
+    this.words,
   });
   
   factory FinalEvent.fromJson(Map<String, dynamic> json) => _$FinalEventFromJson(json);
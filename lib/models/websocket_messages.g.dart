@@ -139,6 +139,22 @@ Map<String, dynamic> _$TranscriptionSegmentToJson(
   'text': instance.text,
 };
 
+WordConfidence _$WordConfidenceFromJson(Map<String, dynamic> json) =>
+    WordConfidence(
+      word: json['word'] as String,
+      t0: (json['t0'] as num).toDouble(),
+      t1: (json['t1'] as num).toDouble(),
+      probability: (json['probability'] as num).toDouble(),
+    );
+
+Map<String, dynamic> _$WordConfidenceToJson(WordConfidence instance) =>
+    <String, dynamic>{
+      'word': instance.word,
+      't0': instance.t0,
+      't1': instance.t1,
+      'probability': instance.probability,
+    };
+
 FinalEvent _$FinalEventFromJson(Map<String, dynamic> json) => FinalEvent(
   sessionId: json['session_id'] as String,
   text: json['text'] as String,
@@ -147,6 +163,10 @@ FinalEvent _$FinalEventFromJson(Map<String, dynamic> json) => FinalEvent(
       .toList(),
   lang: json['language'] as String,
   avgLogprob: (json['avg_logprob'] as num).toDouble(),
+  noSpeechProb: (json['no_speech_prob'] as num?)?.toDouble(),
+  words: (json['words'] as List<dynamic>?)
+      ?.map((e) => WordConfidence.fromJson(e as Map<String, dynamic>))
+      .toList(),
 );
 
 Map<String, dynamic> _$FinalEventToJson(FinalEvent instance) =>
@@ -156,6 +176,8 @@ Map<String, dynamic> _$FinalEventToJson(FinalEvent instance) =>
       'segments': instance.segments,
       'language': instance.lang,
       'avg_logprob': instance.avgLogprob,
+      'no_speech_prob': instance.noSpeechProb,
+      'words': instance.words,
     };
 
 ErrorEvent _$ErrorEventFromJson(Map<String, dynamic> json) => ErrorEvent(
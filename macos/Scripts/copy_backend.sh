@@ -21,6 +21,51 @@ cp -f "${PROJECT_DIR}/backend/server.py" "${BUNDLE_RESOURCES}/backend/"
 echo "Copying backend/whisper_wrapper.py..."
 cp -f "${PROJECT_DIR}/backend/whisper_wrapper.py" "${BUNDLE_RESOURCES}/backend/"
 
+echo "Copying backend/result_cache.py..."
+cp -f "${PROJECT_DIR}/backend/result_cache.py" "${BUNDLE_RESOURCES}/backend/"
+
+echo "Copying backend/model_registry.py..."
+cp -f "${PROJECT_DIR}/backend/model_registry.py" "${BUNDLE_RESOURCES}/backend/"
+
+echo "Copying backend/worker_fleet.py..."
+cp -f "${PROJECT_DIR}/backend/worker_fleet.py" "${BUNDLE_RESOURCES}/backend/"
+
+echo "Copying backend/audio_utils.py..."
+cp -f "${PROJECT_DIR}/backend/audio_utils.py" "${BUNDLE_RESOURCES}/backend/"
+
+echo "Copying backend/autotune.py..."
+cp -f "${PROJECT_DIR}/backend/autotune.py" "${BUNDLE_RESOURCES}/backend/"
+
+echo "Copying backend/engine.py..."
+cp -f "${PROJECT_DIR}/backend/engine.py" "${BUNDLE_RESOURCES}/backend/"
+
+echo "Copying backend/session_resume.py..."
+cp -f "${PROJECT_DIR}/backend/session_resume.py" "${BUNDLE_RESOURCES}/backend/"
+
+echo "Copying backend/confidence.py..."
+cp -f "${PROJECT_DIR}/backend/confidence.py" "${BUNDLE_RESOURCES}/backend/"
+
+echo "Copying backend/fallback.py..."
+cp -f "${PROJECT_DIR}/backend/fallback.py" "${BUNDLE_RESOURCES}/backend/"
+
+echo "Copying backend/postprocess.py..."
+cp -f "${PROJECT_DIR}/backend/postprocess.py" "${BUNDLE_RESOURCES}/backend/"
+
+echo "Copying backend/term_correction.py..."
+cp -f "${PROJECT_DIR}/backend/term_correction.py" "${BUNDLE_RESOURCES}/backend/"
+
+echo "Copying backend/mel.py..."
+cp -f "${PROJECT_DIR}/backend/mel.py" "${BUNDLE_RESOURCES}/backend/"
+
+echo "Copying backend/packing.py..."
+cp -f "${PROJECT_DIR}/backend/packing.py" "${BUNDLE_RESOURCES}/backend/"
+
+echo "Copying backend/audio_ring.py..."
+cp -f "${PROJECT_DIR}/backend/audio_ring.py" "${BUNDLE_RESOURCES}/backend/"
+
+echo "Copying backend/isolated_engine.py..."
+cp -f "${PROJECT_DIR}/backend/isolated_engine.py" "${BUNDLE_RESOURCES}/backend/"
+
 echo "Copying backend/requirements.txt..."
 cp -f "${PROJECT_DIR}/backend/requirements.txt" "${BUNDLE_RESOURCES}/backend/"
 
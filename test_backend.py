@@ -10,6 +10,8 @@ import numpy as np
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
 
 from whisper_wrapper import WhisperModel
+from audio_utils import EnergyGate, SAMPLE_WAV, load_wav
+from mel import IncrementalMel, load_mel_filters
 
 def main():
     print("=" * 60)
@@ -73,6 +75,38 @@ def main():
     print(f"   Time: {t3_time:.3f}s")
     print()
 
+    # Test 4: The server's energy gate skips this audio without decoding
+    print("6. Energy gate (server skips silent sessions):")
+    start_gate = time.time()
+    has_speech = EnergyGate().has_speech(audio)
+    gate_time = time.time() - start_gate
+    print(f"   Time: {gate_time * 1e6:.0f}us")
+    print(f"   Speech detected: {has_speech}")
+    print()
+
+    # Test 5: Mel computed incrementally in NumPy vs whisper.cpp's own
+    print("7. Incremental mel parity (speech clip, native vs precomputed mel):")
+    speech = load_wav(SAMPLE_WAV)
+    mel = IncrementalMel(load_mel_filters(model_path))
+    for i in range(0, len(speech), 320):  # 20 ms chunks, as the app streams them
+        mel.append(speech[i:i + 320])
+    start_mel = time.time()
+    precomputed = mel.finalize()
+    mel_time = time.time() - start_mel
+
+    native = model.transcribe(speech, language='en', n_threads=4, token_data=True, temperature_inc=0.0)
+    incremental = model.transcribe(speech, language='en', n_threads=4, token_data=True, temperature_inc=0.0,
+                                   mel=precomputed)
+    native_tokens = np.concatenate([s['tokens'] for s in native['segments']])
+    incremental_tokens = np.concatenate([s['tokens'] for s in incremental['segments']])
+    same_tokens = np.array_equal(native_tokens['id'], incremental_tokens['id'])
+    max_plog_diff = float(np.abs(native_tokens['plog'] - incremental_tokens['plog']).max()) if same_tokens else float('inf')
+    print(f"   Finalize: {mel_time * 1000:.1f}ms")
+    print(f"   Native:      '{native['text']}'")
+    print(f"   Incremental: '{incremental['text']}'")
+    print(f"   Same tokens: {same_tokens}, max logprob difference: {max_plog_diff:.4f}")
+    print()
+
     print("=" * 60)
     print("RESULTS:")
     print("=" * 60)
@@ -81,8 +115,19 @@ def main():
     print(f"Transcription #2:    {t2_time:.3f}s")
     print(f"Transcription #3:    {t3_time:.3f}s")
     print(f"Avg transcription:   {(t1_time + t2_time + t3_time)/3:.3f}s")
+    print(f"Energy gate:         {gate_time * 1e6:.0f}us")
     print()
 
+    if has_speech:
+        print("✗ Energy gate let pure silence through")
+    else:
+        print("✓ Energy gate skips silence")
+
+    if same_tokens and max_plog_diff < 0.01:
+        print("✓ Incremental mel matches whisper.cpp's")
+    else:
+        print("✗ Incremental mel diverges from whisper.cpp's")
+
     if load_time < 5:
         print("✓ Load time is good (< 5s)")
     else:
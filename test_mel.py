@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Parity checks for the NumPy log-mel spectrogram; needs no model or libwhisper"""
+
+import sys
+import os
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from audio_utils import synthetic_audio
+from mel import IncrementalMel, log_mel_spectrogram, N_FREQ
+
+# Largest difference tolerated against the reference port
+TOLERANCE = 1e-7
+
+
+def reference_mel(samples: np.ndarray, filters: np.ndarray):
+    """Line-by-line port of whisper.cpp's log_mel_spectrogram (frame loop, no batching)"""
+    n_samples = len(samples)
+    frame_size, frame_step, pad = 400, 160, 200
+
+    # Reflect 200 samples at the start, 30s of zeros plus 200 at the end
+    stream = np.zeros(n_samples + 30 * 16000 + 2 * pad, dtype=np.float32)
+    stream[pad:pad + n_samples] = samples
+    stream[:pad] = samples[1:1 + pad][::-1]
+    n_len = (len(stream) - frame_size) // frame_step
+    n_len_org = 1 + (n_samples + pad - frame_size) // frame_step
+
+    hann = 0.5 * (1.0 - np.cos(2.0 * np.pi * np.arange(frame_size) / frame_size))
+    mel = np.full((filters.shape[0], n_len), -10.0)
+    n_signal = n_samples + pad
+    for i in range(min(n_signal // frame_step + 1, n_len)):
+        offset = i * frame_step
+        frame = np.zeros(frame_size)
+        count = min(frame_size, n_signal - offset)
+        frame[:count] = hann[:count] * stream[offset:offset + count]
+        spectrum = np.fft.rfft(frame)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        mel[:, i] = np.log10(np.maximum(filters @ power, 1e-10))
+
+    mel = (np.maximum(mel, mel.max() - 8.0) + 4.0) / 4.0
+    return mel, n_len_org
+
+
+def main():
+    print("=" * 60)
+    print("Testing incremental mel")
+    print("=" * 60)
+    print()
+
+    rng = np.random.default_rng(0)
+    filters = np.abs(rng.standard_normal((80, N_FREQ))).astype(np.float32) * 0.01
+
+    failures = 0
+    for n_samples in (250, 1601, 16000, 3 * 16000 + 77):
+        audio = synthetic_audio(n_samples / 16000 + 0.01)[:n_samples]
+        expected, expected_org = reference_mel(audio.astype(np.float32) / 32768.0, filters)
+
+        one_shot, one_shot_org = log_mel_spectrogram(audio, filters)
+        mel = IncrementalMel(filters)
+        for i in range(0, n_samples, 320):  # 20 ms chunks, as the app streams them
+            mel.append(audio[i:i + 320])
+        chunked, chunked_org = mel.finalize()
+
+        same_shape = one_shot.shape == chunked.shape == expected.shape
+        same_org = one_shot_org == chunked_org == expected_org
+        reference_diff = float(np.abs(one_shot - expected).max()) if same_shape else float('inf')
+        chunked_diff = float(np.abs(chunked - one_shot).max()) if same_shape else float('inf')
+        ok = same_shape and same_org and reference_diff <= TOLERANCE and chunked_diff <= TOLERANCE
+        failures += not ok
+        print(f"{'✓' if ok else '✗'} {n_samples} samples: vs reference {reference_diff:.2e}, "
+              f"chunked vs one-shot {chunked_diff:.2e}, n_len_org {chunked_org}/{expected_org}")
+
+    print()
+    print("=" * 60)
+    print("All parity checks passed" if not failures else f"{failures} parity checks failed")
+    print("=" * 60)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Regression checks for transcript post-processing; needs no model"""
+
+import sys
+import os
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from term_correction import correct_terms
+
+# Stand-in for the system word list, so results don't depend on the machine
+ENGLISH = frozenset("""
+    a about apply back best book call control cooper cube daily deploy for get go home i jest land
+    mac make need notion of on open pods report rest run rust sequel steven test the this tickets
+    time to tomorrow trust up use write you
+""".split())
+
+# (text, terms, expected): ordinary words must survive, near-misses must not
+TERM_CASES = [
+    ("call Steven tomorrow about the report", ['Stephen', 'Reporter', 'Tomorrowland'],
+     "call Steven tomorrow about the report"),
+    ("make back up", ['MacBook'], "make back up"),
+    ("I terraformed the garden", ['Terraform'], "I terraformed the garden"),
+    ("use postgres sequel for this", ['PostgreSQL'], "use PostgreSQL for this"),
+    ("run teraform apply", ['Terraform'], "run Terraform apply"),
+    ("open the mac book", ['MacBook'], "open the MacBook"),
+    ("tickets for tomorow land", ['Tomorrowland'], "tickets for Tomorrowland"),
+    ("the best test", ['Jest'], "the best test"),
+    ("I trust you", ['Rust'], "I trust you"),
+    ("I need to rest", ['Rust'], "I need to rest"),
+    ("the notion of time", ['Notion'], "the notion of time"),
+    ("go home", ['Go'], "go home"),
+    ("I write rust daily", ['Rust'], "I write rust daily"),
+    ("I write RUST daily", ['Rust'], "I write Rust daily"),
+    ("run cube control get pods", ['kubectl'], "run kubectl get pods"),
+    ("deploy on cooper netties", ['Kubernetes'], "deploy on Kubernetes"),
+]
+
+
+def main():
+    print("=" * 60)
+    print("Testing post-processing")
+    print("=" * 60)
+
+    failures = 0
+    print("\nCustom-term correction:")
+    for text, terms, expected in TERM_CASES:
+        output = correct_terms(text, terms, 'en', ENGLISH)
+        if output == expected:
+            print(f"✓ '{text}' -> '{output}'")
+        else:
+            failures += 1
+            print(f"✗ '{text}' -> '{output}' (expected '{expected}')")
+
+    print()
+    print("=" * 60)
+    print(f"{len(TERM_CASES) - failures}/{len(TERM_CASES)} passed")
+    print("=" * 60)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Session lifecycle checks against a server running the fake engine; needs no model"""
+
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import websockets
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+
+# Every fake final takes this long, so a disconnect lands in the middle of it
+FINAL_SECONDS = 1.0
+
+# One second of 16kHz PCM16 that the energy gate counts as speech
+SPEECH = (b'\x00\x20\x00\xe0' * 8000)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def receive(ws, message_type: str):
+    """Next message of the given type (skipping acks and partials), None if it doesn't come"""
+    while True:
+        try:
+            message = json.loads(await asyncio.wait_for(ws.recv(), timeout=5))
+        except asyncio.TimeoutError:
+            return None
+        if message['type'] in (message_type, 'error'):
+            return message
+
+
+async def end_and_disconnect(url: str, session_id: str, resumable: bool):
+    """Start a session, send audio, ask for the final and drop the connection"""
+    ws = await websockets.connect(url)
+    await ws.send(json.dumps({'type': 'start_session', 'id': '1',
+                              'data': {'sessionId': session_id, 'language': 'en', 'resumable': resumable}}))
+    await receive(ws, 'session_started')
+    await ws.send(SPEECH)
+    await ws.send(json.dumps({'type': 'end_session', 'id': '2', 'data': {'sessionId': session_id}}))
+    await asyncio.sleep(0.1)
+    await ws.close()
+
+
+async def resume(url: str, session_id: str):
+    """Resume a session on a new connection; returns (status, final message)"""
+    async with websockets.connect(url) as ws:
+        await ws.send(json.dumps({'type': 'resume_session', 'id': '3', 'data': {'sessionId': session_id}}))
+        resumed = await receive(ws, 'session_resumed')
+        if resumed is None:
+            return None, None
+        if resumed['type'] == 'error':
+            return resumed['data']['code'], None
+        return resumed['data']['status'], await receive(ws, 'final')
+
+
+async def run_checks(url: str) -> list:
+    checks = []
+
+    await end_and_disconnect(url, 'during', resumable=True)
+    status, final = await resume(url, 'during')
+    checks.append(("Resume during a final gets the final pushed",
+                   status == 'finalizing' and final is not None and final['type'] == 'final'))
+
+    await end_and_disconnect(url, 'after', resumable=True)
+    await asyncio.sleep(FINAL_SECONDS + 0.5)
+    status, final = await resume(url, 'after')
+    checks.append(("Resume after a final gets it from the mailbox",
+                   status == 'completed' and final is not None and final['type'] == 'final'))
+
+    await end_and_disconnect(url, 'plain', resumable=False)
+    await asyncio.sleep(FINAL_SECONDS + 0.5)
+    status, _ = await resume(url, 'plain')
+    checks.append(("Non-resumable session is removed after its final", status == 'SESSION_NOT_FOUND'))
+
+    await end_and_disconnect(url, 'draining', resumable=True)
+    return checks
+
+
+def main():
+    print("=" * 60)
+    print("Testing session lifecycle (fake engine)")
+    print("=" * 60)
+    print()
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, 'server.py'), '--engine', 'fake', '--warmup', 'none',
+         '--port', str(port), '--fake-latency', str(FINAL_SECONDS), '--drain-timeout', '20'],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    try:
+        # The server prints its port once it listens
+        for line in server.stdout:
+            if line.startswith('SERVER_PORT:'):
+                break
+        checks = asyncio.run(run_checks(f"ws://127.0.0.1:{port}"))
+
+        # A final abandoned mid-way must not hold the drain to its timeout
+        start = time.time()
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+        checks.append(("Shutdown drains once the abandoned final is done", time.time() - start < FINAL_SECONDS + 5))
+    finally:
+        if server.poll() is None:
+            server.kill()
+
+    failures = 0
+    for name, ok in checks:
+        failures += not ok
+        print(f"{'✓' if ok else '✗'} {name}")
+
+    print()
+    print("=" * 60)
+    print(f"{len(checks) - failures}/{len(checks)} passed")
+    print("=" * 60)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())